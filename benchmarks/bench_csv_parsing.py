@@ -0,0 +1,128 @@
+"""
+Benchmark parsing a Garmin export: the legacy path (every column parsed with inferred dtypes,
+then data[data_cols], a regex replace on 'Calories' and format-guessing pd.to_datetime) against
+the schema-driven read_activities, with the C and (if installed) pyarrow engines.
+
+Each variant runs in a fresh process so that its peak RSS (sampled from /proc, Linux only)
+is measured in isolation.
+
+Usage:
+    python benchmarks/bench_csv_parsing.py --rows 200000 --extra-cols 25
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from config import data_cols  # noqa: E402
+from utils.data_prep import read_activities, parse_dates  # noqa: E402
+from synthetic import make_export  # noqa: E402
+
+
+def legacy(content):
+    data = pd.read_csv(io.BytesIO(content), encoding="utf-8")[data_cols].copy()
+    data["Date"] = pd.to_datetime(data["Date"], errors="coerce")
+    data["Calories"] = data["Calories"].replace(",", "", regex=True).astype(int)
+    return data
+
+
+def schema_c(content):
+    data = read_activities(content, engine="c")
+    data["Date"] = parse_dates(data["Date"])
+    return data
+
+
+def schema_pyarrow(content):
+    data = read_activities(content, engine="pyarrow")
+    data["Date"] = parse_dates(data["Date"])
+    return data
+
+
+VARIANTS = {"legacy (all columns, inferred)": legacy, "schema, c engine": schema_c,
+            "schema, pyarrow engine": schema_pyarrow}
+
+
+def _rss():
+    # Current resident set size in bytes (Linux)
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _measure(name, path, repeat, queue):
+    # Runs in a child process: best wall-clock time and the peak RSS growth over the loaded
+    # upload, sampled every millisecond by a thread while the variant runs
+    func = VARIANTS[name]
+    with open(path, "rb") as f:
+        content = f.read()
+
+    base = peak = _rss()
+    running = threading.Event()
+    running.set()
+
+    def sample():
+        nonlocal peak
+        while running.is_set():
+            peak = max(peak, _rss())
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - start)
+    running.clear()
+    sampler.join()
+    queue.put((best, peak - base))
+
+
+def measure(name, path, repeat):
+    """Best time (s) and peak RSS growth (bytes) of a variant, in a fresh process."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(name, path, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--extra-cols", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    content = make_export(args.rows, args.extra_cols)
+    print(f"rows: {args.rows}, columns: {len(data_cols) + 2 + args.extra_cols}, size: {len(content) / 1e6:.1f} MB")
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        VARIANTS.pop("schema, pyarrow engine")
+
+    with tempfile.NamedTemporaryFile(suffix=".csv") as export:
+        export.write(content)
+        export.flush()
+        del content
+
+        baseline = None
+        for name in VARIANTS:
+            elapsed, peak = measure(name, export.name, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{name:<32} {elapsed * 1000:10.1f} ms {peak / 1e6:10.1f} MB peak  {baseline / elapsed:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark date-range analyses of one loaded export: the whole history, then one season and one
+week, selected by binary search on the sorted dates (utils.date_range.select_dates) and, for
+comparison, by a boolean mask over every row.
+
+Usage:
+    python benchmarks/bench_date_range.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from synthetic import make_export  # noqa: E402
+from utils.data_prep import load_data  # noqa: E402
+from utils.date_range import select_dates  # noqa: E402
+from utils.pipeline import analysis_params, analyze  # noqa: E402
+
+RANGES = {"all": (None, None), "season": ("2025-03-01", "2025-08-31"), "week": ("2025-06-02", "2025-06-08")}
+
+
+def best_of(runs, func, *args):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def masked(data, start, end):
+    dates = data["Date"]
+    keep = (dates >= start) & (dates < end)
+    return data[keep]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    data = load_data(make_export(args.rows))
+    print(f"{'range':<8} {'rows':>9} {'select ms':>10} {'mask ms':>9} {'analyze ms':>11}")
+    for name, (start, end) in RANGES.items():
+        params = analysis_params(date_start=start, date_end=end)
+        rows = len(select_dates(data, start, end))
+        select = best_of(args.runs, select_dates, data, start, end)
+        mask = best_of(args.runs, masked, data, start or "1900-01-01", end or "2100-01-01")
+        total = best_of(args.runs, analyze, data, params)
+        print(f"{name:<8} {rows:>9} {select * 1000:>10.3f} {mask * 1000:>9.1f} {total * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
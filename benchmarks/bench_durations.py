@@ -0,0 +1,100 @@
+"""
+Benchmark the vectorized duration codec against the legacy per-row implementation.
+
+Usage:
+    python benchmarks/bench_durations.py --rows 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from utils.durations import parse_durations, format_durations  # noqa: E402
+from utils.utils_functions import secs_to_hms  # noqa: E402
+
+
+def _legacy_list_element_to_int(my_list):
+    """Per-row conversion used before utils.durations existed."""
+    try:
+        res = [int(x) for x in my_list]
+        if len(res) > 2:
+            return res[0] * 3600 + res[1] * 60 + res[2]
+        else:
+            return res[0] * 60 + res[1]
+    except Exception:
+        return np.nan
+
+
+def _legacy_hms_to_secs(time_col):
+    """Two .apply passes per column, as in the original utils_functions.hms_to_secs."""
+    temp = time_col.apply(lambda x: x.split('.')[0])
+    temp2 = temp.str.split(':')
+    return temp2.apply(lambda x: _legacy_list_element_to_int(x))
+
+
+def make_durations(rows, seed=0):
+    """
+    Build a Garmin-like duration column: 'M:S' and 'H:M:S' values, some fractional seconds
+    and '--' placeholders.
+    """
+    rng = np.random.default_rng(seed)
+    secs = rng.integers(60, 5 * 3600, rows)
+    hours, minutes, seconds = secs // 3600, (secs % 3600) // 60, secs % 60
+
+    short = pd.Series(minutes + hours * 60).astype(str) + ":" + pd.Series(seconds).astype(str).str.zfill(2)
+    long = (pd.Series(hours).astype(str).str.zfill(2) + ":" + pd.Series(minutes).astype(str).str.zfill(2)
+            + ":" + pd.Series(seconds).astype(str).str.zfill(2))
+    values = long.where(hours > 0, short)
+
+    values[rng.random(rows) < 0.1] += ".5"
+    values[rng.random(rows) < 0.02] = "--"
+    return values
+
+
+def timeit(func, *args, repeat=3):
+    """Best wall-clock time of `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    values = make_durations(args.rows)
+
+    # Sanity check: both parsers agree before timing them
+    legacy = _legacy_hms_to_secs(values)
+    vectorized = parse_durations(values, keep_fraction=False)
+    assert np.allclose(legacy.to_numpy(dtype=float), vectorized.to_numpy(), equal_nan=True)
+
+    secs = vectorized.dropna()
+    assert [secs_to_hms(s) for s in secs[:1000]] == format_durations(secs[:1000]).tolist()
+
+    results = [
+        ("parse (legacy hms_to_secs)", timeit(_legacy_hms_to_secs, values, repeat=args.repeat)),
+        ("parse (parse_durations)", timeit(parse_durations, values, repeat=args.repeat)),
+        ("format (secs_to_hms per row)", timeit(lambda s: [secs_to_hms(x) for x in s], secs, repeat=args.repeat)),
+        ("format (format_durations)", timeit(format_durations, secs, repeat=args.repeat)),
+    ]
+
+    print(f"rows: {args.rows}")
+    for name, seconds in results:
+        print(f"{name:<32} {seconds * 1000:10.1f} ms")
+    print(f"parse speedup:  {results[0][1] / results[1][1]:.1f}x")
+    print(f"format speedup: {results[2][1] / results[3][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
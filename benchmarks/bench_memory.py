@@ -0,0 +1,56 @@
+"""
+Benchmark the memory per row of the typed activity frame (load_data output) against the
+layout used before the calendar fields became compact (text hours, weekdays and months,
+formatted short dates, object titles, float64 miles).
+
+Sizes are DataFrame.memory_usage(deep=True), so string objects are counted in full.
+
+Usage:
+    python benchmarks/bench_memory.py --rows 100000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from synthetic import make_export  # noqa: E402
+from utils.data_prep import load_data  # noqa: E402
+
+
+def legacy_layout(data):
+    """The same frame with the dtypes add_cols and fix_types produced before."""
+    data = data.copy()
+    data['Title'] = data['Title'].astype(object)
+    data['Short_date'] = data['Date'].dt.strftime('%Y-%m-%d')
+    data['Distance_in_miles'] = data['Distance_in_miles'].astype(np.float64)
+    data['Month'] = data['Date'].dt.month.astype(str)
+    data['Year'] = data['Date'].dt.year
+    for col in ('Hour_of_day', 'Day_of_week'):
+        data[col] = data[col].astype(np.int64).astype(str)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    after = load_data(make_export(args.rows))
+    before = legacy_layout(after)
+    usage_before = before.memory_usage(index=False, deep=True)
+    usage_after = after.memory_usage(index=False, deep=True)
+
+    print(f"{'column':<20} {'before B/row':>13} {'after B/row':>12}  dtype")
+    for col in after.columns:
+        if usage_before[col] != usage_after[col]:
+            print(f"{col:<20} {usage_before[col] / args.rows:13.1f} {usage_after[col] / args.rows:12.1f}  "
+                  f"{before[col].dtype} -> {after[col].dtype}")
+    print(f"{'total':<20} {usage_before.sum() / args.rows:13.1f} {usage_after.sum() / args.rows:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark the rolling-statistics engine (utils.rolling) against pandas: sorting the series by
+date and running one time-based rolling('<N>D') pass per window plus one ewm pass per span.
+
+Both compute every calendar window and EWMA of one metric; the engine shares one set of daily
+running totals between all of them. (pandas' windows end at each activity's timestamp rather
+than covering whole days, so the values differ slightly; only the timings are compared.)
+
+Usage:
+    python benchmarks/bench_rolling.py --rows 100000 --windows 7 30 90 365 --spans 7 42
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from synthetic import make_export  # noqa: E402
+from utils.data_prep import load_data  # noqa: E402
+from utils.rolling import rolling_stats  # noqa: E402
+
+
+def pandas_rolling(data, col, windows, spans):
+    """One rolling pass per window and one ewm pass per span, on the date-sorted series."""
+    series = data.set_index("Date")[col].sort_index()
+    stats = {f"{window}D": series.rolling(f"{window}D").mean() for window in windows}
+    stats.update({f"EWMA {span}D": series.ewm(span=span).mean() for span in spans})
+    return stats
+
+
+def best_of(runs, func, *args):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--windows", type=int, nargs="+", default=[7, 30, 90, 365])
+    parser.add_argument("--spans", type=int, nargs="*", default=[7, 42])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    data = load_data(make_export(args.rows), columns=["Date", "Avg_pace_secs"])
+    engine = best_of(args.runs, rolling_stats, data["Date"], data["Avg_pace_secs"], args.windows, args.spans)
+    pandas = best_of(args.runs, pandas_rolling, data, "Avg_pace_secs", args.windows, args.spans)
+    print(f"{args.rows} rows, windows {args.windows}, spans {args.spans}")
+    print(f"utils.rolling   {engine * 1000:8.1f} ms")
+    print(f"pandas rolling  {pandas * 1000:8.1f} ms  ({pandas / engine:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark serializing a large time-series response: the legacy recursive clean_nan_values pass
+followed by FastAPI's jsonable_encoder, against NaN handling inside the producer and a direct
+JSONResponse render.
+
+Usage:
+    python benchmarks/bench_serialization.py --rows 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from utils.plots import get_mov_avg_data  # noqa: E402
+
+
+def _legacy_clean_nan_values(data):
+    """Recursive cleaner the pipeline ran on every section before utils_functions.finite_values."""
+    if isinstance(data, dict):
+        return {k: _legacy_clean_nan_values(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [_legacy_clean_nan_values(v) for v in data]
+    elif isinstance(data, float):
+        if data != data or data in [float("inf"), float("-inf")]:
+            return 0
+    return data
+
+
+def _legacy_mov_avg_data(data):
+    """Time series as the producer built it before, NaN values included."""
+    return {
+        "Avg HR": {
+            "dates": data["Date"].astype(str).tolist(),
+            "values": data["Avg HR"].tolist(),
+            "moving_average": data["Avg_HR_MA_30"].tolist()
+        },
+        "Avg Pace": {
+            "dates": data["Date"].astype(str).tolist(),
+            "values": data["Avg_pace_secs"].tolist(),
+            "moving_average": data["Pace_MA_30"].tolist()
+        }
+    }
+
+
+def make_frame(rows, seed=0):
+    """
+    Minimal prepared frame for get_mov_avg_data, with missing heart rates.
+    """
+    rng = np.random.default_rng(seed)
+    hr = rng.normal(150, 10, rows)
+    hr[rng.random(rows) < 0.2] = np.nan
+    pace = rng.normal(320, 30, rows)
+    data = pd.DataFrame({
+        "Date": pd.Timestamp("2025-01-01") - pd.to_timedelta(np.arange(rows) * 6, unit="h"),
+        "Avg HR": hr,
+        "Avg_pace_secs": pace,
+    })
+    data["Avg_HR_MA_30"] = data["Avg HR"].rolling(30).mean()
+    data["Pace_MA_30"] = data["Avg_pace_secs"].rolling(30).mean()
+    return data
+
+
+def legacy(data):
+    body = _legacy_clean_nan_values(_legacy_mov_avg_data(data))
+    return JSONResponse(jsonable_encoder(body)).body
+
+
+def current(data):
+    return JSONResponse(get_mov_avg_data(data)).body
+
+
+def timeit(func, *args, repeat=3):
+    """Best wall-clock time of `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_frame(args.rows)
+    size = len(current(data))
+
+    before = timeit(legacy, data, repeat=args.repeat)
+    after = timeit(current, data, repeat=args.repeat)
+
+    print(f"rows: {args.rows}, payload: {size / 1e6:.1f} MB")
+    print(f"{'clean_nan_values + jsonable_encoder':<40} {before * 1000:10.1f} ms")
+    print(f"{'producer-level NaN handling':<40} {after * 1000:10.1f} ms")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
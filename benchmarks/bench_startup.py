@@ -0,0 +1,63 @@
+"""
+Measure how long a fresh interpreter takes to import the API (`import main`), and which
+top-level packages account for it (python -X importtime), then the warm-up analysis.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 --top 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI")
+
+SCRIPT = """
+import time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from utils import serving
+serving.warm_up()
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def run_once():
+    """Import and warm-up seconds of one fresh process, and its -X importtime report."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", SCRIPT], cwd=API_DIR,
+                            capture_output=True, text=True, check=True)
+    import_secs, warm_up_secs = map(float, result.stdout.strip().splitlines()[-1].split())
+    return import_secs, warm_up_secs, result.stderr
+
+
+def top_level_imports(report):
+    """Cumulative import time (s) of each top-level package, from an -X importtime report."""
+    packages = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # Nesting is shown by indentation after one space
+            packages[name.strip()] = int(cumulative) / 1e6
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    print(f"import main: {statistics.median(run[0] for run in runs):.3f} s (median of {args.runs})")
+    print(f"warm-up:     {statistics.median(run[1] for run in runs):.3f} s")
+
+    packages = top_level_imports(runs[-1][2])
+    for name, secs in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<30} {secs:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark peak memory of the in-memory analysis (load_data + analyze) against the chunked
+streaming analysis, for exports of increasing size. Streaming should stay flat.
+
+Each run happens in a fresh process; peak RSS growth is sampled from /proc (Linux only).
+
+Usage:
+    python benchmarks/bench_streaming.py --rows 50000 200000 800000 --chunk-rows 50000
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from synthetic import write_export  # noqa: E402
+from utils.pipeline import analyze_upload, analysis_params  # noqa: E402
+
+
+def _rss():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _measure(path, streaming, chunk_rows, queue):
+    # Runs in a child process: wall-clock time and peak RSS growth of one analysis
+    params = analysis_params(streaming=streaming, stream_chunk_rows=chunk_rows, time_series_max_points=2000)
+    base = peak = _rss()
+    running = threading.Event()
+    running.set()
+
+    def sample():
+        nonlocal peak
+        while running.is_set():
+            peak = max(peak, _rss())
+            time.sleep(0.002)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    analyze_upload(path, params)
+    elapsed = time.perf_counter() - start
+    running.clear()
+    sampler.join()
+    queue.put((elapsed, peak - base))
+
+
+def measure(path, streaming, chunk_rows):
+    """Time (s) and peak RSS growth (bytes) of analyzing `path`, in a fresh process."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(path, streaming, chunk_rows, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50_000, 200_000, 800_000])
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            path = os.path.join(directory, f"export_{rows}.csv")
+            write_export(path, rows)
+            size = os.path.getsize(path)
+            for streaming in (False, True):
+                elapsed, peak = measure(path, streaming, args.chunk_rows)
+                mode = "streaming" if streaming else "in-memory"
+                print(f"{rows:>9} rows {size / 1e6:8.1f} MB  {mode:<10} {elapsed:8.2f} s {peak / 1e6:10.1f} MB peak")
+
+
+if __name__ == "__main__":
+    main()
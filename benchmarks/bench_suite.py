@@ -0,0 +1,177 @@
+"""
+Benchmark suite of the analysis: load_data, each function of utils/metrics.py and utils/plots.py,
+and the full POST /api/upload through TestClient, on synthetic exports of several sizes.
+
+Results are saved as JSON under benchmarks/results/ (one file per commit) and can be compared
+with an earlier run: cases slower than the baseline by more than --threshold are flagged and the
+script exits with status 1.
+
+Usage:
+    python benchmarks/bench_suite.py --sizes 1k 100k
+    python benchmarks/bench_suite.py --sizes 1k 100k --compare <commit or results file>
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from synthetic import parse_size, write_export  # noqa: E402
+from config import desc_matrix_cols, yearly_stats_cols, histogram_cols, main_distances  # noqa: E402
+from utils.data_prep import load_data  # noqa: E402
+from utils.metrics import (  # noqa: E402
+    get_descriptive_matrix, get_avg_pace_by_day_of_week, compute_totals, get_yearly_statistics,
+    get_three_best_performances, compute_metrics,
+)
+from utils.plots import get_histogram_data, get_mov_avg_data  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Relative slowdown over the baseline reported as a regression
+DEFAULT_THRESHOLD = 0.2
+
+# Cases running on the loaded dataset
+DATA_CASES = {
+    "metrics.get_descriptive_matrix": lambda data: get_descriptive_matrix(data, desc_matrix_cols),
+    "metrics.get_avg_pace_by_day_of_week": get_avg_pace_by_day_of_week,
+    "metrics.compute_totals": compute_totals,
+    "metrics.get_yearly_statistics": lambda data: get_yearly_statistics(data, yearly_stats_cols),
+    "metrics.get_three_best_performances": lambda data: get_three_best_performances(data, main_distances),
+    "metrics.compute_metrics": lambda data: compute_metrics(
+        data, desc_matrix_cols=desc_matrix_cols, yearly_statistics_cols=yearly_stats_cols, distances=main_distances),
+    "plots.get_histogram_data": lambda data: get_histogram_data(data, histogram_cols),
+    "plots.get_mov_avg_data": get_mov_avg_data,
+}
+
+
+def timeit(func, *args, repeat=3):
+    """Best wall-clock time of `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def upload_case():
+    """
+    Return a function posting an export file to /api/upload, bypassing the analysis cache.
+    """
+    from fastapi.testclient import TestClient
+    from main import app
+    from api.routes import analysis_cache
+
+    client = TestClient(app)
+
+    def upload(path):
+        analysis_cache.clear()
+        with open(path, "rb") as f:
+            response = client.post("/api/upload", files={"file": ("activities.csv", f, "text/csv")})
+        response.raise_for_status()
+
+    return upload
+
+
+def run_size(path, repeat, upload=None):
+    """Best time (s) of every case on the export at `path`."""
+    timings = {"load_data": timeit(load_data, path, repeat=repeat)}
+    data = load_data(path)
+    for name, func in DATA_CASES.items():
+        timings[name] = timeit(func, data, repeat=repeat)
+    if upload:
+        timings["api.upload"] = timeit(upload, path, repeat=repeat)
+    return timings
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two result sets ({size: {case: seconds}}).
+
+    Returns:
+        list: (size, case, baseline seconds, current seconds, relative change, regression) of every
+        case found in both; the relative change is e.g. 0.25 for 25% slower.
+    """
+    rows = []
+    for size, timings in current.items():
+        for case, seconds in timings.items():
+            before = baseline.get(size, {}).get(case)
+            if before:
+                change = seconds / before - 1
+                rows.append((size, case, before, seconds, change, change > threshold))
+    return rows
+
+
+def current_commit():
+    """Short hash of HEAD, with a '-dirty' suffix for uncommitted changes ('unknown' outside git)."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_baseline(ref):
+    """Results of a results file path, or of the run saved for a commit."""
+    path = ref if os.path.isfile(ref) else os.path.join(RESULTS_DIR, f"{ref}.json")
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["1k", "100k"], help="Named sizes (1k, 100k, 10m) or row counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-upload", action="store_true", help="Skip the /api/upload case")
+    parser.add_argument("--compare", help="Commit or results file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown flagged as a regression (0.2 = 20%%)")
+    parser.add_argument("--no-save", action="store_true", help="Do not write the results file")
+    args = parser.parse_args()
+
+    upload = None if args.no_upload else upload_case()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"activities_{size}.csv")
+            write_export(path, parse_size(size))
+            results[size] = run_size(path, args.repeat, upload)
+            os.remove(path)
+            for case, seconds in results[size].items():
+                print(f"{size:>6} {case:<40} {seconds * 1000:12.1f} ms")
+
+    commit = current_commit()
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{commit}.json")
+        with open(path, "w") as f:
+            json.dump({"commit": commit, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "python": platform.python_version(), "machine": platform.machine(),
+                       "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"saved {path}")
+
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        print(f"\ncompared with {baseline['commit']} (threshold {args.threshold:.0%})")
+        regressions = 0
+        for size, case, before, after, change, regression in compare_results(results, baseline["results"],
+                                                                              args.threshold):
+            regressions += regression
+            flag = "REGRESSION" if regression else ""
+            print(f"{size:>6} {case:<40} {before * 1000:10.1f} -> {after * 1000:10.1f} ms {change:+8.1%} {flag}")
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Synthetic Garmin Connect activities exports for benchmarks and scale tests.
+
+The exports follow the column layout of a real download (the config.data_cols plus the
+columns the API skips), with its quirks: thousands separators in 'Calories', '--'
+placeholders (runs without GPS or elevation), durations under an hour written either as
+'M:S' or 'H:M:S' and fractional lap times. Large exports are written to disk block by block,
+so a 10M-row file never has to fit in memory.
+
+Usage:
+    python benchmarks/synthetic.py --sizes 1k 100k 10m --out-dir /tmp/exports
+"""
+import argparse
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
+
+from config import data_cols  # noqa: E402
+
+# Named export sizes accepted by the benchmark scripts
+SIZES = {"1k": 1_000, "100k": 100_000, "10m": 10_000_000}
+
+# Run distances (km) of the generated activities, around the best-performance distances
+DISTANCES = np.array([3.22, 5, 5, 8, 10, 10, 12, 15, 21.1, 42.2])
+
+# Share of the runs without GPS (no best pace) and without elevation data, shown as '--'
+NO_GPS_SHARE = 0.05
+NO_ELEVATION_SHARE = 0.1
+
+# Share of the durations under an hour written as 'M:S' rather than 'H:M:S'
+SHORT_FORMAT_SHARE = 0.5
+
+
+def parse_size(size):
+    """
+    Rows of a named size ('1k', '100k', '10m') or a plain row count.
+    """
+    return SIZES[size.lower()] if size.lower() in SIZES else int(size)
+
+
+def _format_durations(secs, short, decimals=0):
+    # 'H:M:S' (zero-padded hours) or, where `short` and under an hour, 'M:S'
+    whole = secs.astype(np.int64)
+    hours, minutes, seconds = whole // 3600, whole % 3600 // 60, whole % 60
+    fraction = ([f".{d}" for d in np.floor((secs - whole) * 10 ** decimals).astype(np.int64)] if decimals
+                else [""] * len(secs))
+    return [f"{m}:{s:02}{f}" if sh and h == 0 else f"{h:02}:{m:02}:{s:02}{f}"
+            for h, m, s, f, sh in zip(hours, minutes, seconds, fraction, short)]
+
+
+def make_export(rows, extra_cols=0, seed=0, end="2026-01-01", days=3000):
+    """
+    Garmin-like export of `rows` runs over the `days` days before `end`, newest run first.
+
+    Args:
+        rows (int): Activities in the export.
+        extra_cols (int): Unused numeric columns added after the export columns.
+        seed (int): Random seed; the same arguments always give the same content.
+        end (str): Date of the newest possible run.
+        days (float): Time span covered by the runs.
+
+    Returns:
+        bytes: The CSV content, UTF-8 encoded.
+    """
+    rng = np.random.default_rng(seed)
+    distance = np.round(rng.choice(DISTANCES, rows) + rng.normal(0, 0.03, rows), 2).clip(0.5)
+    pace = rng.normal(330, 35, rows).clip(200, 600).astype(np.int64)
+    best_pace = (pace - rng.integers(10, 60, rows)).astype(np.int64)
+    secs = distance * pace
+    moving = secs - rng.uniform(0, 30, rows)
+    elapsed = secs + rng.uniform(0, 300, rows)
+    short = rng.random(rows) < SHORT_FORMAT_SHARE
+    no_gps = rng.random(rows) < NO_GPS_SHARE
+    no_elevation = rng.random(rows) < NO_ELEVATION_SHARE
+    dates = pd.Timestamp(end) - pd.to_timedelta(np.sort(rng.uniform(0, days, rows)), unit="D")
+
+    def placeholder(values, where):
+        return np.where(where, "--", np.asarray(values).astype(str))
+
+    avg_hr = rng.normal(150, 8, rows).clip(100, 185).astype(np.int64)
+    ascent = rng.gamma(2, 40, rows).astype(np.int64)
+    min_elevation = rng.integers(0, 400, rows)
+    columns = {
+        "Activity Type": "Running",
+        "Date": dates.strftime("%Y-%m-%d %H:%M:%S"),
+        "Favorite": "false",
+        "Title": rng.choice(["Morning Run", "Evening Run", "Long Run", "Tempo", "Intervals"], rows),
+        "Distance": distance,
+        "Calories": [f"{c:,}" for c in (distance * rng.uniform(60, 80, rows)).astype(np.int64)],
+        "Time": _format_durations(secs, short),
+        "Avg HR": avg_hr,
+        "Max HR": avg_hr + rng.integers(8, 30, rows),
+        "Avg Run Cadence": rng.integers(150, 180, rows),
+        "Max Run Cadence": rng.integers(180, 210, rows),
+        "Avg Pace": _format_durations(pace, np.ones(rows, dtype=bool)),
+        "Best Pace": placeholder(_format_durations(best_pace, np.ones(rows, dtype=bool)), no_gps),
+        "Total Ascent": placeholder(ascent, no_elevation),
+        "Total Descent": placeholder(ascent + rng.integers(-10, 10, rows).clip(-ascent), no_elevation),
+        "Avg Stride Length": np.round(rng.normal(1.1, 0.08, rows), 2),
+        "Best Lap Time": _format_durations(np.minimum(best_pace + rng.uniform(0, 30, rows), secs), short, 1),
+        "Moving Time": _format_durations(moving, short),
+        "Elapsed Time": _format_durations(elapsed, short),
+        "Min Elevation": placeholder(min_elevation, no_elevation),
+        "Max Elevation": placeholder(min_elevation + ascent // 2, no_elevation),
+    }
+    assert set(data_cols) <= set(columns), "The synthetic export must hold every config.data_cols column"
+    for i in range(extra_cols):
+        columns[f"Extra {i}"] = np.round(rng.normal(0, 100, rows), 1)
+
+    buffer = io.StringIO()
+    pd.DataFrame(columns).to_csv(buffer, index=False)
+    return buffer.getvalue().encode("utf-8")
+
+
+def write_export(path, rows, extra_cols=0, seed=0, block=100_000, end="2026-01-01", days=3000):
+    """
+    Write an export of `rows` runs to `path`, generated `block` rows at a time (newest first).
+
+    Each block covers its own slice of the time span, so the dates decrease over the whole file.
+    """
+    blocks = max(1, -(-rows // block))
+    span = days / blocks
+    with open(path, "wb") as f:
+        for i, start in enumerate(range(0, max(rows, 1), block)):
+            block_end = pd.Timestamp(end) - pd.Timedelta(days=span * i)
+            content = make_export(min(block, rows - start), extra_cols=extra_cols, seed=seed + i,
+                                  end=block_end, days=span)
+            f.write(content if i == 0 else content.split(b"\n", 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), help="Named sizes (1k, 100k, 10m) or row counts")
+    parser.add_argument("--extra-cols", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default=".")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for size in args.sizes:
+        path = os.path.join(args.out_dir, f"activities_{size}.csv")
+        write_export(path, parse_size(size), extra_cols=args.extra_cols, seed=args.seed)
+        print(f"{path}: {parse_size(size)} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,94 +1,670 @@
-from fastapi import APIRouter, UploadFile, HTTPException
-from utils.data_prep import load_data
-from utils.metrics import (
-    get_descriptive_matrix,
-    get_avg_pace_by_day_of_week,
-    compute_totals,
-    get_yearly_statistics,
-    get_three_best_performances,
-)
-from utils.plots import get_histogram_data, get_mov_avg_data
-from config import desc_matrix_cols, yearly_stats_cols, histogram_cols, main_distances
-from utils.utils_functions import clean_nan_values
+import asyncio
+import json
 import os
-
-# Debugging confirmation
-print("Executing routes.py for /api/upload")
+import shutil
+import tempfile
+import time
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, UploadFile, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from utils.data_prep import read_activities, prepare_activities, sort_by_date
+from utils.pipeline import (
+    analyze, analyze_upload, analyze_and_store, analyze_batch, analyze_dataset, store_dataset, analysis_params,
+    required_columns, SECTIONS,
+)
+from utils.executor import AnalysisExecutor
+from utils.cache import (
+    AnalysisCache, make_cache_key, make_content_cache_key, make_batch_cache_key, make_dataset_cache_key,
+)
+from utils.datasets import DatasetStore
+from utils.date_range import date_bounds, select_dates
+from utils.histograms import MAX_BINS, MIN_BIN_WIDTH
+from utils.registry import DatasetRegistry
+from utils.rolling import MAX_WINDOW_DAYS
+from utils.incremental import IncrementalStore, DATASET_ID_PATTERN
+from utils.encoding import encode_response
+from utils.timing import StageTimer, UploadMetrics, run_timed, run_timed_on_frame
+from utils.jobs import JobQueue, QueueFullError, make_job_store, job_view, FINISHED, DONE
+from config import (
+    cache_max_bytes, cache_dir, cache_disk_max_bytes, incremental_dir, yearly_stats_cols, histogram_cols,
+    main_distances, best_effort_tolerance, best_effort_k, executor_kind, executor_workers, analysis_timeout_secs,
+    stream_threshold_bytes, batch_max_files, job_queue_size, job_workers, job_timeout_secs, job_ttl_secs, job_store,
+    job_dir, dataset_dir, registry_max_bytes, registry_ttl_secs,
+)
 
 # Create the APIRouter instance
 router = APIRouter()
 
+# Results keyed by upload content + analysis settings, shared by all requests of this process
+analysis_cache = AnalysisCache(max_bytes=cache_max_bytes, disk_dir=cache_dir, disk_max_bytes=cache_disk_max_bytes)
+
+# Pandas work runs here, keeping the event loop free for light requests
+analysis_executor = AnalysisExecutor(kind=executor_kind, max_workers=executor_workers, timeout=analysis_timeout_secs)
+
+# Mergeable aggregates of datasets uploaded in incremental mode
+incremental_store = IncrementalStore(incremental_dir, yearly_stats_cols, main_distances,
+                                     top_k=best_effort_k, tolerance=best_effort_tolerance)
+
+# Asynchronous analyses (POST /api/jobs), run on the same executor; results kept for job_ttl_secs
+job_queue = JobQueue(make_job_store(job_store, job_ttl_secs, job_dir), analysis_executor, max_pending=job_queue_size,
+                     workers=job_workers, timeout=job_timeout_secs)
+
+# Typed frames of uploads, re-analyzed without re-upload (POST /api/datasets)
+dataset_store = DatasetStore(dataset_dir)
+
+# Frames of stored datasets kept in memory between their analyses, within a byte budget
+dataset_registry = DatasetRegistry(registry_max_bytes, registry_ttl_secs)
+
+# Interval between two job state checks of a Server-Sent Events stream
+JOB_EVENTS_INTERVAL_SECS = 0.5
+
+# Per-stage latency, upload size and memory metrics, served by GET /metrics
+upload_metrics = UploadMetrics()
+
+# Upper bound on the number of best-performance distances a request may ask for
+MAX_DISTANCES = 200
+
+
+def parse_distances(distances):
+    """
+    Parse a comma-separated list of distances in km (e.g. "5,10,21.1").
+
+    Returns:
+        list: Distances (whole numbers as int, so the response keys read "5" rather than "5.0"),
+        or None when the parameter was not given.
+    """
+    if distances is None:
+        return None
+    try:
+        values = [float(value) for value in distances.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="distances must be a comma-separated list of numbers")
+    if not values or len(values) > MAX_DISTANCES or any(not 0 < value < 1000 for value in values):
+        raise HTTPException(status_code=400, detail=f"distances must hold 1 to {MAX_DISTANCES} values in (0, 1000) km")
+    return [int(value) if value.is_integer() else value for value in values]
+
+
+def parse_sections(sections):
+    """
+    Parse a comma-separated list of response sections (e.g. "totals,histogram_data").
+
+    Returns:
+        list: Section names, or None (every section) when the parameter was not given.
+    """
+    if sections is None:
+        return None
+    names = [name.strip() for name in sections.split(",") if name.strip()]
+    unknown = set(names) - set(SECTIONS)
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"sections must be a comma-separated list of: {', '.join(SECTIONS)}")
+    return names
+
+
+def parse_days(days, name):
+    """
+    Parse a comma-separated list of whole numbers of days (e.g. "7,30,365").
+
+    Returns:
+        list: Days, or None when the parameter was not given.
+    """
+    if days is None:
+        return None
+    try:
+        values = [int(value) for value in days.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a comma-separated list of whole days")
+    if not values or any(not 1 <= value <= MAX_WINDOW_DAYS for value in values):
+        raise HTTPException(status_code=400, detail=f"{name} must hold 1 or more values in [1, {MAX_WINDOW_DAYS}] days")
+    return values
+
+
+def parse_date_range(start, end, year):
+    """
+    Resolve the start/end/year filters into the date_start and date_end analysis parameters.
+    """
+    try:
+        date_start, date_end = date_bounds(start, end, year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"date_start": date_start, "date_end": date_end}
+
+
+def parse_widths(widths):
+    """
+    Parse histogram bin widths per field (e.g. "Avg_pace_secs:10,Distance:1").
+
+    Returns:
+        dict: {field: width}, or None when the parameter was not given.
+    """
+    if widths is None:
+        return None
+    try:
+        parsed = {field.strip(): float(width) for field, width in
+                  (item.rsplit(":", 1) for item in widths.split(",") if item.strip())}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="hist_width must be a comma-separated list of field:width")
+    if not parsed or any(not MIN_BIN_WIDTH <= width < float("inf") for width in parsed.values()):
+        raise HTTPException(status_code=400, detail=f"hist_width must hold finite widths of at least {MIN_BIN_WIDTH}")
+    return parsed
+
+
+def parse_edges(edges):
+    """
+    Parse histogram grids per field as first edge, bin width and bin count
+    (e.g. "Avg_pace_secs:240:10:36", the grid of an earlier response's edges).
+
+    Returns:
+        dict: {field: edges}, or None when the parameter was not given.
+    """
+    if edges is None:
+        return None
+    try:
+        parsed = {}
+        for item in edges.split(","):
+            if item.strip():
+                field, first, width, bins = item.rsplit(":", 3)
+                parsed[field.strip()] = (float(first), float(width), int(bins))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="hist_edges must be a comma-separated list of field:first:width:bins")
+    if not parsed or any(field not in histogram_cols for field in parsed):
+        raise HTTPException(status_code=400, detail=f"hist_edges fields must be among: {', '.join(histogram_cols)}")
+    if any(not (abs(first) < float("inf") and 0 < width < float("inf") and 1 <= bins <= MAX_BINS)
+           for first, width, bins in parsed.values()):
+        raise HTTPException(status_code=400,
+                            detail=f"hist_edges must hold finite edges, positive widths and 1 to {MAX_BINS} bins")
+    return {field: [first + i * width for i in range(bins + 1)] for field, (first, width, bins) in parsed.items()}
+
+
+def analysis_query(
+    distances: Optional[str] = Query(None, description="Best-performance distances in km, e.g. 5,10,21.1"),
+    tolerance: Optional[float] = Query(None, ge=0, le=5, description="Distance window (+/- km)"),
+    k: Optional[int] = Query(None, ge=1, le=50, description="Best performances per distance"),
+    max_points: Optional[int] = Query(None, ge=3, le=100_000, description="Downsample each time series to this size"),
+    sections: Optional[str] = Query(None, description="Sections to compute, e.g. totals,histogram_data (default: all)"),
+    hist_strategy: Optional[str] = Query(None, description="Histogram binning: count (default), fd or width"),
+    hist_bins: Optional[int] = Query(None, ge=1, le=200, description="Histogram bins of the count strategy"),
+    hist_width: Optional[str] = Query(None, description="Widths of the width strategy, e.g. Avg_pace_secs:10,Distance:1"),
+    hist_edges: Optional[str] = Query(None, description="Given grids, e.g. Avg_pace_secs:240:10:36 (first:width:bins)"),
+    hist_by: Optional[str] = Query(None, description="Split histogram counts by Year"),
+    ma_windows: Optional[str] = Query(None, description="Extra moving-average windows in days, e.g. 7,90,365"),
+    ewm_spans: Optional[str] = Query(None, description="EWMA spans in days of the time series, e.g. 7,42"),
+    start: Optional[date] = Query(None, description="First day analyzed, e.g. 2024-03-01"),
+    end: Optional[date] = Query(None, description="Last day analyzed (included)"),
+    year: Optional[int] = Query(None, ge=1900, le=2100, description="Analyze one calendar year only"),
+):
+    """
+    Query parameters shared by the analysis endpoints (FastAPI dependency).
+
+    Returns:
+        dict: Settings from analysis_params; the endpoints that can stream set params["streaming"].
+    """
+    try:
+        return analysis_params(
+            main_distances=parse_distances(distances),
+            best_effort_tolerance=tolerance,
+            best_effort_k=k,
+            time_series_max_points=max_points,
+            sections=parse_sections(sections),
+            histogram_strategy=hist_strategy,
+            histogram_bins=hist_bins,
+            histogram_widths=parse_widths(hist_width),
+            histogram_by=hist_by,
+            histogram_edges=parse_edges(hist_edges),
+            time_series_windows=parse_days(ma_windows, "ma_windows"),
+            time_series_spans=parse_days(ewm_spans, "ewm_spans"),
+            **parse_date_range(start, end, year),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.post("/upload")
-async def upload_file(file: UploadFile):
+async def upload_file(
+    request: Request,
+    file: UploadFile,
+    stream: Optional[bool] = Query(None, description="Analyze in chunks with bounded memory (default: for large uploads)"),
+    params: dict = Depends(analysis_query),
+    keep: bool = Query(False, description="Keep the parsed activities for follow-up analyses (X-Dataset-Id)"),
+):
     """
     Handle file upload and process the uploaded CSV file.
+
+    The response is gzip/brotli compressed per Accept-Encoding; clients sending
+    'Accept: application/x-msgpack' get the compact columnar encoding instead of JSON.
+    Uploads above RUNAPI_STREAM_THRESHOLD_BYTES are analyzed in streaming mode unless stream=false.
+    With sections=..., only those sections (and the calculated columns they read) are computed.
+    With keep=true, the parsed activities are also stored as a dataset, whose id is returned in the
+    X-Dataset-Id header: GET /api/datasets/{id}/analysis then answers follow-up questions without
+    re-upload, from the stored frame (kept resident in memory once it has been analyzed).
+    The time of each pipeline stage is returned in the Server-Timing header.
     """
+    timer = StageTimer()
+    started = getattr(request.state, "started_at", None) or time.perf_counter()
+    # Time between the request start and this handler: receiving and parsing the multipart body
+    timer.add("receive", time.perf_counter() - started)
     try:
         # Validate file type
         if not file.filename.endswith(".csv"):
             raise HTTPException(status_code=400, detail="Only .csv files are supported")
+        if keep and stream:
+            raise HTTPException(status_code=400, detail="keep needs the in-memory analysis (stream=false)")
+
+        params["streaming"] = not keep and (stream if stream is not None else (file.size or 0) > stream_threshold_bytes)
+
+        # A repeated upload of the same export only costs a hash (in a thread: it reads the whole
+        # upload) and a lookup
+        await file.seek(0)
+        with timer.stage("cache_lookup"):
+            content_key = await run_in_threadpool(make_cache_key, file.file)
+            cache_key = make_content_cache_key(content_key, params)
+            result = analysis_cache.get(cache_key)
+            dataset_id = content_key[:32] if keep else None
+            info = await run_in_threadpool(dataset_store.info, dataset_id) if keep else None
+            stored = info is not None
+        if result is not None and stored == keep:
+            return _kept(_timed_response(request, result, timer, started, file.size, cache_hit=True), dataset_id)
+        if stored:
+            # Kept by an earlier upload: answered from the dataset, without parsing the CSV
+            result = await _analyze_resident(timer, dataset_id, info, params)
+            analysis_cache.put(cache_key, result)
+            return _kept(_timed_response(request, result, timer, started, file.size), dataset_id)
+
+        # Load and process the uploaded CSV in the executor: a thread reads the upload stream
+        # directly, a worker process receives the raw bytes (the parsed frame never crosses back),
+        # or the path of a disk copy in streaming mode so that the upload is never fully in memory
+        spooled_path = None
+        with timer.stage("read_body"):
+            if not analysis_executor.uses_processes:
+                source = file.file
+            elif params["streaming"]:
+                source = spooled_path = await run_in_threadpool(_spool_to_disk, file.file)
+            else:
+                source = await run_in_threadpool(file.file.read)
+        try:
+            if keep:
+                result = await _run_timed(timer, analyze_and_store, source, dataset_store.directory, dataset_id, params)
+            else:
+                result = await _run_timed(timer, analyze_upload, source, params)
+        finally:
+            if spooled_path:
+                os.remove(spooled_path)
+        analysis_cache.put(cache_key, result)
 
-        # breakpoint()
-
-        # Save the uploaded file temporarily
-        temp_file_path = f"temp/{file.filename}"
-        with open(temp_file_path, "wb") as f:
-            f.write(await file.read())
-
-        # Debugging: Confirm file was saved
-        # print(f"Uploaded file saved at: {temp_file_path}")
-
-        # Load and process the CSV file
-        data = load_data(temp_file_path)
-
-        # Validate and debug dataset structure
-        # print(f"Dataset columns: {data.columns}")
-        # print(f"Dataset preview:\n{data.head()}")
-
-        # Metrics
-        desc_matrix = get_descriptive_matrix(data, desc_matrix_cols)
-        avg_pace_day_week = get_avg_pace_by_day_of_week(data)
-        totals = compute_totals(data)
-        yearly_statistics = get_yearly_statistics(data, yearly_stats_cols)
-        best_perf = get_three_best_performances(data, main_distances)
-
-        # Histograms for Distance, Avg HR, Avg Pace
-        histogram_data = get_histogram_data(data, histogram_cols, bins=10)
-
-        # Time series data for Avg_pace_secs and Avg HR
-        time_series_data = get_mov_avg_data(data)
-
-        # Clean up the temporary file
-        os.remove(temp_file_path)
-
-        # Clean NaN values in all outputs
-        desc_matrix = clean_nan_values(desc_matrix)
-        avg_pace_day_week = clean_nan_values(avg_pace_day_week)
-        totals = clean_nan_values(totals)
-        yearly_statistics = clean_nan_values(yearly_statistics)
-        histogram_data = clean_nan_values(histogram_data)
-        time_series_data = clean_nan_values(time_series_data)
-        best_perf = clean_nan_values(best_perf)
-
-        # print("Debug: desc_matrix", desc_matrix)
-        # print("Debug: avg_pace_day_week", avg_pace_day_week)
-        # print("Debug: totals", totals)
-        # print("Debug: yearly_statistics", yearly_statistics)
-        # print("Debug: histogram_data", histogram_data)
-        # print("Debug: time_series_data", time_series_data)
-        # print("Debug: best_perf", best_perf)
-
-        return {
-            "desc_matrix": desc_matrix,
-            "avg_pace_day_week": avg_pace_day_week,
-            "totals": totals,
-            "yearly_statistics": yearly_statistics,
-            "histogram_data": histogram_data,
-            "time_series_data": time_series_data,
-            "best_perf": best_perf,
-        }
+        # The body holds only plain JSON types: serialize it directly, skipping jsonable_encoder
+        return _kept(_timed_response(request, result, timer, started, file.size), dataset_id)
     except HTTPException:
         raise  # Re-raise HTTP errors for expected cases
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Analysis timed out")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Unexpected error: {str(e)}")
+
+
+@router.post("/upload/incremental")
+async def upload_incremental(request: Request, file: UploadFile, dataset_id: str):
+    """
+    Fold only the activities not seen before for `dataset_id` into its stored aggregates.
+
+    Returns the totals, yearly statistics, weekday paces and best performances of the whole
+    dataset; their cost depends on the number of new activities, not on the history length.
+    """
+    try:
+        # Validate file type and dataset id
+        if not file.filename.endswith(".csv"):
+            raise HTTPException(status_code=400, detail="Only .csv files are supported")
+        if not DATASET_ID_PATTERN.match(dataset_id):
+            raise HTTPException(status_code=400, detail="Invalid dataset_id")
+
+        await file.seek(0)
+        return _encoded(request, await run_in_threadpool(_update_incremental, dataset_id, file.file))
+    except HTTPException:
+        raise  # Re-raise HTTP errors for expected cases
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unexpected error: {str(e)}")
+
+
+@router.post("/upload/batch")
+async def upload_batch(
+    request: Request,
+    files: List[UploadFile],
+    params: dict = Depends(analysis_query),
+):
+    """
+    Analyze several exports at once: CSV files and/or zip archives of CSVs.
+
+    The CSVs are parsed concurrently, activities present in several exports (same Date, Title
+    and Distance) are counted once, and the metrics run a single time over the merged frame,
+    sorted by date. The body of /api/upload is returned, plus the merged files and activity counts.
+    """
+    timer = StageTimer()
+    started = getattr(request.state, "started_at", None) or time.perf_counter()
+    timer.add("receive", time.perf_counter() - started)
+    try:
+        if len(files) > batch_max_files:
+            raise HTTPException(status_code=400, detail=f"A batch holds at most {batch_max_files} files")
+
+        with timer.stage("cache_lookup"):
+            for file in files:
+                await file.seek(0)
+            cache_key = await run_in_threadpool(make_batch_cache_key, [file.file for file in files], params)
+            result = analysis_cache.get(cache_key)
+        upload_bytes = sum(file.size or 0 for file in files)
+        if result is not None:
+            return _timed_response(request, result, timer, started, upload_bytes, cache_hit=True)
+
+        # Worker processes receive the raw bytes, threads read the upload streams directly
+        with timer.stage("read_body"):
+            uploads = [(file.filename or "", await run_in_threadpool(file.file.read)
+                        if analysis_executor.uses_processes else file.file)
+                       for file in files]
+        result = await _run_timed(timer, analyze_batch, uploads, params)
+        analysis_cache.put(cache_key, result)
+
+        return _timed_response(request, result, timer, started, upload_bytes)
+    except HTTPException:
+        raise  # Re-raise HTTP errors for expected cases
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Analysis timed out")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unexpected error: {str(e)}")
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile,
+    stream: Optional[bool] = Query(None, description="Analyze in chunks with bounded memory (default: for large uploads)"),
+    params: dict = Depends(analysis_query),
+):
+    """
+    Enqueue the analysis of an upload (parameters of /api/upload) and return its job id at once.
+
+    Follow the job with GET /api/jobs/{job_id} (polling) or GET /api/jobs/{job_id}/events
+    (Server-Sent Events), then fetch GET /api/jobs/{job_id}/result. Returns 503 when the
+    queue is full.
+    """
+    try:
+        # Validate file type
+        if not file.filename.endswith(".csv"):
+            raise HTTPException(status_code=400, detail="Only .csv files are supported")
+
+        params["streaming"] = stream if stream is not None else (file.size or 0) > stream_threshold_bytes
+
+        await file.seek(0)
+        cache_key = await run_in_threadpool(make_cache_key, file.file, params)
+        result = analysis_cache.get(cache_key)
+        if result is not None:
+            job_id = job_queue.complete(result)
+        else:
+            # The upload is gone once this request ends: the job reads a disk copy
+            path = await run_in_threadpool(_spool_to_disk, file.file)
+            try:
+                job_id = job_queue.submit(analyze_upload, path, params,
+                                          on_result=lambda body: analysis_cache.put(cache_key, body),
+                                          cleanup=lambda: os.remove(path))
+            except QueueFullError as e:
+                os.remove(path)
+                raise HTTPException(status_code=503, detail=str(e))
+
+        return JSONResponse(status_code=202, content=job_view(job_queue.store.get(job_id)),
+                            headers={"Location": f"/api/jobs/{job_id}"})
+    except HTTPException:
+        raise  # Re-raise HTTP errors for expected cases
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unexpected error: {str(e)}")
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Report the status of a job ('queued', 'running', 'done' or 'failed') and the stages it went through.
+    """
+    return job_view(_get_job(job_id))
+
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(request: Request, job_id: str):
+    """
+    Return the analysis body of a finished job, encoded as /api/upload responses are.
+    """
+    job = _get_job(job_id)
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    if job["status"] != DONE:
+        raise HTTPException(status_code=400, detail=f"Unexpected error: {job['error']}")
+    return _encoded(request, job["result"])
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Stream the state of a job as Server-Sent Events: a 'progress' event whenever its status or
+    stage changes, then a final 'done' or 'failed' event.
+    """
+    _get_job(job_id)
+
+    async def events():
+        last = None
+        while True:
+            job = job_queue.store.get(job_id)
+            if job is None:  # Expired while followed
+                yield f"event: failed\ndata: {json.dumps({'job_id': job_id, 'error': 'Job expired'})}\n\n"
+                return
+            view = job_view(job)
+            if view != last:
+                event = job["status"] if job["status"] in FINISHED else "progress"
+                yield f"event: {event}\ndata: {json.dumps(view)}\n\n"
+                last = view
+            if job["status"] in FINISHED:
+                return
+            await asyncio.sleep(JOB_EVENTS_INTERVAL_SECS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/datasets", status_code=201)
+async def create_dataset(file: UploadFile):
+    """
+    Parse an export once and store its typed frame; returns the dataset id (a content hash) and metadata.
+
+    Storing the same export again returns the existing dataset.
+    """
+    try:
+        # Validate file type
+        if not file.filename.endswith(".csv"):
+            raise HTTPException(status_code=400, detail="Only .csv files are supported")
+
+        await file.seek(0)
+        dataset_id = (await run_in_threadpool(make_cache_key, file.file))[:32]
+        info = await run_in_threadpool(dataset_store.info, dataset_id)
+        if info is None:
+            source = await run_in_threadpool(file.file.read) if analysis_executor.uses_processes else file.file
+            info = await analysis_executor.run(store_dataset, source, dataset_store.directory, dataset_id)
+        return info
+    except HTTPException:
+        raise  # Re-raise HTTP errors for expected cases
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Analysis timed out")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unexpected error: {str(e)}")
+
+
+@router.get("/datasets/{dataset_id}")
+def get_dataset(dataset_id: str):
+    """
+    Return the row count, columns and size of a stored dataset.
+    """
+    return _get_dataset(dataset_id)
+
+
+@router.delete("/datasets/{dataset_id}", status_code=204)
+def delete_dataset(dataset_id: str):
+    """
+    Remove a stored dataset (and its resident frame).
+    """
+    _get_dataset(dataset_id)
+    dataset_registry.delete(dataset_id)
+    dataset_store.delete(dataset_id)
+
+
+@router.get("/datasets/{dataset_id}/analysis")
+async def analyze_stored_dataset(
+    request: Request,
+    dataset_id: str,
+    params: dict = Depends(analysis_query),
+):
+    """
+    Run the analysis of /api/upload on a stored dataset, without upload or CSV parsing.
+
+    The dataset's frame is kept resident in memory (see DatasetRegistry) after its first
+    analysis, so follow-up questions (other bins, distances, date ranges...) skip the file.
+    Datasets larger than the registry budget are read from the file, columns and rows as needed.
+    """
+    timer = StageTimer()
+    started = getattr(request.state, "started_at", None) or time.perf_counter()
+    try:
+        info = _get_dataset(dataset_id)
+
+        with timer.stage("cache_lookup"):
+            cache_key = make_dataset_cache_key(dataset_id, params)
+            result = analysis_cache.get(cache_key)
+        if result is not None:
+            return _timed_response(request, result, timer, started, None, cache_hit=True)
+
+        result = await _analyze_resident(timer, dataset_id, info, params)
+        analysis_cache.put(cache_key, result)
+        return _timed_response(request, result, timer, started, None)
+    except HTTPException:
+        raise  # Re-raise HTTP errors for expected cases
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Analysis timed out")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unexpected error: {str(e)}")
+
+
+def _get_dataset(dataset_id):
+    if not DATASET_ID_PATTERN.match(dataset_id):
+        raise HTTPException(status_code=400, detail="Invalid dataset_id")
+    info = dataset_store.info(dataset_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+    return info
+
+
+def _get_job(job_id):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+async def _analyze_resident(timer, dataset_id, info, params):
+    # Analysis of a dataset from its resident frame, loaded from the store (all columns, newest
+    # first) on a miss. Only the date range and the columns the sections read are handed to the
+    # executor. A dataset too large to be resident (its file alone exceeds the registry budget, or
+    # its frame was refused) is analyzed from the store, mapping in only those columns and rows
+    frame = dataset_registry.get(dataset_id)
+    if frame is None and (info["bytes"] > dataset_registry.max_bytes or dataset_registry.oversized(dataset_id)):
+        return await _run_timed(timer, analyze_dataset, dataset_store.directory, dataset_id, params)
+    if frame is None:
+        with timer.stage("read_dataset"):
+            frame = await run_in_threadpool(_load_resident, dataset_id)
+    with timer.stage("select_rows"):
+        data = await run_in_threadpool(_select_resident, frame, params)
+
+    dispatched = time.perf_counter()
+    result, stages, counters = await analysis_executor.run_on_frame(run_timed_on_frame, data, analyze, params)
+    timer.add("dispatch", max(0.0, time.perf_counter() - dispatched - sum(stages.values())))
+    timer.merge(stages, {**counters, "rows": len(data)})
+    return result
+
+
+def _load_resident(dataset_id):
+    # Whole stored frame, newest first (files stored without the order metadata may not be
+    # sorted, and select_dates binary-searches the dates), made resident: sizing it reads every
+    # value, so this runs in a thread like the load
+    frame = sort_by_date(dataset_store.load(dataset_id))
+    dataset_registry.put(dataset_id, frame)
+    return frame
+
+
+def _select_resident(frame, params):
+    # Date range and columns of one analysis of a resident frame (the column subset is a copy)
+    columns = required_columns(params)
+    data = select_dates(frame, params["date_start"], params["date_end"])
+    return data[[col for col in data.columns if col in columns]]
+
+
+def _kept(response, dataset_id):
+    # Response of /api/upload, carrying the id of the kept dataset with keep=true
+    if dataset_id is not None:
+        response.headers["X-Dataset-Id"] = dataset_id
+    return response
+
+
+async def _run_timed(timer, func, *args):
+    # Run an analysis job in the executor and merge the stages it measured into `timer`
+    dispatched = time.perf_counter()
+    result, stages, counters = await analysis_executor.run(run_timed, func, *args)
+    # Queueing and pickling around the job, on top of the stages measured in the worker
+    timer.add("dispatch", max(0.0, time.perf_counter() - dispatched - sum(stages.values())))
+    timer.merge(stages, counters)
+    return result
+
+
+def _spool_to_disk(stream):
+    # Copy an upload stream to a temporary file in fixed-size blocks and return its path
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as copy:
+        shutil.copyfileobj(stream, copy, 1024 * 1024)
+    return copy.name
+
+
+def _encoded(request, body):
+    # Negotiated encoding and compression of a JSON-ready body
+    return encode_response(body, request.headers.get("accept", ""), request.headers.get("accept-encoding", ""))
+
+
+def _timed_response(request, body, timer, started, upload_bytes, cache_hit=False):
+    # Encoded response carrying the stage timings, which are also recorded in upload_metrics
+    with timer.stage("encode"):
+        response = _encoded(request, body)
+    total = time.perf_counter() - started
+    response.headers["Server-Timing"] = f"{timer.server_timing()}, total;dur={total * 1000:.1f}"
+    upload_metrics.observe(timer, total, upload_bytes=upload_bytes, cache_hit=cache_hit)
+    return response
+
+
+def _update_incremental(dataset_id, source):
+    # Blocking part of upload_incremental, run in a thread: the per-dataset lock may wait on another worker
+    raw = read_activities(source)
+
+    with incremental_store.lock(dataset_id):
+        aggregates = incremental_store.load(dataset_id)
+        new_activities = aggregates.ingest(raw, prepare_activities)
+        if new_activities:
+            incremental_store.save(dataset_id, aggregates)
+        result = aggregates.results()
+
+    return {
+        "dataset_id": dataset_id,
+        "new_activities": new_activities,
+        "total_activities": len(aggregates.seen),
+        **result,
+    }
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    """
+    Report occupancy and hit/miss counters of the analysis result cache.
+    """
+    return analysis_cache.stats()
+
+
+@router.get("/registry/stats")
+def registry_stats():
+    """
+    Report occupancy, hit/miss counters, evictions and resident datasets of the dataset registry.
+    """
+    return dataset_registry.stats()
@@ -1,3 +1,5 @@
+import os
+
 data_cols = ['Date', 'Title', 'Distance', 'Calories',
              'Time', 'Avg HR', 'Max HR', 'Avg Run Cadence',
              'Max Run Cadence', 'Avg Pace', 'Best Pace', 'Total Ascent',
@@ -5,6 +7,18 @@ data_cols = ['Date', 'Title', 'Distance', 'Calories',
              'Best Lap Time', 'Moving Time',
              'Elapsed Time', 'Min Elevation', 'Max Elevation']
 
+# Parsing schema of data_cols: "str" columns are kept as text, "int64" columns become int64
+# when complete and whole (float64 otherwise); every other export column is skipped
+data_col_types = {'Date': 'str', 'Title': 'str', 'Distance': 'float64', 'Calories': 'int64',
+                  'Time': 'str', 'Avg HR': 'int64', 'Max HR': 'int64', 'Avg Run Cadence': 'int64',
+                  'Max Run Cadence': 'int64', 'Avg Pace': 'str', 'Best Pace': 'str', 'Total Ascent': 'int64',
+                  'Total Descent': 'int64', 'Avg Stride Length': 'float64',
+                  'Best Lap Time': 'str', 'Moving Time': 'str',
+                  'Elapsed Time': 'str', 'Min Elevation': 'int64', 'Max Elevation': 'int64'}
+
+# CSV parser of the uploads: "c" (pandas) or "pyarrow" (multi-threaded, needs pyarrow installed)
+csv_engine = os.getenv("RUNAPI_CSV_ENGINE", "c")
+
 desc_matrix_cols = ['Distance', 'Avg HR', 'Total Descent', 'Max HR', 'Avg Run Cadence', 'Max Run Cadence',
                     'Avg Stride Length', 'Time_in_secs', 'Avg_pace_secs', 'Hour_of_day', 'Calories', 'Best_pace_secs']
 
@@ -16,4 +30,61 @@ histogram_cols = ['Distance', 'Avg HR', 'Avg_pace_secs']
 
 main_distances = [1, 3.22, 4.83, 5, 6.44, 8.05, 10, 21.1]
 
+# Best performances: runs within +/- best_effort_tolerance km of a distance, best_effort_k per distance
+best_effort_tolerance = 0.02
+
+best_effort_k = 3
+
 time_series_cols = ['Avg_pace_secs', 'Avg HR']
+
+# Analysis result cache (byte budget of the in-memory LRU tier, optional on-disk tier)
+cache_max_bytes = int(os.getenv("RUNAPI_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+cache_dir = os.getenv("RUNAPI_CACHE_DIR") or None
+
+cache_disk_max_bytes = int(os.getenv("RUNAPI_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024))
+
+# Per-dataset activity logs and mergeable aggregates of the incremental upload mode
+incremental_dir = os.getenv("RUNAPI_INCREMENTAL_DIR", "data/incremental")
+
+# Pool running the analysis off the event loop: "process" or "thread", 0 workers = CPU allotment
+executor_kind = os.getenv("RUNAPI_EXECUTOR", "process")
+
+executor_workers = int(os.getenv("RUNAPI_EXECUTOR_WORKERS", 0))
+
+analysis_timeout_secs = float(os.getenv("RUNAPI_ANALYSIS_TIMEOUT_SECS", 120))
+
+# Streaming analysis of large uploads: rows per chunk, upload size switching to it, time series size
+stream_chunk_rows = int(os.getenv("RUNAPI_STREAM_CHUNK_ROWS", 50_000))
+
+stream_threshold_bytes = int(os.getenv("RUNAPI_STREAM_THRESHOLD_BYTES", 100 * 1024 * 1024))
+
+stream_max_points = int(os.getenv("RUNAPI_STREAM_MAX_POINTS", 2000))
+
+# Batch uploads (several CSVs or zip archives): files per request, uncompressed size of the CSVs
+batch_max_files = int(os.getenv("RUNAPI_BATCH_MAX_FILES", 50))
+
+batch_max_bytes = int(os.getenv("RUNAPI_BATCH_MAX_BYTES", 512 * 1024 * 1024))
+
+# Asynchronous jobs: pending jobs accepted, concurrent jobs, time limit, how long results are kept,
+# job store ("memory": this process only, "file": shared by the workers of a container) and its directory
+job_queue_size = int(os.getenv("RUNAPI_JOB_QUEUE_SIZE", 16))
+
+job_workers = int(os.getenv("RUNAPI_JOB_WORKERS", 0))
+
+job_timeout_secs = float(os.getenv("RUNAPI_JOB_TIMEOUT_SECS", 1800))
+
+job_ttl_secs = float(os.getenv("RUNAPI_JOB_TTL_SECS", 3600))
+
+job_store = os.getenv("RUNAPI_JOB_STORE", "memory")
+
+job_dir = os.getenv("RUNAPI_JOB_DIR", "data/jobs")
+
+# Typed frames of uploads stored for re-analysis (POST /api/datasets), as Arrow IPC files
+dataset_dir = os.getenv("RUNAPI_DATASET_DIR", "data/datasets")
+
+# Frames of stored datasets kept resident in memory for follow-up analyses: byte budget (as
+# measured by DataFrame.memory_usage(deep=True)) and idle time after which a frame is dropped
+registry_max_bytes = int(os.getenv("RUNAPI_REGISTRY_MAX_BYTES", 64 * 1024 * 1024))
+
+registry_ttl_secs = float(os.getenv("RUNAPI_REGISTRY_TTL_SECS", 1800))
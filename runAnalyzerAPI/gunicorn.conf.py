@@ -0,0 +1,39 @@
+"""
+Production server settings: `gunicorn -c gunicorn.conf.py main:app` (see the Dockerfile).
+
+Uvicorn workers are forked from a master that imported the app and ran the warm-up analysis
+once (preload_app), so they start ready and share the imported modules' pages. The number of
+workers follows the task's CPU and memory (RUNAPI_CPU_UNITS, RUNAPI_MEMORY_LIMIT_MIB, set by
+the CDK stack; the cgroup limits otherwise) unless RUNAPI_WORKERS is given.
+"""
+import os
+
+from utils import serving
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+worker_class = "uvicorn_worker.UvicornWorker"
+
+cpu_units = int(os.getenv("RUNAPI_CPU_UNITS", 0)) or None
+
+workers = int(os.getenv("RUNAPI_WORKERS", 0)) or serving.worker_count(
+    cpu_units=cpu_units,
+    memory_mib=int(os.getenv("RUNAPI_MEMORY_LIMIT_MIB", 0)) or None,
+    worker_memory_mib=int(os.getenv("RUNAPI_WORKER_MEMORY_MIB", 256)),
+)
+
+preload_app = True
+
+# Set before the app (and its config module) is imported: with several workers, a job must be
+# visible to whichever worker is asked about it, and each worker's analysis pool gets its share
+# of the CPUs
+if workers > 1:
+    os.environ.setdefault("RUNAPI_JOB_STORE", "file")
+os.environ.setdefault("RUNAPI_EXECUTOR_WORKERS", str(max(1, serving.task_cpus(cpu_units) // workers)))
+
+
+def when_ready(server):
+    # Runs in the master after the app was loaded, before the workers are forked
+    serving.warm_up()
+    server.log.info("Serving with %d workers, app imported in %.2fs, warmed up in %.2fs",
+                    workers, serving.readiness()["import_seconds"], serving.readiness()["warm_up_seconds"])
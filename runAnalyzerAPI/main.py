@@ -1,13 +1,35 @@
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from api.routes import router
+from fastapi.responses import JSONResponse, PlainTextResponse
+from api.routes import router, upload_metrics
+from utils import serving
+
+serving.record_import(time.perf_counter() - _import_started)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Warm up the analysis in the background: health checks are answered meanwhile, /ready is not.
+
+    Under gunicorn with preload_app the master warmed up before forking, so this returns at once.
+    """
+    asyncio.get_running_loop().run_in_executor(None, serving.warm_up)
+    yield
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Running Data Analysis API",
     description="API for analyzing running activity data, including metrics, histograms, and time series visualizations.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -19,6 +41,16 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+
+@app.middleware("http")
+async def mark_request_start(request: Request, call_next):
+    """
+    Record when a request started, before its body is received (the 'receive' stage of uploads).
+    """
+    request.state.started_at = time.perf_counter()
+    return await call_next(request)
+
+
 # Include routes from the api.routes module
 app.include_router(router, prefix="/api")
 
@@ -31,6 +63,31 @@ def root():
     return {"message": "Welcome to the Running Data Analysis API"}
 
 
+@app.get("/health")
+def health():
+    """
+    Liveness check: answered as soon as the app is loaded, without touching pandas.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness check: 503 until the warm-up analysis has run in this process.
+    """
+    state = serving.readiness()
+    return JSONResponse(content=state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Upload latency per stage, row counts, upload sizes and peak RSS in the Prometheus text format.
+    """
+    return PlainTextResponse(upload_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Explicitly handle OPTIONS preflight requests
 @app.options("/{full_path:path}")
 async def preflight_handler(full_path: str, request: Request):
@@ -0,0 +1,102 @@
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.data_prep import read_activities, parse_dates
+from utils.executor import cpu_allotment
+
+# Columns identifying an activity across overlapping exports
+DEDUPE_COLS = ['Date', 'Title', 'Distance']
+
+
+def expand_uploads(uploads, max_files, max_bytes):
+    """
+    Turn uploaded CSVs and zip archives into the list of CSV sources they hold.
+
+    Zip members are read into memory; their declared uncompressed sizes are checked against
+    `max_bytes` before anything is decompressed.
+
+    Args:
+        uploads (list): (filename, content) pairs; content is bytes or a binary file-like object.
+        max_files (int): Maximum number of CSVs in the batch.
+        max_bytes (int): Maximum total uncompressed size of the zipped CSVs.
+
+    Returns:
+        list: (name, source) pairs accepted by read_activities.
+
+    Raises:
+        ValueError: For unsupported files, empty batches or batches over the limits.
+    """
+    sources, unzipped = [], 0
+    for filename, content in uploads:
+        name = filename.lower()
+        if name.endswith(".csv"):
+            sources.append((filename, content))
+        elif name.endswith(".zip"):
+            archive = zipfile.ZipFile(io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content)
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith(".csv")
+                       and not info.filename.startswith("__MACOSX/")]
+            unzipped += sum(info.file_size for info in members)
+            if unzipped > max_bytes:
+                raise ValueError(f"Zipped CSVs exceed {max_bytes} bytes once uncompressed")
+            sources.extend((f"{filename}/{info.filename}", archive.read(info)) for info in members)
+        else:
+            raise ValueError(f"Only .csv and .zip files are supported: {filename}")
+
+        if len(sources) > max_files:
+            raise ValueError(f"A batch holds at most {max_files} CSV files")
+
+    if not sources:
+        raise ValueError("No CSV file in the upload")
+    return sources
+
+
+def read_batch(sources, max_workers=None):
+    """
+    Parse the CSV sources concurrently (the C parser releases the GIL while tokenizing).
+
+    Args:
+        sources (list): (name, source) pairs from expand_uploads.
+        max_workers (int): Parser threads (default: the container's CPU allotment).
+
+    Returns:
+        list: Raw activity frames, in the order of `sources`.
+    """
+    def read(item):
+        name, source = item
+        try:
+            return read_activities(source)
+        except Exception as e:
+            raise ValueError(f"{name}: {e}")
+
+    workers = min(len(sources), max_workers or cpu_allotment())
+    if workers <= 1:
+        return [read(item) for item in sources]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-parse") as pool:
+        return list(pool.map(read, sources))
+
+
+def merge_activities(frames):
+    """
+    Merge raw frames of overlapping exports into one, newest activity first.
+
+    Activities with the same Date, Title and Distance are kept once (the first occurrence).
+    Rows are then ordered by date like a single export, so that the time series read in order;
+    the parsed dates replace the raw text so that add_cols does not parse them again.
+
+    Args:
+        frames (list): Raw activity frames (read_activities output).
+
+    Returns:
+        pd.DataFrame: The merged raw frame, with a fresh RangeIndex.
+    """
+    merged = pd.concat(frames, ignore_index=True)
+    merged['Date'] = parse_dates(merged['Date'])
+
+    merged = merged[~merged.duplicated(subset=DEDUPE_COLS).to_numpy()]
+    # Stable, so that activities sharing a timestamp keep their upload order
+    merged = merged.sort_values('Date', ascending=False, kind='stable', na_position='last')
+    return merged.reset_index(drop=True)
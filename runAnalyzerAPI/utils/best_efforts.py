@@ -0,0 +1,49 @@
+import numpy as np
+from utils.utils_functions import json_ready_frame
+
+BEST_EFFORT_COLS = ['Date', 'Distance', 'Time', 'Avg Pace']
+
+
+def best_efforts(data, distances, tolerance=0.02, k=3, cols=BEST_EFFORT_COLS):
+    """
+    Find the k fastest runs (lowest 'Avg_pace_secs') around each target distance.
+
+    The runs are sorted by 'Distance' once; the window [target - tolerance, target + tolerance]
+    of every target is then located by binary search and only its k smallest paces are selected
+    (partition, no full sort), so many targets (e.g. every whole km) stay cheap on long histories.
+    Runs with a missing pace rank last; equal paces keep the order of the dataset.
+
+    Args:
+        data (pd.DataFrame): Dataset with 'Distance', 'Avg_pace_secs' and `cols`.
+        distances (list): Target distances in km.
+        tolerance (float): Half-width of the distance window in km.
+        k (int): Number of performances per distance.
+        cols (list): Columns of each returned record.
+
+    Returns:
+        dict: Distance -> list of up to k JSON-ready records, fastest first.
+    """
+    distance = data['Distance'].to_numpy(dtype=np.float64)
+    pace = data['Avg_pace_secs'].to_numpy(dtype=np.float64)
+    pace = np.where(np.isnan(pace), np.inf, pace)
+
+    order = np.argsort(distance, kind='stable')
+    sorted_distance = distance[order]
+    records = data[cols]
+
+    best_performances = {}
+    for target in distances:
+        # Same bounds as the inclusive mask (target - tol <= d <= target + tol)
+        lo = np.searchsorted(sorted_distance, target - tolerance, side='left')
+        hi = np.searchsorted(sorted_distance, target + tolerance, side='right')
+        rows = order[lo:hi]
+
+        if len(rows) > k:
+            # Keep every candidate up to the k-th smallest pace (ties included), then rank them
+            kth = np.partition(pace[rows], k - 1)[k - 1]
+            rows = rows[pace[rows] <= kth]
+        rows = rows[np.lexsort((rows, pace[rows]))][:k]
+
+        best_performances[target] = json_ready_frame(records.iloc[rows]).to_dict(orient='records')
+
+    return best_performances
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+# Size of the blocks read while hashing an upload
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Version of the analysis bodies, salting every result key: bump it whenever a change alters what an
+# analysis returns (sections, fields, values), so that results cached on disk by an older release
+# are never served (they age out of the disk tier)
+RESULT_VERSION = 4
+
+# Share of the disk budget the disk tier is trimmed down to once exceeded
+DISK_TRIM_RATIO = 0.9
+
+
+def _hash_params(digest, params):
+    digest.update(f"v{RESULT_VERSION}:".encode("ascii"))
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+
+
+def make_cache_key(file, params=None):
+    """
+    Build a content-addressed key for an uploaded file and the analysis parameters.
+
+    The stream is hashed in fixed-size blocks and rewound afterwards, so it can be handed
+    to the CSV parser on a miss without having been copied.
+
+    Args:
+        file: Binary file-like object (e.g. UploadFile.file).
+        params (dict): Everything else the result depends on (config lists, bins, ...).
+            Must be JSON serializable. Result keys (params given) are salted with
+            RESULT_VERSION; without params, the key is the SHA-256 of the content.
+
+    Returns:
+        str: Hex digest identifying the (content, parameters) pair.
+    """
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+        digest.update(block)
+    file.seek(0)
+
+    content_key = digest.hexdigest()
+    return content_key if params is None else make_content_cache_key(content_key, params)
+
+
+def make_content_cache_key(content_key, params=None):
+    """
+    Build the key of an analysis of content already hashed by make_cache_key(file), equal to
+    make_cache_key(file, params): an upload whose content hash is also needed (e.g. as a
+    dataset id) is read only once.
+    """
+    digest = hashlib.sha256(content_key.encode("ascii"))
+    _hash_params(digest, params)
+    return digest.hexdigest()
+
+
+def make_batch_cache_key(files, params=None):
+    """
+    Build a content-addressed key for a batch of uploaded files and the analysis parameters.
+
+    Each file is hashed as in make_cache_key, in upload order; the key differs from the one of
+    a single-file upload of the same content, whose response body has another shape.
+
+    Args:
+        files (list): Binary file-like objects.
+        params (dict): Analysis parameters (JSON serializable).
+
+    Returns:
+        str: Hex digest identifying the (contents, parameters) pair.
+    """
+    digest = hashlib.sha256(b"batch")
+    for file in files:
+        digest.update(make_cache_key(file).encode("ascii"))
+    _hash_params(digest, params)
+    return digest.hexdigest()
+
+
+def make_dataset_cache_key(dataset_id, params=None):
+    """
+    Build the key of an analysis of a stored dataset (ids are content hashes, so never reused).
+    """
+    digest = hashlib.sha256(f"dataset:{dataset_id}".encode("utf-8"))
+    _hash_params(digest, params)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    LRU cache of analysis results bounded by a byte budget, with an optional on-disk tier.
+
+    Entries are sized by their pickled length. The memory tier evicts least recently used
+    entries once the budget is exceeded. The disk tier (if a directory is configured) keeps
+    results across container restarts within its own budget, `disk_max_bytes`: files are
+    touched when read, and the least recently used ones are deleted once the directory
+    (possibly shared by several workers) outgrows it. Disk hits are promoted back into memory.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._trim_disk(self.disk_max_bytes)
+
+    def get(self, key):
+        """
+        Return the cached result for `key`, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        payload = self._read_disk(key)
+        if payload is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        value = pickle.loads(payload)
+        with self._lock:
+            self.disk_hits += 1
+            self._store(key, value, len(payload))
+        return value
+
+    def put(self, key, value):
+        """
+        Store a result in memory (subject to the byte budget) and on disk if enabled.
+        """
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, value, len(payload))
+        self._write_disk(key, payload)
+
+    def clear(self):
+        """
+        Drop every in-memory entry (the disk tier is left untouched).
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Return occupancy and hit/miss counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "disk_tier": bool(self.disk_dir),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes if self.disk_dir else None,
+                "disk_evictions": self.disk_evictions,
+            }
+
+    def _store(self, key, value, size):
+        # Caller holds the lock
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return  # Larger than the whole budget: only the disk tier can keep it
+
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                payload = f.read()
+            os.utime(self._path(key))  # Most recently used
+            return payload
+        except FileNotFoundError:  # Never written, or evicted meanwhile
+            return None
+
+    def _write_disk(self, key, payload):
+        if not self.disk_dir or len(payload) > self.disk_max_bytes:
+            return
+        # Write to a private temporary name, then publish atomically
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            self._disk_bytes += len(payload)
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._trim_disk(int(self.disk_max_bytes * DISK_TRIM_RATIO))
+
+    def _trim_disk(self, target):
+        # Other workers write to the same directory: measure it, then delete the least recently
+        # used files (oldest mtime) until it holds at most `target` bytes
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except FileNotFoundError:  # Removed by another worker
+                pass
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+            self.disk_evictions += evicted
@@ -1,15 +1,143 @@
+import io
+import re
+import numpy as np
 import pandas as pd
-from io import StringIO
-from utils.utils_functions import hms_to_secs
-from config import data_cols
+from pandas.tseries.api import guess_datetime_format
+from utils.durations import parse_durations
+from utils.rolling import moving_average
+from utils.timing import stage, count
+from config import data_cols, data_col_types, csv_engine
 
+# Placeholder of the export for a missing value (e.g. 'Best Pace' of a run without GPS)
+MISSING_VALUES = ['--']
 
-def add_cols(data):
+# Columns read as text and as numbers, per config.data_col_types
+_text_cols = [col for col in data_cols if data_col_types[col] == 'str']
+_numeric_cols = [col for col in data_cols if data_col_types[col] != 'str']
+
+# pandas C parser settings of the schema; whole-number columns are read as float64 so that a
+# missing value does not fail the parse (_apply_schema narrows them back to int64)
+_c_parser_options = {
+    'encoding': 'utf-8',
+    'usecols': data_cols,
+    'dtype': {**{col: str for col in _text_cols}, **{col: 'float64' for col in _numeric_cols}},
+    'thousands': ',',
+    'na_values': MISSING_VALUES,
+}
+
+# Date format detected per layout of the 'Date' values (digits masked), e.g. '0000-00-00 00:00:00'
+_date_formats = {}
+
+
+def detect_date_format(sample):
+    """
+    Return the strftime format of a date string, detected once per layout and then cached.
+
+    Args:
+        sample (str): A value of the 'Date' column.
+
+    Returns:
+        str: The format, or None if it could not be guessed.
+    """
+    layout = re.sub(r'\d', '0', sample)
+    if layout not in _date_formats:
+        _date_formats[layout] = guess_datetime_format(sample)
+    return _date_formats[layout]
+
+
+def parse_dates(values):
+    """
+    Parse date strings with the format detected from the first value (no per-row guessing).
+
+    Values in another layout fall back to pandas' mixed-format parsing; unparseable values are NaT.
+
+    Args:
+        values (pd.Series): Date strings (datetime64 values are returned as they are).
+
+    Returns:
+        pd.Series: datetime64 values.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):  # Already parsed (e.g. merged batch uploads)
+        return values
+
+    first = values.first_valid_index()
+    date_format = detect_date_format(str(values[first])) if first is not None else None
+    if date_format is None:
+        return pd.to_datetime(values, errors='coerce')
+
+    dates = pd.to_datetime(values, format=date_format, errors='coerce')
+    unparsed = dates.isna() & values.notna()
+    if unparsed.any():
+        dates[unparsed] = pd.to_datetime(values[unparsed], format='mixed', errors='coerce')
+    return dates
+
+
+def _checked_dates(data):
+    # Parsed 'Date' column; every activity needs a valid date
+    dates = parse_dates(data['Date'])
+    if dates.isna().any():
+        raise ValueError("Invalid or missing values in the 'Date' column.")
+    return dates
+
+
+# Hour_of_day categories: codes take one byte per row, and like the former text column the
+# hour stays out of describe() (and so out of the descriptive matrix)
+HOUR_CATEGORIES = pd.CategoricalDtype(categories=range(24))
+
+# Calculated fields: column -> (columns it is derived from, function of the frame). Entries are
+# in dependency order; 'Date' stands for the parsed dates, which replace the raw text. Calendar
+# fields are small integers (or categorical codes) and Short_date a day-precision datetime, text
+# being produced only when a result is serialized. The *_MA_30 columns are 30-day calendar means
+# in date order, whatever the order of the export (see utils.rolling)
+DERIVED_COLS = {
+    'Date': ([], _checked_dates),
+    'Short_date': (['Date'], lambda data: data['Date'].dt.normalize()),
+    'Distance_in_miles': ([], lambda data: (data['Distance'] / 1.609344).astype(np.float32)),
+    'Time_in_secs': ([], lambda data: parse_durations(data['Time'], keep_fraction=False)),
+    'Avg_pace_secs': ([], lambda data: parse_durations(data['Avg Pace'], keep_fraction=False)),
+    'Best_pace_secs': ([], lambda data: parse_durations(data['Best Pace'], keep_fraction=False)),
+    'Hour_of_day': (['Date'], lambda data: data['Date'].dt.hour.astype(HOUR_CATEGORIES)),
+    'Month': (['Date'], lambda data: data['Date'].dt.month.astype(np.int8)),
+    'Month_Year': (['Date'], lambda data: data['Date'].dt.to_period('M')),
+    'Day_of_week': (['Date'], lambda data: data['Date'].dt.dayofweek.astype(np.int8)),
+    'Pace_MA_30': (['Date', 'Avg_pace_secs'], lambda data: moving_average(data, 'Avg_pace_secs')),
+    'Avg_HR_MA_30': (['Date'], lambda data: moving_average(data, 'Avg HR')),
+    'Year': (['Date'], lambda data: data['Date'].dt.year.astype(np.int16)),
+}
+
+
+def resolve_derived_cols(columns=None):
+    """
+    Return the calculated fields needed to provide `columns`, dependencies first.
+
+    Args:
+        columns (iterable): Columns an output reads; raw export columns are ignored.
+            None means every calculated field.
+
+    Returns:
+        list: Keys of DERIVED_COLS, in the order they must be computed.
+    """
+    if columns is None:
+        return list(DERIVED_COLS)
+
+    needed = set()
+    pending = [col for col in columns if col in DERIVED_COLS]
+    while pending:
+        col = pending.pop()
+        if col not in needed:
+            needed.add(col)
+            pending.extend(DERIVED_COLS[col][0])
+    return [col for col in DERIVED_COLS if col in needed]
+
+
+def add_cols(data, columns=None):
     """
     Add calculated fields to the DataFrame.
 
     Args:
         data (pd.DataFrame): The input dataset.
+        columns (iterable): Columns the caller will read; only the calculated fields they
+            depend on are built (see DERIVED_COLS). None builds all of them.
 
     Returns:
         pd.DataFrame: The updated dataset with additional fields.
@@ -17,26 +145,8 @@ def add_cols(data):
     # Ensure you're working with a copy of the DataFrame
     data = data.copy()
 
-    # Convert 'Date' column to datetime and handle errors
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-
-    # Ensure no invalid dates remain
-    if data['Date'].isna().any():
-        raise ValueError("Invalid or missing values in the 'Date' column.")
-
-    # Create new columns
-    data.loc[:, 'Short_date'] = data['Date'].dt.strftime('%Y-%m-%d')
-    data.loc[:, 'Distance_in_miles'] = data['Distance'] / 1.609344
-    data.loc[:, 'Time_in_secs'] = hms_to_secs(data['Time'])
-    data.loc[:, 'Avg_pace_secs'] = hms_to_secs(data['Avg Pace'])
-    data.loc[:, 'Best_pace_secs'] = hms_to_secs(data['Best Pace'])
-    data.loc[:, 'Hour_of_day'] = data['Date'].dt.hour
-    data.loc[:, 'Month'] = data['Date'].dt.month.astype(str)
-    data.loc[:, 'Month_Year'] = data['Date'].dt.to_period('M')
-    data.loc[:, 'Day_of_week'] = data['Date'].dt.dayofweek
-    data.loc[:, 'Pace_MA_30'] = data['Avg_pace_secs'].rolling(30).mean()
-    data.loc[:, 'Avg_HR_MA_30'] = data['Avg HR'].rolling(30).mean()
-    data.loc[:, 'Year'] = data['Date'].dt.year
+    for col in resolve_derived_cols(columns):
+        data[col] = DERIVED_COLS[col][1](data)
 
     return data
 
@@ -47,37 +157,159 @@ def fix_types(data):
     :param data:
     :return:
     """
-    data['Hour_of_day'] = data['Hour_of_day'].astype(str)
-    data['Day_of_week'] = data['Day_of_week'].astype(str)
-    data['Calories'] = data['Calories'].replace(',', '', regex=True).astype(int)
+    # Few distinct titles ("Morning Run", ...): one code per row instead of a string object
+    data['Title'] = data['Title'].astype('category')
+    if data['Calories'].dtype == object:  # Frames not read through read_activities' schema
+        data['Calories'] = data['Calories'].replace(',', '', regex=True)
+    data['Calories'] = data['Calories'].astype(int)
     data['Distance'] = data['Distance'].astype(float)
     return data
 
 
-def load_data(file):
+def read_activities(file, engine=None):
+    """
+    Read the raw activity columns (config.data_cols) from a CSV file or file-like object.
+
+    Only data_cols are parsed, with the types of config.data_col_types: thousands separators
+    are removed and '--' placeholders become missing values.
+
+    Args:
+        file: Can be a binary file-like object (e.g. UploadFile.file), bytes or a file path (str).
+        engine (str): CSV parser, "c" or "pyarrow" (config.csv_engine when None).
+
+    Returns:
+        pd.DataFrame: The data_cols subset of the export, in data_cols order.
+    """
+    if isinstance(file, (bytes, bytearray, memoryview)):  # Raw upload content (e.g. sent to a worker process)
+        file = io.BytesIO(file)
+
+    if (engine or csv_engine) == 'pyarrow':
+        data = _read_csv_arrow(file)
+    else:
+        data = pd.read_csv(file, **_c_parser_options)
+
+    return _apply_schema(data[data_cols])
+
+
+def iter_activities(file, chunk_rows):
+    """
+    Read the raw activity columns in chunks of `chunk_rows` rows, with read_activities' schema.
+
+    Only the chunk being processed is held in memory. Chunked reads always use the C parser.
+
+    Args:
+        file: Can be a binary file-like object (e.g. UploadFile.file), bytes or a file path (str).
+        chunk_rows (int): Rows per chunk.
+
+    Yields:
+        pd.DataFrame: Consecutive data_cols chunks of the export.
+    """
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        file = io.BytesIO(file)
+
+    with pd.read_csv(file, chunksize=chunk_rows, **_c_parser_options) as reader:
+        for chunk in reader:
+            yield _apply_schema(chunk[data_cols])
+
+
+def _read_csv_arrow(file):
+    # Multi-threaded arrow parser, imported on first use. Text columns are typed up front (arrow
+    # would otherwise turn durations into times); numeric columns holding thousands separators,
+    # which arrow does not support, come back as text and are converted here when they can be
+    # (by _apply_schema otherwise)
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=data_cols,
+        column_types={col: pa.string() for col in _text_cols},
+        null_values=pa_csv.ConvertOptions().null_values + MISSING_VALUES,
+        strings_can_be_null=True,
+    )
+    table = pa_csv.read_csv(file, convert_options=convert_options)
+
+    for col in data_cols:
+        column = table.column(col)
+        if col in _numeric_cols and pa.types.is_string(column.type):
+            try:
+                column = pc.cast(pc.replace_substring(column, ',', ''), pa.float64())
+            except pa.ArrowInvalid:
+                continue
+            table = table.set_column(table.schema.get_field_index(col), col, column)
+
+    # Missing text as NaN rather than None, as the C parser returns it
+    data = table.to_pandas()
+    for col in _text_cols:
+        if table.column(col).null_count:
+            data[col] = data[col].where(data[col].notna(), np.nan)
+    return data
+
+
+def _apply_schema(data):
+    # Numeric columns the parser left as text, then float64 (int64 for complete whole numbers)
+    for col in _numeric_cols:
+        column = data[col]
+        if column.dtype == object:
+            column = pd.to_numeric(column.str.replace(',', '', regex=False), errors='coerce')
+        values = column.to_numpy(dtype=np.float64)
+        if data_col_types[col] == 'int64' and not np.isnan(values).any() and np.array_equal(values, np.trunc(values)):
+            values = values.astype(np.int64)
+        data[col] = values
+    return data
+
+
+def prepare_activities(datap, columns=None):
+    """
+    Type the raw activity columns and add the calculated fields.
+
+    Args:
+        datap (pd.DataFrame): Output of read_activities.
+        columns (iterable): Columns the analysis will read (None: every calculated field).
+
+    Returns:
+        pd.DataFrame: Dataset ready for the metric functions.
+    """
+    with stage('add_cols'):
+        datap_out = add_cols(datap, columns)
+    with stage('fix_types'):
+        datap_out = fix_types(datap_out)
+    return datap_out
+
+
+def sort_by_date(data):
+    """
+    Order activities newest first, as Garmin exports list them, with a fresh RangeIndex.
+
+    Frames already in that order (nearly every export) are returned as they are. The sorted
+    'Date' column is what utils.date_range.select_dates binary-searches.
+    """
+    if data['Date'].is_monotonic_decreasing:
+        return data
+    return data.sort_values('Date', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def load_data(file, columns=None):
     """
     Load running activity data from a CSV file or file-like object.
 
     Args:
-        file: Can be a file-like object (from UploadFile) or a file path (str).
+        file: Can be a binary file-like object (e.g. UploadFile.file), bytes or a file path (str).
+        columns (iterable): Columns the analysis will read; calculated fields nothing depends
+            on are skipped. None adds all of them.
 
     Returns:
-        A Pandas DataFrame containing the loaded data.
+        A Pandas DataFrame containing the loaded data, newest activity first (see sort_by_date).
     """
     try:
-        if isinstance(file, str):  # If file is a path
-            data = pd.read_csv(file)
-            datap = data[data_cols]
-            datap_out = add_cols(datap)
-            datap_out = fix_types(datap_out)
-        else:  # If file is a file-like object
-            content = file.read().decode('utf-8')  # Decode byte content to string
-            data = pd.read_csv(StringIO(content))  # Use StringIO to read as a DataFrame
-            datap = data[data_cols]
-            datap_out = add_cols(datap)
-            datap_out = fix_types(datap_out)
-
-        print(f"Loaded data with shape: {data.shape}")
+        with stage('read_csv'):
+            datap = read_activities(file)
+        count('rows', len(datap))
+        datap_out = prepare_activities(datap, columns)
+        if pd.api.types.is_datetime64_any_dtype(datap_out['Date']):
+            datap_out = sort_by_date(datap_out)
+
+        print(f"Loaded data with shape: {datap.shape}")
         return datap_out
     except Exception as e:
         raise ValueError(f"Error loading file: {e}")
@@ -0,0 +1,118 @@
+import os
+import threading
+
+import numpy as np
+
+from utils.date_range import in_range, row_range
+from utils.incremental import DATASET_ID_PATTERN
+
+# Schema metadata of files whose rows are newest first (load_data output), which date ranges
+# are binary-searched in; files stored before it are filtered with a mask
+ORDER_METADATA = {b"runapi.order": b"date-descending"}
+
+
+class DatasetStore:
+    """
+    Typed activity frames (load_data output) stored as Arrow IPC files, one per dataset id.
+
+    Files are written uncompressed so that they can be memory-mapped: a read touches only the
+    pages of the requested columns (and rows, for a date range). pyarrow is imported on first use.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def save(self, dataset_id, frame):
+        """
+        Atomically write a frame and return the dataset's metadata.
+        """
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(dataset_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if frame['Date'].is_monotonic_decreasing:
+            table = table.replace_schema_metadata({**table.schema.metadata, **ORDER_METADATA})
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+        return self.info(dataset_id)
+
+    def load(self, dataset_id, columns=None, start=None, end=None):
+        """
+        Read a stored frame, memory-mapped, restricted to `columns` (stored ones only; None: all)
+        and to the activities of the days [start, end] ("YYYY-MM-DD"; None: unbounded).
+
+        The rows of a date range are sliced out of the mapped table before they are converted,
+        so a narrow range costs time in proportion to its rows.
+
+        Raises:
+            KeyError: If the dataset does not exist.
+        """
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        path = self._path(dataset_id)
+        if not os.path.exists(path):
+            raise KeyError(dataset_id)
+        if columns is not None:
+            stored = self._schema(path).names
+            columns = [col for col in stored if col in set(columns)]
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        if start is not None or end is not None:
+            table = self._select_dates(path, table, start, end)
+        data = table.to_pandas()
+
+        # Missing text as NaN rather than None, as load_data returns it
+        for col in table.column_names:
+            if pa.types.is_string(table.column(col).type) and table.column(col).null_count:
+                data[col] = data[col].where(data[col].notna(), np.nan)
+        return data
+
+    def info(self, dataset_id):
+        """
+        Return the id, row count, columns and file size of a stored dataset, or None.
+        """
+        path = self._path(dataset_id)
+        if not os.path.exists(path):
+            return None
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            columns = reader.schema.names
+        return {"dataset_id": dataset_id, "rows": rows, "columns": columns, "bytes": os.path.getsize(path)}
+
+    def delete(self, dataset_id):
+        """
+        Remove a stored dataset; return whether it existed.
+        """
+        try:
+            os.remove(self._path(dataset_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _select_dates(self, path, table, start, end):
+        import pyarrow.feather as feather
+
+        dates = feather.read_table(path, columns=["Date"], memory_map=True).column("Date")
+        timestamps = dates.to_numpy().astype("datetime64[ns]", copy=False).view(np.int64)
+        if ORDER_METADATA.items() <= (self._schema(path).metadata or {}).items():
+            first, stop = row_range(timestamps, start, end)
+            return table.slice(first, stop - first)
+        return table.filter(in_range(timestamps, start, end))
+
+    def _schema(self, path):
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).schema
+
+    def _path(self, dataset_id):
+        if not DATASET_ID_PATTERN.match(dataset_id):
+            raise ValueError("dataset_id must be 1-64 characters of letters, digits, '_' or '-'")
+        return os.path.join(self.directory, f"{dataset_id}.arrow")
+
@@ -0,0 +1,85 @@
+import bisect
+import operator
+from datetime import date
+
+import numpy as np
+
+NS_PER_DAY = 86_400 * 10**9
+
+
+def date_bounds(start=None, end=None, year=None):
+    """
+    Resolve the date filters of a request into an inclusive range of days.
+
+    Args:
+        start (str): First day, "YYYY-MM-DD" (None: unbounded).
+        end (str): Last day, included (None: unbounded).
+        year (int): Shorthand for the days of one calendar year; exclusive with start/end.
+
+    Returns:
+        tuple: (start, end) as "YYYY-MM-DD" strings or None.
+
+    Raises:
+        ValueError: For an invalid date, a year combined with start/end or end before start.
+    """
+    if year is not None:
+        if start is not None or end is not None:
+            raise ValueError("year cannot be combined with start or end")
+        start, end = f"{year:04d}-01-01", f"{year:04d}-12-31"
+    start = date.fromisoformat(str(start)).isoformat() if start is not None else None
+    end = date.fromisoformat(str(end)).isoformat() if end is not None else None
+    if start is not None and end is not None and end < start:
+        raise ValueError("end must not be before start")
+    return start, end
+
+
+def _nanoseconds(day):
+    return (date.fromisoformat(day) - date(1970, 1, 1)).days * NS_PER_DAY
+
+
+def row_range(timestamps, start=None, end=None):
+    """
+    Binary-search the rows of the days [start, end] in dates sorted newest first.
+
+    Args:
+        timestamps (np.ndarray): int64 nanoseconds in decreasing order (a view of the 'Date'
+            column load_data sorts; nothing is copied).
+        start (str): First day, "YYYY-MM-DD" (None: unbounded).
+        end (str): Last day, included (None: unbounded).
+
+    Returns:
+        tuple: (first, stop) positions of the contiguous block of rows in the range.
+    """
+    # Negated, the timestamps increase: each bound is O(log n) comparisons of single elements
+    first = 0 if end is None else \
+        bisect.bisect_right(timestamps, -(_nanoseconds(end) + NS_PER_DAY), key=operator.neg)
+    stop = len(timestamps) if start is None else \
+        bisect.bisect_right(timestamps, -_nanoseconds(start), key=operator.neg)
+    return first, max(first, stop)
+
+
+def in_range(timestamps, start=None, end=None):
+    """
+    Boolean mask of the rows of the days [start, end], for dates in any order.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    mask = np.ones(len(timestamps), dtype=bool)
+    if start is not None:
+        mask &= timestamps >= _nanoseconds(start)
+    if end is not None:
+        mask &= timestamps < _nanoseconds(end) + NS_PER_DAY
+    return mask
+
+
+def select_dates(data, start=None, end=None):
+    """
+    Return the activities of the days [start, end] of a frame sorted newest first (as load_data
+    returns it): a positional slice found by binary search, sharing the frame's memory, so that
+    a narrow range costs time in proportion to its rows rather than to the whole history.
+    """
+    if start is None and end is None:
+        return data
+    timestamps = data['Date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    first, stop = row_range(timestamps, start, end)
+    return data.iloc[first:stop]
+
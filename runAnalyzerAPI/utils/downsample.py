@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Select `n_out` points of a series with Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; the points in between are split into
+    n_out - 2 buckets and, in each bucket, the point forming the largest triangle with the
+    previously selected point and the average of the next bucket is kept. This preserves
+    peaks and the overall shape far better than taking every n-th point.
+
+    Args:
+        x (np.ndarray): Monotonic x coordinates (e.g. timestamps).
+        y (np.ndarray): Values, without NaN.
+        n_out (int): Number of points to keep (at least 3).
+
+    Returns:
+        np.ndarray: Sorted indices of the selected points (all indices if len(x) <= n_out).
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket boundaries over the points between the first and the last one
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average point of the next bucket (the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Twice the triangle areas (a, candidate, next average); the constant factor is irrelevant
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Unicode code points used by the parser
+_ZERO, _NINE = ord("0"), ord("9")
+_COLON, _DOT, _SPACE = ord(":"), ord("."), ord(" ")
+
+
+def parse_durations(values, keep_fraction=True):
+    """
+    Parse a column of Garmin durations ('H:M:S', 'M:S', optional fractional seconds) into seconds.
+
+    The whole column is parsed at once: the strings are laid out as a fixed-width matrix of
+    code points and the digits are accumulated column by column, so the cost is a handful of
+    NumPy operations per character position instead of Python work per row.
+    Placeholders such as '--', empty cells and anything that is not a duration become NaN.
+
+    Args:
+        values (pd.Series | array-like): Duration strings.
+        keep_fraction (bool): Keep the fractional part of the seconds. When False the
+            decimals are dropped, matching the legacy hms_to_secs behaviour.
+
+    Returns:
+        pd.Series: Durations in seconds, aligned with the input index. float64, except whole
+        seconds without any missing value, which stay int64 like the legacy parser returned.
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    raw = np.asarray(values, dtype=object)
+    missing = pd.isna(raw)
+    if missing.any():
+        raw = np.where(missing, "", raw)
+
+    text = raw.astype(str)
+    n, width = len(text), text.dtype.itemsize // 4
+    if n == 0 or width == 0:
+        return pd.Series(np.full(n, np.nan), index=index, dtype="float64")
+
+    # One row per value, one uint32 code point per character (NUL padded)
+    chars = text.view(np.uint32).reshape(n, width)
+
+    total = np.zeros(n)
+    current = np.zeros(n)
+    fraction = np.zeros(n)
+    scale = np.ones(n)
+    in_fraction = np.zeros(n, dtype=bool)
+    colons = np.zeros(n, dtype=np.int8)
+    invalid = missing.copy()
+
+    for j in range(width):
+        ch = chars[:, j]
+        is_digit = (ch >= _ZERO) & (ch <= _NINE)
+        digit = ch.astype(np.float64) - _ZERO
+
+        whole = is_digit & ~in_fraction
+        current[whole] = current[whole] * 10 + digit[whole]
+
+        decimal = is_digit & in_fraction
+        scale[decimal] *= 0.1
+        fraction[decimal] += digit[decimal] * scale[decimal]
+
+        # A colon closes the current sexagesimal field
+        is_colon = ch == _COLON
+        total[is_colon] = (total[is_colon] + current[is_colon]) * 60
+        current[is_colon] = 0
+        colons += is_colon
+        invalid |= is_colon & in_fraction
+
+        is_dot = ch == _DOT
+        invalid |= is_dot & in_fraction
+        in_fraction |= is_dot
+
+        invalid |= ~(is_digit | is_colon | is_dot | (ch == 0) | (ch == _SPACE))
+
+    seconds = total + current
+    if keep_fraction:
+        seconds += fraction
+
+    # A bare number is not a duration (the legacy parser needed at least 'M:S')
+    invalid |= colons == 0
+    if not keep_fraction and not invalid.any():
+        return pd.Series(seconds.astype(np.int64), index=index)
+    seconds[invalid] = np.nan
+
+    return pd.Series(seconds, index=index, dtype="float64")
+
+
+def format_durations(seconds):
+    """
+    Format a column of durations in seconds as 'HH:MM:SS.ss' (or 'MM:SS.ss' under one hour).
+
+    Vectorized counterpart of secs_to_hms producing the same strings: the 'MM:SS.ss' part is
+    assembled as a fixed-width byte matrix, so only rows of an hour or more need any string work.
+
+    Args:
+        seconds (pd.Series | array-like): Durations in seconds.
+
+    Returns:
+        pd.Series | np.ndarray: Formatted strings (None for missing values), a Series aligned
+        with the input when a Series is given.
+    """
+    index = seconds.index if isinstance(seconds, pd.Series) else None
+    secs = np.atleast_1d(np.asarray(seconds, dtype=np.float64))
+    missing = np.isnan(secs)
+
+    if (secs[~missing] < 0).any():
+        raise ValueError("Seconds cannot be negative")
+
+    secs = np.where(missing, 0.0, secs)
+    hours = (secs // 3600).astype(np.int64)
+    minutes = ((secs % 3600) // 60).astype(np.int64)
+    remaining = secs % 60
+
+    # Round to hundredths; values sitting on a half-cent tie defer to Python's exact rounding
+    scaled = remaining * 100
+    cents = np.rint(scaled)
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        cents[ties] = [round(float(f"{r:.2f}") * 100) for r in remaining[ties]]
+    whole, hundredths = np.divmod(cents.astype(np.int64), 100)  # like '%05.2f', 59.999 -> '60.00'
+
+    chars = np.stack([
+        minutes // 10, minutes % 10, np.full_like(minutes, _COLON - _ZERO),
+        whole // 10, whole % 10, np.full_like(whole, _DOT - _ZERO),
+        hundredths // 10, hundredths % 10,
+    ], axis=1) + _ZERO
+    formatted = chars.astype(np.uint8).view("S8").ravel().astype(str).astype(object)
+
+    long = hours > 0
+    if long.any():
+        hh = np.char.zfill(hours[long].astype(str), 2)
+        formatted[long] = np.char.add(np.char.add(hh, ":"), formatted[long].astype(str))
+    formatted[missing] = None
+
+    if index is not None:
+        return pd.Series(formatted, index=index)
+    return formatted
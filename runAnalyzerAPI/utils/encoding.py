@@ -0,0 +1,165 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is used when brotli is not installed
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: the columnar encoding is only offered when msgpack is installed
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/x-msgpack"
+
+# MessagePack extension type of a little-endian float64 array (see decodeFloat64Array in web-ui/script.js)
+FLOAT64_ARRAY_EXT = 1
+
+# Sections sent as typed arrays in the columnar encoding
+COLUMNAR_SECTIONS = ("time_series_data", "histogram_data")
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def parse_accept_header(header):
+    """
+    Parse an Accept / Accept-Encoding header into {token: quality}.
+    """
+    accepted = {}
+    for part in (header or "").split(","):
+        token, *params = [item.strip() for item in part.split(";")]
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[token.lower()] = quality
+    return accepted
+
+
+def negotiate_content_encoding(accept_encoding):
+    """
+    Pick the compression for a response: 'br' (if brotli is installed), 'gzip' or None.
+    """
+    accepted = parse_accept_header(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def wants_columnar(accept):
+    """
+    Whether the client opted into the MessagePack columnar encoding (and it is available).
+    """
+    accepted = parse_accept_header(accept)
+    return msgpack is not None and accepted.get(COLUMNAR_MEDIA_TYPE, 0.0) > 0 and \
+        accepted[COLUMNAR_MEDIA_TYPE] >= accepted.get(JSON_MEDIA_TYPE, 0.0)
+
+
+def _float64_array(values):
+    return msgpack.ExtType(FLOAT64_ARRAY_EXT, np.asarray(values, dtype="<f8").tobytes())
+
+
+def _columnar_dates(values):
+    # Date strings as epoch milliseconds (NaN where unparseable)
+    dates = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+    millis = dates.to_numpy(dtype="datetime64[ms]").astype(np.int64).astype(np.float64)
+    millis[dates.isna().to_numpy()] = np.nan
+    return _float64_array(millis)
+
+
+def _columnar_series(series):
+    # One chart series: numeric lists become typed arrays (None as NaN)
+    if not isinstance(series, dict):
+        return series
+    packed = {}
+    for key, values in series.items():
+        if isinstance(values, list):
+            packed[key] = _float64_array(values)
+        else:
+            packed[key] = values
+    return packed
+
+
+def _json_keys(value):
+    # Map keys as JSON would write them (e.g. the best-performance distances)
+    if isinstance(value, dict):
+        return {key if isinstance(key, str) else json.dumps(key): _json_keys(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_keys(item) for item in value]
+    return value
+
+
+def encode_columnar(body):
+    """
+    Serialize a response body to MessagePack, with the chart sections as float64 typed arrays.
+
+    Time series dates (the axis shared by the series) are sent as epoch milliseconds; every
+    other section keeps its JSON shape.
+    """
+    packed = {}
+    for section, value in body.items():
+        if section in COLUMNAR_SECTIONS and isinstance(value, dict):
+            packed[section] = {name: _columnar_dates(series) if name == "dates" else _columnar_series(series)
+                               for name, series in value.items()}
+        else:
+            packed[section] = _json_keys(value)
+    return msgpack.packb(packed, use_bin_type=True)
+
+
+def compress(content, coding):
+    """
+    Compress a body with the negotiated content coding.
+    """
+    if coding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    if coding == "gzip":
+        return gzip.compress(content, compresslevel=GZIP_LEVEL)
+    return content
+
+
+def encode_response(body, accept="", accept_encoding=""):
+    """
+    Build the response for an analysis body according to the request's Accept headers.
+
+    Args:
+        body (dict): JSON-ready response body.
+        accept (str): Accept header; 'application/x-msgpack' selects the columnar encoding.
+        accept_encoding (str): Accept-Encoding header; selects brotli or gzip compression.
+
+    Returns:
+        Response: Encoded (and possibly compressed) response.
+    """
+    if wants_columnar(accept):
+        content, media_type = encode_columnar(body), COLUMNAR_MEDIA_TYPE
+    else:
+        content = json.dumps(body, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        media_type = JSON_MEDIA_TYPE
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    coding = negotiate_content_encoding(accept_encoding) if len(content) >= MIN_COMPRESS_SIZE else None
+    if coding:
+        content = compress(content, coding)
+        headers["Content-Encoding"] = coding
+
+    return Response(content=content, media_type=media_type, headers=headers)
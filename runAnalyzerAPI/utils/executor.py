@@ -0,0 +1,237 @@
+import asyncio
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+# NumPy and pandas are imported by SharedFrame when used: sizing the serving workers from the
+# CPU allotment (utils.serving, before the app is loaded) does not load them
+
+
+def cpu_allotment():
+    """
+    Return the number of CPUs this container may use (at least 1).
+
+    Reads the cgroup CPU quota (v2 `cpu.max`, then v1 `cpu.cfs_quota_us`) and falls back to
+    the CPU affinity of the process, so an ECS task with cpu=256 gets 1 worker rather than
+    one per core of the host.
+    """
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+
+    if quota is not None:
+        available = min(available, math.ceil(quota))
+    return max(1, available)
+
+
+class SharedFrame:
+    """
+    Picklable handle to a DataFrame whose numeric columns live in shared memory.
+
+    Numeric and datetime columns are copied once into a single shared-memory block and only
+    their (name, dtype, offset) layout is pickled; a worker process maps the block and
+    rebuilds the frame without copying those columns. Object/extension columns (strings,
+    periods) are pickled as usual.
+    """
+
+    def __init__(self, name, layout, objects, index, length, columns):
+        self.name = name
+        self.layout = layout
+        self.objects = objects
+        self.index = index
+        self.length = length
+        self.columns = columns
+        self._shm = None
+
+    @classmethod
+    def create(cls, frame):
+        """
+        Copy the numeric columns of `frame` into a new shared-memory block.
+        """
+        import numpy as np
+
+        numeric = [col for col in frame.columns
+                   if isinstance(frame[col].dtype, np.dtype) and frame[col].dtype.kind in "biufcmM"]
+        layout, offset = [], 0
+        for col in numeric:
+            dtype = frame[col].dtype
+            offset = -(-offset // dtype.alignment) * dtype.alignment
+            layout.append((col, dtype.str, offset))
+            offset += dtype.itemsize * len(frame)
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for col, dtype, start in layout:
+            target = np.ndarray(len(frame), dtype=dtype, buffer=shm.buf, offset=start)
+            target[:] = frame[col].to_numpy()
+
+        objects = frame[[col for col in frame.columns if col not in numeric]]
+        handle = cls(shm.name, layout, objects, frame.index, len(frame), list(frame.columns))
+        handle._shm = shm
+        return handle
+
+    def to_frame(self):
+        """
+        Rebuild the DataFrame on top of the shared block (numeric columns are not copied).
+        """
+        import numpy as np
+        import pandas as pd
+
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.name)
+            # Only the creating process owns the block (what track=False does on Python 3.13+)
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        columns = {col: np.ndarray(self.length, dtype=dtype, buffer=self._shm.buf, offset=start)
+                   for col, dtype, start in self.layout}
+        for col in self.objects.columns:
+            columns[col] = self.objects[col].array  # Keeps categorical and period dtypes
+        frame = pd.DataFrame(columns, index=self.index, copy=False)
+        return frame[self.columns]
+
+    def close(self):
+        """
+        Detach from the shared block in this process.
+        """
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self):
+        """
+        Close and free the shared block (call once, from the process that created it).
+        """
+        shm = self._shm or shared_memory.SharedMemory(name=self.name)
+        shm.close()
+        shm.unlink()
+        self._shm = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm"] = None
+        return state
+
+
+def _run_on_shared_frame(func, shared, args, kwargs):
+    # Worker side of AnalysisExecutor.run_on_frame
+    frame = shared.to_frame()
+    try:
+        return func(frame, *args, **kwargs)
+    finally:
+        del frame
+        shared.close()
+
+
+class AnalysisExecutor:
+    """
+    Run CPU-bound analysis jobs off the event loop, in a thread or process pool, with a timeout.
+
+    The pool is created lazily and sized from the container's CPU allotment unless a number
+    of workers is given. With a process pool, a job that exceeds its timeout is abandoned: new
+    jobs go to a fresh pool, the other jobs of the old pool run to completion, and its workers
+    (the one stuck in the abandoned job included) are then terminated.
+    """
+
+    def __init__(self, kind="process", max_workers=0, timeout=None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or cpu_allotment()
+        self.timeout = timeout
+        self._pool = None
+        self._running = {}  # pool -> jobs awaited on it
+        self._retired = set()  # pools replaced after a timeout, stopped once their jobs are done
+
+    @property
+    def uses_processes(self):
+        return self.kind == "process"
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.uses_processes:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+        return self._pool
+
+    async def run(self, func, *args, timeout=None):
+        """
+        Run `func(*args)` in the pool and await its result.
+
+        Raises:
+            asyncio.TimeoutError: If the job takes longer than the timeout.
+        """
+        pool = self._get_pool()
+        self._running[pool] = self._running.get(pool, 0) + 1
+        future = asyncio.get_running_loop().run_in_executor(pool, func, *args)
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            if self.uses_processes:
+                self._retire(pool)
+            raise
+        finally:
+            self._running[pool] -= 1
+            if not self._running[pool]:
+                del self._running[pool]
+                if pool in self._retired:
+                    self._stop(pool)
+
+    async def run_on_frame(self, func, frame, *args, timeout=None, **kwargs):
+        """
+        Run `func(frame, *args, **kwargs)` in the pool.
+
+        In a process pool the frame travels as a SharedFrame, so its numeric columns are not
+        pickled (the copy into shared memory is made in a thread, off the event loop); in a
+        thread pool it is passed as is.
+        """
+        if not self.uses_processes:
+            return await self.run(lambda: func(frame, *args, **kwargs), timeout=timeout)
+
+        shared = await asyncio.to_thread(SharedFrame.create, frame)
+        try:
+            return await self.run(_run_on_shared_frame, func, shared, args, kwargs, timeout=timeout)
+        finally:
+            shared.unlink()
+
+    def _retire(self, pool):
+        # Send new jobs to a fresh pool; the old one is stopped when its last awaited job ends
+        if self._pool is pool:
+            self._pool = None
+        self._retired.add(pool)
+
+    def _stop(self, pool):
+        # Terminate the workers of a retired pool, including those still busy with abandoned jobs
+        self._retired.discard(pool)
+        processes = list(getattr(pool, "_processes", {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def shutdown(self):
+        """
+        Stop the pool (waits for running jobs) and any retired pool.
+        """
+        for pool in list(self._retired):
+            self._stop(pool)
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
@@ -0,0 +1,261 @@
+import numpy as np
+
+from utils.utils_functions import finite_values
+
+# Binning strategies: "count" equal bins over the range of the values (np.histogram's bins=n),
+# "fd" the Freedman-Diaconis width 2 IQR / n^(1/3), "width" a fixed width with edges on its
+# multiples (e.g. 10 s pace buckets), so that the grids of different uploads line up
+STRATEGIES = ("count", "fd", "width")
+
+# Upper bound on the bins of one field ("fd" is capped to it, a tiny width is an error)
+MAX_BINS = 1000
+
+# Smallest width of the width strategy: below the precision of every histogram field (10 m,
+# whole seconds and bpm), whatever the range of the values
+MIN_BIN_WIDTH = 1e-3
+
+
+def weighted_quantiles(values, counts, quantiles):
+    """
+    Quantiles of sorted distinct values with their counts, interpolated linearly between order
+    statistics like np.quantile over the expanded values.
+
+    Args:
+        values (np.ndarray): Sorted distinct values.
+        counts (np.ndarray): Occurrences of each value.
+        quantiles (iterable): Quantiles in [0, 1].
+
+    Returns:
+        list: One float per quantile.
+    """
+    cumulative = np.cumsum(counts)
+    n = int(cumulative[-1])
+    results = []
+    for q in quantiles:
+        position = q * (n - 1)
+        lo = values[np.searchsorted(cumulative, np.floor(position), side="right")]
+        hi = values[np.searchsorted(cumulative, np.ceil(position), side="right")]
+        results.append(float(lo + (hi - lo) * (position - np.floor(position))))
+    return results
+
+
+def bin_edges(values, counts=None, strategy="count", bins=10, width=None):
+    """
+    Equal-width bin edges of one field under a binning strategy (missing values ignored).
+
+    Args:
+        values (np.ndarray): Values of the field, or its distinct values when `counts` is given.
+        counts (np.ndarray): Occurrences of each value (None: each value once).
+        strategy (str): One of STRATEGIES.
+        bins (int): Number of bins of the "count" strategy.
+        width (float): Bin width of the "width" strategy.
+
+    Returns:
+        np.ndarray: Increasing edges; values outside them are not counted. The "fd" strategy
+        is capped at MAX_BINS bins (a long-tailed field).
+
+    Raises:
+        ValueError: For an unknown strategy, a missing width or more than MAX_BINS bins of
+            the given width.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    values = values[present]
+
+    if strategy == "width":
+        if not width or width <= 0:
+            raise ValueError("The width strategy needs a positive bin width")
+        if values.size == 0:
+            return np.array([0.0, width])
+        first, last = np.floor(values.min() / width), np.floor(values.max() / width) + 1
+        # Counted before the edges are allocated: a tiny width over a wide range is an error, not an array
+        _check_bins(int(last - first))
+        return np.arange(first, last + 1) * width
+
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown binning strategy: {strategy} (one of {', '.join(STRATEGIES)})")
+
+    # Range of np.histogram: (0, 1) without values, widened by 0.5 around a single value
+    first, last = (values.min(), values.max()) if values.size else (0.0, 1.0)
+    if first == last:
+        first, last = first - 0.5, last + 0.5
+
+    if strategy == "fd":
+        if counts is None:
+            values, counts = np.unique(values, return_counts=True)
+        else:
+            order = np.argsort(values)
+            values, counts = values[order], np.asarray(counts)[present][order]
+        bins = 1
+        if values.size:
+            q25, q75 = weighted_quantiles(values, counts, (0.25, 0.75))
+            fd_width = 2 * (q75 - q25) / np.cbrt(counts.sum())
+            if fd_width > 0:
+                bins = min(int(np.ceil((last - first) / fd_width)), MAX_BINS)
+    return _checked(np.linspace(first, last, bins + 1))
+
+
+def _check_bins(bins):
+    if bins > MAX_BINS:
+        raise ValueError(f"A histogram holds at most {MAX_BINS} bins")
+
+
+def _checked(edges):
+    _check_bins(len(edges) - 1)
+    return edges
+
+
+def histogram_counts(matrix, edges, weights=None, groups=None, n_groups=1):
+    """
+    Count the values of every column of `matrix` in its bins, in one pass over the rows.
+
+    Bins follow np.histogram: half-open [a, b) but the last one closed, missing values and
+    values outside the edges not counted.
+
+    Args:
+        matrix (np.ndarray): n_rows x n_fields float64 values (NaN for missing).
+        edges (list): Equal-width edges of each column (see bin_edges).
+        weights (np.ndarray): Occurrences of each row (None: 1 each).
+        groups (np.ndarray): Group code of each row in [0, n_groups) (None: one group).
+        n_groups (int): Number of groups.
+
+    Returns:
+        list: One n_groups x n_bins int64 array of counts per column.
+    """
+    n_rows, n_fields = matrix.shape
+    n_bins = np.array([len(field_edges) - 1 for field_edges in edges])
+    first = np.array([field_edges[0] for field_edges in edges], dtype=np.float64)
+    last = np.array([field_edges[-1] for field_edges in edges], dtype=np.float64)
+    padded = np.full((n_fields, n_bins.max() + 1), np.inf)
+    for i, field_edges in enumerate(edges):
+        padded[i, :len(field_edges)] = field_edges
+
+    with np.errstate(invalid="ignore"):
+        inside = (matrix >= first) & (matrix <= last)
+        positions = (matrix - first) / (last - first) * n_bins
+    indices = np.minimum(np.where(inside, positions, 0).astype(np.intp), n_bins - 1)
+
+    # Floating-point corrections against the edges themselves, as np.histogram makes them
+    fields = np.broadcast_to(np.arange(n_fields), indices.shape)
+    indices -= matrix < padded[fields, indices]
+    indices += (matrix >= padded[fields, indices + 1]) & (indices != n_bins - 1)
+
+    # One bincount over (group, field, bin) cells
+    offsets = np.concatenate([[0], np.cumsum(n_bins)[:-1]])
+    cells = indices + offsets
+    if groups is not None:
+        cells = cells + np.asarray(groups)[:, None] * n_bins.sum()
+    if weights is not None:
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64)[:, None], matrix.shape)[inside]
+    counts = np.bincount(cells[inside], weights=weights, minlength=n_groups * n_bins.sum())
+    counts = np.rint(counts).astype(np.int64).reshape(n_groups, n_bins.sum())
+    return [counts[:, offset:offset + bins] for offset, bins in zip(offsets, n_bins)]
+
+
+def histogram_result(edges, counts, group_names=None):
+    """
+    UI format of one field: bin midpoints, total counts and the edges (to reuse or merge them),
+    plus the counts of each group when grouped.
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    result = {
+        "bins": finite_values((edges[:-1] + edges[1:]) / 2),
+        "counts": counts.sum(axis=0).tolist(),
+        "edges": finite_values(edges),
+    }
+    if group_names is not None:
+        result["groups"] = {str(name): group_counts.tolist() for name, group_counts in zip(group_names, counts)}
+    return result
+
+
+def resolve_edges(values, counts, field, strategy, bins, widths, edges):
+    """
+    Edges of `field`: given ones first, then the strategy's ("width" needs the field's width in
+    `widths`; fields without one get the "count" strategy).
+    """
+    if edges and field in edges:
+        given = np.asarray(edges[field], dtype=np.float64).ravel()
+        steps = np.diff(given)
+        if len(given) < 2 or not (steps > 0).all() or not np.allclose(steps, steps[0]):
+            raise ValueError(f"Edges of {field} must be at least two increasing, equally spaced values")
+        return _checked(given)
+    if strategy == "width" and not (widths and field in widths):
+        strategy = "count"
+    return bin_edges(values, counts, strategy, bins, (widths or {}).get(field))
+
+
+def compute_histograms(data, fields, strategy="count", bins=10, widths=None, by=None, edges=None):
+    """
+    Histograms of several fields of a dataset, binned in one vectorized pass with NaN masking.
+
+    Args:
+        data (pd.DataFrame): Dataset holding the fields (and the `by` column).
+        fields (list): Fields to histogram; missing ones get an error entry.
+        strategy (str): Binning strategy (see STRATEGIES).
+        bins (int): Number of bins of the "count" strategy.
+        widths (dict): Bin width per field for the "width" strategy, e.g. {"Avg_pace_secs": 10}.
+        by (str): Column whose values split the counts into groups (e.g. "Year").
+        edges (dict): Edges per field to reuse (e.g. from an earlier result), so that the counts
+            of different datasets share one grid.
+
+    Returns:
+        dict: {field: histogram_result(...) or {"error": ...}}, in the order of `fields`.
+    """
+    present = [field for field in fields if field in data.columns]
+    histogram_data = {field: {"error": f"{field} not found in dataset"} for field in fields}
+    if not present:
+        return histogram_data
+
+    matrix = np.column_stack([data[field].to_numpy(dtype=np.float64, na_value=np.nan) for field in present])
+    grids = [resolve_edges(matrix[:, i], None, field, strategy, bins, widths, edges)
+             for i, field in enumerate(present)]
+
+    group_names, groups = None, None
+    if by is not None:
+        group_names, groups = np.unique(data[by].to_numpy(), return_inverse=True)
+    counts = histogram_counts(matrix, grids, groups=groups,
+                              n_groups=len(group_names) if group_names is not None else 1)
+
+    names = group_names.tolist() if group_names is not None else None
+    for field, field_edges, field_counts in zip(present, grids, counts):
+        histogram_data[field] = histogram_result(field_edges, field_counts, names)
+    return histogram_data
+
+
+def merge_histograms(first, second):
+    """
+    Add up two results of one field binned on compatible grids (same edges, or "width" grids of
+    the same width, which are aligned on its multiples), without the raw values.
+
+    Raises:
+        ValueError: If the grids differ.
+    """
+    edges_a, edges_b = np.asarray(first["edges"]), np.asarray(second["edges"])
+    width_a, width_b = np.diff(edges_a), np.diff(edges_b)
+    width = width_a[0]
+    if not (np.allclose(width_a, width) and np.allclose(width_b, width)):
+        raise ValueError("Only equal-width grids can be merged")
+    offset_a, offset_b = edges_a[0] / width, edges_b[0] / width
+    if not np.isclose(offset_a - offset_b, np.round(offset_a - offset_b)):
+        raise ValueError("The grids are not aligned")
+
+    start = min(edges_a[0], edges_b[0])
+    n_bins = int(np.round((max(edges_a[-1], edges_b[-1]) - start) / width))
+    edges = start + np.arange(n_bins + 1) * width
+
+    def spread(result, grid_start, n):
+        shift = int(np.round((grid_start - start) / width))
+        total = np.zeros(n_bins, dtype=np.int64)
+        total[shift:shift + n] = result["counts"]
+        groups = {name: np.zeros(n_bins, dtype=np.int64) for name in result.get("groups", {})}
+        for name, group_counts in result.get("groups", {}).items():
+            groups[name][shift:shift + n] = group_counts
+        return total, groups
+
+    total_a, groups_a = spread(first, edges_a[0], len(width_a))
+    total_b, groups_b = spread(second, edges_b[0], len(width_b))
+    merged = histogram_result(edges, (total_a + total_b)[None, :])
+    if groups_a or groups_b:
+        names = sorted({*groups_a, *groups_b})
+        merged["groups"] = {name: (groups_a.get(name, 0) + groups_b.get(name, 0)).tolist() for name in names}
+    return merged
@@ -0,0 +1,262 @@
+import fcntl
+import heapq
+import os
+import pickle
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils.best_efforts import BEST_EFFORT_COLS
+from utils.durations import format_durations
+from utils.metrics import DAY_MAPPING
+from utils.utils_functions import finite_values, json_ready_frame
+
+# Dataset ids become file names, so keep them to a safe alphabet
+DATASET_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def activity_keys(raw):
+    """
+    Identify activities by their Date and Title, as exported by Garmin Connect.
+
+    Args:
+        raw (pd.DataFrame): Raw activity columns (before typing).
+
+    Returns:
+        pd.Series: One string key per row.
+    """
+    return raw["Date"].astype(str) + "\x1f" + raw["Title"].astype(str)
+
+
+class IncrementalAggregates:
+    """
+    Mergeable accumulators behind the yearly statistics, weekday paces, totals and best
+    performances of one dataset, plus the log of activities already folded in.
+
+    Every accumulator can absorb a batch of new rows without looking at the history:
+    yearly statistics keep (count, mean, M2, min, max) per year and column, merged with
+    Chan's parallel update (equivalent to count/sum/sum-of-squares, without the cancellation
+    error); weekday paces keep (count, sum); best performances keep a bounded heap per distance.
+    """
+
+    def __init__(self, yearly_stats_cols, distances, top_k=3, tolerance=0.02):
+        self.yearly_stats_cols = list(yearly_stats_cols)
+        self.distances = list(distances)
+        self.top_k = top_k
+        self.tolerance = tolerance
+
+        self.seen = set()
+        self.yearly = {}  # year -> col -> [count, mean, M2, min, max]
+        self.weekday = {}  # day -> [count, sum of Avg_pace_secs]
+        self.totals = {"calories": 0, "distance": 0.0}
+        self.best = {distance: [] for distance in self.distances}  # heaps of (-pace, -seq, record)
+        self._seq = 0
+
+    def new_activities(self, raw):
+        """
+        Return the rows of `raw` that were not folded in yet (duplicates within `raw` included once).
+        """
+        keys = activity_keys(raw)
+        fresh = ~keys.isin(self.seen) & ~keys.duplicated()
+        return raw[fresh.to_numpy()]
+
+    def ingest(self, raw, prepare):
+        """
+        Fold only the activities of `raw` that are not in the log yet.
+
+        Args:
+            raw (pd.DataFrame): Raw activity columns of the upload.
+            prepare (callable): Turns raw rows into the typed frame load_data produces.
+
+        Returns:
+            int: Number of new activities.
+        """
+        new_raw = self.new_activities(raw)
+        if not new_raw.empty:
+            self.fold(prepare(new_raw))
+            self.seen.update(activity_keys(new_raw))
+        return len(new_raw)
+
+    def fold(self, data):
+        """
+        Fold a batch of prepared (load_data-typed) new activities into the accumulators.
+        """
+        if data.empty:
+            return
+
+        self._fold_totals(data)
+        self._fold_yearly(data)
+        self._fold_weekday(data)
+        self._fold_best(data)
+
+    def results(self):
+        """
+        Return the JSON-ready sections in the same format as the corresponding functions in utils.metrics.
+        """
+        return {
+            "totals": {
+                "total_calories": int(self.totals["calories"]),
+                "total_distance": round(self.totals["distance"], 1),
+            },
+            "yearly_statistics": self._yearly_results(),
+            "avg_pace_day_week": self._weekday_results(),
+            "best_perf": {
+                distance: [record for _, _, record in sorted(heap, reverse=True)]
+                for distance, heap in self.best.items()
+            },
+        }
+
+    def _fold_totals(self, data):
+        self.totals["calories"] += int(data["Calories"].sum())
+        self.totals["distance"] += float(data["Distance"].sum())
+
+    def _fold_yearly(self, data):
+        grouped = data.groupby("Year")[self.yearly_stats_cols]
+        counts = grouped.count()
+        means = grouped.mean()
+        m2 = grouped.var(ddof=0) * counts
+        mins = grouped.min()
+        maxs = grouped.max()
+
+        for year in counts.index:
+            year_state = self.yearly.setdefault(int(year), {})
+            for col in self.yearly_stats_cols:
+                n_b = int(counts.at[year, col])
+                if n_b == 0:
+                    year_state.setdefault(col, [0, np.nan, 0.0, np.nan, np.nan])
+                    continue
+                batch = [n_b, means.at[year, col], m2.at[year, col], mins.at[year, col], maxs.at[year, col]]
+                year_state[col] = _merge_moments(year_state.get(col), batch)
+
+    def _fold_weekday(self, data):
+        valid = data.dropna(subset=["Day_of_week", "Avg_pace_secs"])
+        grouped = valid.groupby(valid["Day_of_week"].astype(int))["Avg_pace_secs"].agg(["count", "sum"])
+        for day, (count, total) in grouped.iterrows():
+            state = self.weekday.setdefault(int(day), [0, 0.0])
+            state[0] += int(count)
+            state[1] += float(total)
+
+    def _fold_best(self, data):
+        distance = data["Distance"].to_numpy()
+        pace = data["Avg_pace_secs"].to_numpy(dtype=np.float64)
+        # NaN paces rank after every real pace, as with sort_values
+        pace = np.where(np.isnan(pace), np.inf, pace)
+        for target, heap in self.best.items():
+            rows = np.flatnonzero((distance <= target + self.tolerance) & (distance >= target - self.tolerance))
+            if len(rows) > self.top_k:
+                # Only the batch's own top k can enter the heap; keep them in dataset order
+                rows = np.sort(rows[np.lexsort((rows, pace[rows]))][:self.top_k])
+            for i in rows:
+                record = json_ready_frame(data.iloc[[i]][BEST_EFFORT_COLS]).to_dict(orient="records")[0]
+                # Earlier rows win ties, like a stable sort
+                entry = (-pace[i], -self._seq, record)
+                self._seq += 1
+                if len(heap) < self.top_k:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+
+    def _yearly_results(self):
+        years = sorted(self.yearly)
+        yearly_stats = {}
+        for col in self.yearly_stats_cols:
+            moments = [self.yearly[year].get(col, [0, np.nan, 0.0, np.nan, np.nan]) for year in years]
+            yearly_stats[col] = {
+                "Year": years,
+                "mean": finite_values([m[1] for m in moments]),
+                "std": finite_values([np.sqrt(m[2] / (m[0] - 1)) if m[0] > 1 else np.nan for m in moments]),
+                "min": [_to_python(m[3]) for m in moments],
+                "max": [_to_python(m[4]) for m in moments],
+            }
+        return yearly_stats
+
+    def _weekday_results(self):
+        days = sorted(self.weekday)
+        means = np.array([self.weekday[day][1] / self.weekday[day][0] for day in days])
+        return dict(zip([DAY_MAPPING[day] for day in days], format_durations(means)))
+
+
+def _to_python(value):
+    # NumPy scalars -> built-in int/float like DataFrame.to_dict does, NaN -> 0 like the metrics
+    value = value.item() if isinstance(value, np.generic) else value
+    return 0 if isinstance(value, float) and not np.isfinite(value) else value
+
+
+def _merge_moments(a, b):
+    """
+    Merge two (count, mean, M2, min, max) summaries.
+    """
+    if a is None or a[0] == 0:
+        return list(b)
+    n_a, mean_a, m2_a, min_a, max_a = a
+    n_b, mean_b, m2_b, min_b, max_b = b
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return [
+        n,
+        mean_a + delta * n_b / n,
+        m2_a + m2_b + delta * delta * n_a * n_b / n,
+        min(min_a, min_b),
+        max(max_a, max_b),
+    ]
+
+
+class IncrementalStore:
+    """
+    Persist IncrementalAggregates per dataset id under a directory, one pickle per dataset.
+    """
+
+    def __init__(self, directory, yearly_stats_cols, distances, top_k=3, tolerance=0.02):
+        self.directory = directory
+        self.yearly_stats_cols = yearly_stats_cols
+        self.distances = distances
+        self.top_k = top_k
+        self.tolerance = tolerance
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def lock(self, dataset_id):
+        """
+        Serialize the updates (load, ingest, save) of one dataset across the threads of this
+        process and the processes sharing the directory (e.g. the gunicorn workers of a container):
+        a per-dataset thread lock, then an exclusive flock on the dataset's lock file. (The pickle
+        itself is replaced on save, so it cannot carry the lock.)
+        """
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault(dataset_id, threading.Lock())
+        os.makedirs(self.directory, exist_ok=True)
+        with thread_lock, open(f"{self._path(dataset_id)}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self, dataset_id):
+        """
+        Return the stored aggregates of a dataset, or empty ones for a new dataset.
+        """
+        try:
+            with open(self._path(dataset_id), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return IncrementalAggregates(self.yearly_stats_cols, self.distances,
+                                         top_k=self.top_k, tolerance=self.tolerance)
+
+    def save(self, dataset_id, aggregates):
+        """
+        Atomically replace the stored aggregates of a dataset.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(dataset_id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(dataset_id))
+
+    def _path(self, dataset_id):
+        if not DATASET_ID_PATTERN.match(dataset_id):
+            raise ValueError("dataset_id must be 1-64 characters of letters, digits, '_' or '-'")
+        return os.path.join(self.directory, f"{dataset_id}.pkl")
@@ -0,0 +1,301 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import queue
+import re
+import threading
+import time
+import uuid
+
+from utils.timing import run_timed_reporting
+
+# Job states; results and errors are kept for the store's TTL once a job is finished
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+# Job ids are uuid4 hex strings; anything else cannot name a job file
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue already holds its maximum of pending jobs.
+    """
+
+
+class JobStore:
+    """
+    Interface of the job stores: job records are plain dicts keyed by job id.
+
+    Records hold the status, the stages the job went through and, once finished, the result
+    or the error. Stores only need these four methods, so a shared backend (e.g. Redis) can
+    replace the in-process one when several API processes serve the same clients.
+    """
+
+    def create(self, job):
+        raise NotImplementedError
+
+    def get(self, job_id):
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        raise NotImplementedError
+
+    def add_stage(self, job_id, stage):
+        raise NotImplementedError
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Job records of this process; finished jobs are dropped `ttl` seconds after they finish.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._purge()
+            self._jobs[job["job_id"]] = job
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+            return None if job is None else {**job, "stages": list(job["stages"])}
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def add_stage(self, job_id, stage):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if job["status"] == RUNNING:  # Reports can arrive after the job finished
+                    job["stage"] = stage
+                if stage not in job["stages"]:
+                    job["stages"].append(stage)
+
+    def _purge(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished"] is not None and now - job["finished"] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class FileJobStore(JobStore):
+    """
+    Job records pickled to one file per job, shared by the processes serving the API from the
+    same directory (e.g. the gunicorn workers of a container): a job's status can be asked from
+    any of them. Only the process running a job writes its record.
+
+    Finished jobs are dropped `ttl` seconds after they finish.
+    """
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def create(self, job):
+        self._purge()
+        with self._lock:
+            self._write(job)
+
+    def get(self, job_id):
+        job = self._read(job_id)
+        if job is None or self._expired(job, time.time()):
+            return None
+        return job
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._read(job_id)
+            if job is not None:
+                job.update(fields)
+                self._write(job)
+
+    def add_stage(self, job_id, stage):
+        with self._lock:
+            job = self._read(job_id)
+            if job is not None:
+                if job["status"] == RUNNING:  # Reports can arrive after the job finished
+                    job["stage"] = stage
+                if stage not in job["stages"]:
+                    job["stages"].append(stage)
+                self._write(job)
+
+    def _expired(self, job, now):
+        return job["finished"] is not None and now - job["finished"] > self.ttl
+
+    def _purge(self):
+        # Only records untouched for the TTL can belong to expired jobs
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) <= self.ttl:
+                    continue
+                job = self._read(name[:-4])
+                if job is not None and self._expired(job, now):
+                    os.remove(path)
+            except FileNotFoundError:  # Removed by another process meanwhile
+                pass
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.pkl")
+
+    def _read(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, job):
+        # Write to a private temporary name, then publish atomically
+        path = self._path(job["job_id"])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(job, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+def make_job_store(kind, ttl, directory=None):
+    """
+    Build the job store configured by RUNAPI_JOB_STORE ("memory": in-process, no outside service;
+    "file": records in `directory`, shared by the API processes of a container).
+    """
+    if kind == "memory":
+        return InMemoryJobStore(ttl)
+    if kind == "file":
+        return FileJobStore(directory, ttl)
+    raise ValueError(f"Unknown job store: {kind}")
+
+
+def job_view(job):
+    """
+    Public fields of a job record (everything but the result).
+    """
+    return {key: value for key, value in job.items() if key != "result"}
+
+
+class ProgressReporter:
+    """
+    Picklable stage callback of a job: sends (job id, stage) to the progress queue.
+    """
+
+    def __init__(self, progress_queue, job_id):
+        self.progress_queue = progress_queue
+        self.job_id = job_id
+
+    def __call__(self, stage):
+        self.progress_queue.put((self.job_id, stage))
+
+
+class JobQueue:
+    """
+    Bounded queue of analysis jobs run by a fixed number of asyncio workers on an AnalysisExecutor.
+
+    Stage progress travels from the executor (thread or worker process) through a queue that a
+    background thread drains into the store, so the store is updated while the job runs.
+    """
+
+    def __init__(self, store, executor, max_pending, workers, timeout=None):
+        self.store = store
+        self.executor = executor
+        self.max_pending = max_pending
+        self.workers = workers or executor.max_workers
+        self.timeout = timeout
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+        self._progress = None
+        self._manager = None
+
+    def submit(self, func, *args, on_result=None, cleanup=None):
+        """
+        Enqueue `func(*args)` and return its job id (call from the event loop).
+
+        Args:
+            on_result (callable): Called with the result of a successful job.
+            cleanup (callable): Called once the job is finished, whatever its outcome.
+
+        Raises:
+            QueueFullError: If max_pending jobs are already waiting.
+        """
+        self._start()
+        job_id = uuid.uuid4().hex
+        job = {"job_id": job_id, "status": QUEUED, "stage": None, "stages": [], "created": time.time(),
+               "started": None, "finished": None, "error": None, "result": None}
+        try:
+            self._queue.put_nowait((job_id, func, args, on_result, cleanup))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"{self.max_pending} jobs are already pending")
+        self.store.create(job)
+        return job_id
+
+    def complete(self, result):
+        """
+        Record an already available result (e.g. a cache hit) as a finished job; return its id.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.store.create({"job_id": job_id, "status": DONE, "stage": None, "stages": [], "created": now,
+                           "started": now, "finished": now, "error": None, "result": result})
+        return job_id
+
+    def _start(self):
+        # Workers live on the running event loop; they are recreated if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        if self._progress is None:
+            if self.executor.uses_processes:
+                # Worker processes need a proxy queue, served by a manager process
+                self._manager = multiprocessing.Manager()
+                self._progress = self._manager.Queue()
+            else:
+                self._progress = queue.Queue()
+            threading.Thread(target=self._pump_progress, name="job-progress", daemon=True).start()
+
+    def _pump_progress(self):
+        while True:
+            try:
+                job_id, stage = self._progress.get()
+            except (EOFError, OSError):  # The manager process stopped (interpreter exit)
+                return
+            self.store.add_stage(job_id, stage)
+
+    async def _work(self):
+        while True:
+            job_id, func, args, on_result, cleanup = await self._queue.get()
+            self.store.update(job_id, status=RUNNING, started=time.time())
+            try:
+                result, _, _ = await self.executor.run(
+                    run_timed_reporting, ProgressReporter(self._progress, job_id), func, *args, timeout=self.timeout)
+                if on_result is not None:
+                    on_result(result)
+                self.store.update(job_id, status=DONE, stage=None, result=result, finished=time.time())
+            except asyncio.TimeoutError:
+                self.store.update(job_id, status=FAILED, error="Analysis timed out", finished=time.time())
+            except Exception as e:
+                self.store.update(job_id, status=FAILED, error=str(e), finished=time.time())
+            finally:
+                if cleanup is not None:
+                    cleanup()
+                self._queue.task_done()
@@ -1,5 +1,25 @@
 import pandas as pd
-from utils.utils_functions import secs_to_hms
+from pandas.api.types import is_numeric_dtype, is_datetime64_any_dtype
+from utils.durations import format_durations
+from utils.best_efforts import best_efforts
+from utils.utils_functions import json_ready_frame
+from utils.timing import stage
+from config import best_effort_tolerance, best_effort_k
+
+# Outputs the metrics planner can produce, in response order
+METRIC_OUTPUTS = ("desc_matrix", "avg_pace_day_week", "totals", "yearly_statistics", "best_perf")
+
+YEARLY_STATS = ["mean", "std", "min", "max"]
+
+DAY_MAPPING = {
+    0: "Monday",
+    1: "Tuesday",
+    2: "Wednesday",
+    3: "Thursday",
+    4: "Friday",
+    5: "Saturday",
+    6: "Sunday",
+}
 
 
 def get_descriptive_matrix(data, desc_matrix_cols):
@@ -19,16 +39,13 @@ def get_descriptive_matrix(data, desc_matrix_cols):
         # Generate descriptive statistics
         stats = data[desc_matrix_cols].describe().transpose()
 
-        # Add average pace row (converted to HH:MM:SS.ss format)
+        # Mean pace in seconds, already computed by describe() when the column is in the matrix
+        avg_pace = None
         if "Avg_pace_secs" in data.columns:
-            avg_pace = data["Avg_pace_secs"].mean()  # Compute mean pace in seconds
-            formatted_avg_pace = secs_to_hms(avg_pace)  # Convert to HH:MM:SS.ss
-            stats.loc["Average Pace (HH:MM:SS.ss)"] = [""] * (stats.shape[1])  # Create an empty row
-            stats.at["Average Pace (HH:MM:SS.ss)", "mean"] = formatted_avg_pace  # Add formatted pace to the row
-
-        # Convert DataFrame to JSON-friendly format
-        result = stats.reset_index().to_dict(orient="list")
-        return result
+            avg_pace = stats.at["Avg_pace_secs", "mean"] if "Avg_pace_secs" in stats.index \
+                else data["Avg_pace_secs"].mean()
+
+        return format_descriptive_matrix(stats, avg_pace)
     except Exception as e:
         raise ValueError(f"Error generating descriptive stats: {e}")
 
@@ -44,32 +61,9 @@ def get_avg_pace_by_day_of_week(data):
         dict: Dictionary with days of the week as keys and formatted average paces as values.
     """
     try:
-        # Mapping day numbers to day names
-        day_mapping = {
-            0: "Monday",
-            1: "Tuesday",
-            2: "Wednesday",
-            3: "Thursday",
-            4: "Friday",
-            5: "Saturday",
-            6: "Sunday",
-        }
-
-        # Ensure valid data: Drop NaN values in Day_of_week and Avg_pace_secs
-        valid_data = data.dropna(subset=["Day_of_week", "Avg_pace_secs"])
-
-        # Ensure Day_of_week is an integer
-        valid_data["Day_of_week"] = valid_data["Day_of_week"].astype(int)
-
         # Group by day of the week and compute the mean average pace in seconds
-        avg_pace_by_day = valid_data.groupby("Day_of_week")["Avg_pace_secs"].mean()
-
-        # Convert day numbers to day names and format paces
-        formatted_paces = {
-            day_mapping[day]: secs_to_hms(pace) for day, pace in avg_pace_by_day.items()
-        }
-
-        return formatted_paces
+        avg_pace_by_day = _group_by(data, "Day_of_week")["Avg_pace_secs"].mean()
+        return _format_day_paces(avg_pace_by_day)
 
     except KeyError as e:
         print(f"KeyError occurred: {e}")
@@ -118,56 +112,148 @@ def get_yearly_statistics(data, yearly_statistics_cols):
     """
 
     try:
-        # Dictionary to hold results for all fields
-        yearly_stats = {}
-
-        for col in yearly_statistics_cols:
-            if col in data.columns:
-                # Group by 'Year' and calculate statistics
-                stats = data.groupby('Year')[col].agg(['mean', 'std', 'min', 'max'])
-
-                # Convert to a dictionary format for the UI
-                yearly_stats[col] = stats.reset_index().to_dict(orient="list")
-            else:
-                yearly_stats[col] = {"error": f"{col} not found in dataset"}
-
-        return yearly_stats
+        # One groupby for every field instead of one per field
+        present_cols = [col for col in yearly_statistics_cols if col in data.columns]
+        stats = _group_by(data, "Year")[present_cols].agg(YEARLY_STATS) if present_cols else None
+        return _format_yearly_statistics(stats, yearly_statistics_cols)
     except Exception as e:
         raise ValueError(f"Error computing yearly statistics: {e}")
 
 
-def get_three_best_performances(data: pd.DataFrame, distances: list):
+def get_three_best_performances(data: pd.DataFrame, distances: list, tolerance=best_effort_tolerance,
+                                k=best_effort_k):
     """
     Function to compute the best performances based on main distances and return them in a format suitable for the UI.
 
     Args:
         data (pd.DataFrame): Dataset containing run information.
         distances (list): List of distances to evaluate.
+        tolerance (float): Runs within +/- tolerance km of a distance count for it.
+        k (int): Number of performances per distance.
 
     Returns:
         dict: Dictionary with distances as keys and top performances as values.
     """
     try:
-        best_performances = {}
-
-        for distance in distances:
-            # Filter runs near the target distance
-            filtered_runs = data[
-                (data['Distance'] <= distance + 0.02) &
-                (data['Distance'] >= distance - 0.02)
-                ]
-
-            # Get top performances sorted by average pace
-            top_runs = (
-                filtered_runs
-                .sort_values(by=['Avg_pace_secs'])
-                .head(3)
-                [['Date', 'Distance', 'Time', 'Avg Pace']]
-            )
-
-            # Convert results to a JSON-friendly format
-            best_performances[distance] = top_runs.to_dict(orient='records')
-
-        return best_performances
+        # Sort once, binary-search each distance window, partial selection of the k fastest
+        return best_efforts(data, distances, tolerance=tolerance, k=k)
     except Exception as e:
         raise ValueError(f"Error computing best performances: {e}")
+
+
+def compute_metrics(data, outputs=METRIC_OUTPUTS, desc_matrix_cols=(), yearly_statistics_cols=(), distances=(),
+                    tolerance=best_effort_tolerance, k=best_effort_k):
+    """
+    Compute several metric outputs at once, running every grouping a single time.
+
+    The requested outputs are first turned into one aggregation spec per grouping key
+    (e.g. every yearly field is aggregated by one multi-column groupby('Year').agg), the
+    groupings are executed once, and each output is then read from the shared results.
+    Outputs are identical to the corresponding get_* / compute_* functions.
+
+    Args:
+        data (pd.DataFrame): Dataset as returned by load_data.
+        outputs (iterable): Names from METRIC_OUTPUTS.
+        desc_matrix_cols (list): Fields of the descriptive matrix.
+        yearly_statistics_cols (list): Fields of the yearly statistics.
+        distances (list): Target distances of the best performances.
+        tolerance (float): Distance window of the best performances, in km.
+        k (int): Number of best performances per distance.
+
+    Returns:
+        dict: Output name -> result, in the order of `outputs`.
+    """
+    outputs = list(outputs)
+    unknown = set(outputs) - set(METRIC_OUTPUTS)
+    if unknown:
+        raise ValueError(f"Unknown metric outputs: {', '.join(sorted(unknown))}")
+
+    # Plan: one aggregation spec per grouping key
+    groupings = {}
+    if "yearly_statistics" in outputs:
+        for col in yearly_statistics_cols:
+            if col in data.columns:
+                groupings.setdefault("Year", {})[col] = YEARLY_STATS
+    if "avg_pace_day_week" in outputs:
+        groupings.setdefault("Day_of_week", {})["Avg_pace_secs"] = ["mean"]
+
+    # Execute: each grouping runs once, whatever the number of outputs and fields using it
+    try:
+        with stage("metrics.groupings"):
+            aggregates = {key: _group_by(data, key).agg(spec) for key, spec in groupings.items()}
+    except Exception as e:
+        raise ValueError(f"Error computing grouped metrics: {e}")
+
+    results = {}
+    for output in outputs:
+        with stage(f"metrics.{output}"):
+            if output == "desc_matrix":
+                results[output] = get_descriptive_matrix(data, list(desc_matrix_cols))
+            elif output == "avg_pace_day_week":
+                results[output] = _format_day_paces(aggregates["Day_of_week"][("Avg_pace_secs", "mean")])
+            elif output == "totals":
+                results[output] = compute_totals(data)
+            elif output == "yearly_statistics":
+                results[output] = _format_yearly_statistics(aggregates.get("Year"), yearly_statistics_cols)
+            elif output == "best_perf":
+                results[output] = get_three_best_performances(data, list(distances), tolerance=tolerance, k=k)
+    return results
+
+
+def _group_by(data, key):
+    """
+    Group by a column. Day_of_week is an int8 code; text weekdays (datasets stored before it
+    was) are grouped on integer codes without re-parsing the string column.
+    """
+    if key == "Day_of_week" and not is_numeric_dtype(data["Day_of_week"]):
+        if "Date" in data.columns and is_datetime64_any_dtype(data["Date"]):
+            # Same codes add_cols derived the column from
+            return data.groupby(data["Date"].dt.dayofweek.rename("Day_of_week"))
+        return data.groupby(pd.to_numeric(data["Day_of_week"]).astype("Int64"))
+    return data.groupby(key)
+
+
+def format_descriptive_matrix(stats, avg_pace=None):
+    """
+    Turn a describe().transpose() frame, plus the mean pace in seconds, into the UI format.
+    """
+    stats = json_ready_frame(stats)
+
+    # Add average pace row (converted to HH:MM:SS.ss format)
+    if avg_pace is not None:
+        formatted_avg_pace = format_durations([avg_pace])[0]  # Convert to HH:MM:SS.ss
+        stats.loc["Average Pace (HH:MM:SS.ss)"] = [""] * (stats.shape[1])  # Create an empty row
+        stats.at["Average Pace (HH:MM:SS.ss)", "mean"] = formatted_avg_pace  # Add formatted pace to the row
+
+    # Convert DataFrame to JSON-friendly format (NaN already replaced at the frame level)
+    return stats.reset_index().to_dict(orient="list")
+
+
+def _format_day_paces(avg_pace_by_day):
+    """
+    Turn mean paces indexed by weekday code into {day name: 'MM:SS.ss'}.
+    """
+    avg_pace_by_day = avg_pace_by_day.dropna()
+
+    # Convert day numbers to day names and format all paces at once
+    return dict(zip(
+        [DAY_MAPPING[day] for day in avg_pace_by_day.index],
+        format_durations(avg_pace_by_day.to_numpy())
+    ))
+
+
+def _format_yearly_statistics(stats, yearly_statistics_cols):
+    """
+    Split a groupby('Year').agg(YEARLY_STATS) frame into the per-field UI format.
+    """
+    yearly_stats = {}
+    present = set(stats.columns.get_level_values(0)) if stats is not None else set()
+
+    for col in yearly_statistics_cols:
+        if col in present:
+            # Convert to a dictionary format for the UI
+            yearly_stats[col] = json_ready_frame(stats[col].reset_index()).to_dict(orient="list")
+        else:
+            yearly_stats[col] = {"error": f"{col} not found in dataset"}
+
+    return yearly_stats
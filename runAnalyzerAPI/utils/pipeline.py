@@ -0,0 +1,260 @@
+from utils.batch import expand_uploads, read_batch, merge_activities
+from utils.data_prep import load_data, prepare_activities
+from utils.datasets import DatasetStore
+from utils.best_efforts import BEST_EFFORT_COLS
+from utils.metrics import compute_metrics, METRIC_OUTPUTS
+from utils.histograms import STRATEGIES
+from utils.date_range import date_bounds, select_dates
+from utils.rolling import MAX_WINDOW_DAYS
+from utils.plots import get_histogram_data, get_mov_avg_data, TIME_SERIES_COLS
+from utils.timing import stage, count
+from utils.streaming import analyze_stream
+from config import (
+    data_cols, desc_matrix_cols, yearly_stats_cols, histogram_cols, main_distances, time_series_cols,
+    best_effort_tolerance, best_effort_k, stream_chunk_rows, stream_max_points, batch_max_files, batch_max_bytes,
+)
+
+HISTOGRAM_BINS = 10
+
+# Columns the histogram counts can be grouped by
+HISTOGRAM_GROUPS = ("Year",)
+
+# Sections of the response body, in response order
+SECTIONS = ("desc_matrix", "avg_pace_day_week", "totals", "yearly_statistics", "histogram_data",
+            "time_series_data", "best_perf")
+
+
+def analysis_params(**overrides):
+    """
+    Return every setting the analysis output depends on, e.g. to build a cache key.
+
+    Args:
+        **overrides: Request-level values replacing the config defaults (None values are ignored).
+
+    Returns:
+        dict: Settings consumed by analyze.
+    """
+    params = {
+        "data_cols": data_cols,
+        "desc_matrix_cols": desc_matrix_cols,
+        "yearly_stats_cols": yearly_stats_cols,
+        "histogram_cols": histogram_cols,
+        "histogram_bins": HISTOGRAM_BINS,
+        "histogram_strategy": "count",
+        "histogram_widths": None,
+        "histogram_by": None,
+        "histogram_edges": None,
+        "main_distances": main_distances,
+        "best_effort_tolerance": best_effort_tolerance,
+        "best_effort_k": best_effort_k,
+        "time_series_cols": time_series_cols,
+        "time_series_max_points": None,
+        "time_series_windows": None,
+        "time_series_spans": None,
+        "date_start": None,
+        "date_end": None,
+        "sections": None,
+        "streaming": False,
+        "stream_chunk_rows": stream_chunk_rows,
+    }
+    unknown = set(overrides) - set(params)
+    if unknown:
+        raise ValueError(f"Unknown analysis parameters: {', '.join(sorted(unknown))}")
+
+    params.update({name: value for name, value in overrides.items() if value is not None})
+    if params["sections"] is not None:
+        unknown = set(params["sections"]) - set(SECTIONS)
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+        # Canonical order, so that equivalent requests share a cache key
+        params["sections"] = [section for section in SECTIONS if section in params["sections"]]
+    if params["histogram_strategy"] not in STRATEGIES:
+        raise ValueError(f"Unknown binning strategy: {params['histogram_strategy']}")
+    if params["histogram_by"] not in (None, *HISTOGRAM_GROUPS):
+        raise ValueError(f"Histograms can only be grouped by {', '.join(HISTOGRAM_GROUPS)}")
+    params["date_start"], params["date_end"] = date_bounds(params["date_start"], params["date_end"])
+    for name in ("time_series_windows", "time_series_spans"):
+        if params[name] is not None:
+            days = params[name]
+            if not days or any(not isinstance(day, int) or not 1 <= day <= MAX_WINDOW_DAYS for day in days):
+                raise ValueError(f"{name} must hold whole numbers of days in [1, {MAX_WINDOW_DAYS}]")
+            params[name] = sorted(set(days))
+    return params
+
+
+def required_columns(params):
+    """
+    Return the columns the requested sections read, so that load_data builds only those.
+
+    Args:
+        params (dict): Settings from analysis_params.
+
+    Returns:
+        set: Raw and calculated column names.
+    """
+    sections = params["sections"] or SECTIONS
+    needs = {
+        "desc_matrix": [*params["desc_matrix_cols"], "Avg_pace_secs"],
+        "avg_pace_day_week": ["Day_of_week", "Avg_pace_secs"],
+        "totals": ["Calories", "Distance"],
+        "yearly_statistics": ["Year", *params["yearly_stats_cols"]],
+        "histogram_data": [*params["histogram_cols"], *([params["histogram_by"]] if params["histogram_by"] else [])],
+        "time_series_data": TIME_SERIES_COLS,
+        "best_perf": [*BEST_EFFORT_COLS, "Distance", "Avg_pace_secs"],
+    }
+    columns = {col for section in sections for col in needs[section]}
+    if params["date_start"] or params["date_end"]:
+        columns.add("Date")
+    return columns
+
+
+def analyze(data, params=None):
+    """
+    Run the metrics of the requested sections on a loaded dataset and return the JSON-ready body.
+
+    Args:
+        data (pd.DataFrame): Dataset as returned by load_data (newest activity first).
+        params (dict): Settings from analysis_params (defaults when None); params["sections"]
+            selects the sections to compute (all when None), params["date_start"] and
+            params["date_end"] the days analyzed (inclusive; None: unbounded).
+
+    Returns:
+        dict: Descriptive matrix, weekday paces, totals, yearly statistics, histograms,
+        time series and best performances (or the requested subset, in that order), made of
+        plain JSON types (no NaN).
+
+    Raises:
+        ValueError: If no activity falls in params["date_start"] - params["date_end"].
+    """
+    params = params or analysis_params()
+    sections = params["sections"] or SECTIONS
+    body = {}
+
+    # Every metric runs on the activities of the date range, a slice sharing the frame's memory
+    if params["date_start"] or params["date_end"]:
+        data = select_dates(data, params["date_start"], params["date_end"])
+        if data.empty:
+            raise ValueError("No activities in the selected date range")
+
+    # Metrics, planned together so that shared groupings run once
+    body.update(compute_metrics(
+        data,
+        outputs=[section for section in METRIC_OUTPUTS if section in sections],
+        desc_matrix_cols=params["desc_matrix_cols"],
+        yearly_statistics_cols=params["yearly_stats_cols"],
+        distances=params["main_distances"],
+        tolerance=params["best_effort_tolerance"],
+        k=params["best_effort_k"],
+    ))
+
+    # Histograms for Distance, Avg HR, Avg Pace (all fields binned in one pass)
+    if "histogram_data" in sections:
+        with stage("histograms"):
+            body["histogram_data"] = get_histogram_data(
+                data, params["histogram_cols"], bins=params["histogram_bins"], strategy=params["histogram_strategy"],
+                widths=params["histogram_widths"], by=params["histogram_by"], edges=params["histogram_edges"])
+
+    # Time series data for Avg_pace_secs and Avg HR
+    if "time_series_data" in sections:
+        with stage("time_series"):
+            body["time_series_data"] = get_mov_avg_data(data, max_points=params["time_series_max_points"],
+                                                          windows=params["time_series_windows"],
+                                                          spans=params["time_series_spans"])
+
+    # Every producer already replaced NaN/inf values, so the body is ready for json.dumps
+    return {section: body[section] for section in SECTIONS if section in body}
+
+
+def analyze_upload(file, params=None):
+    """
+    Load an uploaded export and analyze it; the unit of work sent to the analysis executor.
+
+    With params["streaming"], the export is analyzed chunk by chunk instead (see analyze_stream).
+
+    Args:
+        file: Upload content as accepted by load_data (bytes or a path when crossing a process boundary).
+        params (dict): Settings from analysis_params (defaults when None).
+
+    Returns:
+        dict: The response body built by analyze.
+    """
+    params = params or analysis_params()
+    if params["streaming"]:
+        max_points = params["time_series_max_points"] or stream_max_points
+        body = analyze_stream(file, params, params["stream_chunk_rows"], max_points)
+        return {section: body[section] for section in params["sections"] or SECTIONS}
+    # Only the calculated columns the requested sections read are built
+    return analyze(load_data(file, required_columns(params)), params)
+
+
+def analyze_and_store(file, directory, dataset_id, params=None):
+    """
+    analyze_upload keeping the parsed activities: the typed frame (every calculated column) is
+    stored as a dataset before it is analyzed, so that follow-up analyses need no re-upload.
+
+    Returns:
+        dict: The response body built by analyze.
+    """
+    data = load_data(file)
+    with stage("write_dataset"):
+        DatasetStore(directory).save(dataset_id, data)
+    return analyze(data, params)
+
+
+def analyze_batch(uploads, params=None):
+    """
+    Merge several exports (CSVs or zip archives of CSVs) and analyze them once.
+
+    The CSVs are parsed concurrently, overlapping activities are deduplicated and the merged
+    frame is sorted by date before the calculated columns and metrics are computed.
+
+    Args:
+        uploads (list): (filename, content) pairs (bytes when crossing a process boundary).
+        params (dict): Settings from analysis_params (defaults when None).
+
+    Returns:
+        dict: The response body built by analyze, plus the number of files and activities merged.
+    """
+    params = params or analysis_params()
+    with stage("read_csv"):
+        sources = expand_uploads(uploads, batch_max_files, batch_max_bytes)
+        frames = read_batch(sources)
+    with stage("merge"):
+        merged = merge_activities(frames)
+    count("rows", len(merged))
+
+    body = analyze(prepare_activities(merged, required_columns(params)), params)
+    return {
+        "files": [name for name, _ in sources],
+        "total_activities": sum(len(frame) for frame in frames),
+        "unique_activities": len(merged),
+        **body,
+    }
+
+
+def store_dataset(file, directory, dataset_id):
+    """
+    Load an uploaded export and store its typed frame (every calculated column) as a dataset.
+
+    Returns:
+        dict: Metadata of the stored dataset (see DatasetStore.info).
+    """
+    data = load_data(file)
+    with stage("write_dataset"):
+        return DatasetStore(directory).save(dataset_id, data)
+
+
+def analyze_dataset(directory, dataset_id, params=None):
+    """
+    Analyze a stored dataset: only the columns the requested sections read, and only the rows
+    of the requested date range, are mapped in.
+
+    Raises:
+        KeyError: If the dataset does not exist.
+    """
+    params = params or analysis_params()
+    with stage("read_dataset"):
+        data = DatasetStore(directory).load(dataset_id, required_columns(params),
+                                            start=params["date_start"], end=params["date_end"])
+    count("rows", len(data))
+    return analyze(data, params)
@@ -1,76 +1,120 @@
+import math
 import numpy as np
+from utils.downsample import lttb_indices
+from utils.histograms import compute_histograms
+from utils.rolling import MOVING_AVERAGE_DAYS, rolling_stats, series_windows, window_label
+from utils.utils_functions import finite_values
 
+# Time series: column of each series; get_mov_avg_data reads them with 'Date'
+TIME_SERIES = {"Avg HR": "Avg HR", "Avg Pace": "Avg_pace_secs"}
+TIME_SERIES_COLS = ['Date', *TIME_SERIES.values()]
 
-def get_histogram_data(data, fields, bins=10):
+
+def get_histogram_data(data, fields, bins=10, strategy="count", widths=None, by=None, edges=None):
     """
     Compute histogram data for the specified fields and return it in a UI-friendly format.
 
+    Every field is binned in one vectorized pass (see utils.histograms); missing values are ignored.
+
     Args:
         data (pd.DataFrame): Dataset containing the fields to histogram.
         fields (list): List of fields for which to generate histograms.
-        bins (int): Number of bins for the histogram.
+        bins (int): Number of bins for the histogram ("count" strategy).
+        strategy (str): Binning strategy: "count", "fd" (Freedman-Diaconis) or "width".
+        widths (dict): Bin width per field for the "width" strategy, e.g. {"Avg_pace_secs": 10}.
+        by (str): Column splitting the counts into groups, e.g. "Year".
+        edges (dict): Bin edges per field to reuse, e.g. from an earlier response.
 
     Returns:
-        dict: Dictionary containing histogram data (bins and counts) for each field.
+        dict: Dictionary containing histogram data (bins, counts and edges, plus the counts per
+        group when grouped) for each field.
     """
     try:
-        histogram_data = {}
-
-        for field in fields:
-            if field in data.columns:
-                # Compute histogram bins and counts
-                counts, bin_edges = np.histogram(data[field], bins=bins)
-
-                # Format bins as midpoints for clarity
-                bin_midpoints = [(bin_edges[i] + bin_edges[i + 1]) / 2 for i in range(len(bin_edges) - 1)]
-
-                # Store data in JSON-friendly format
-                histogram_data[field] = {
-                    "bins": bin_midpoints,
-                    "counts": counts.tolist()
-                }
-            else:
-                histogram_data[field] = {"error": f"{field} not found in dataset"}
-
-        return histogram_data
+        return compute_histograms(data, fields, strategy=strategy, bins=bins, widths=widths, by=by, edges=edges)
     except Exception as e:
         raise ValueError(f"Error generating histogram data: {e}")
 
 
-def get_mov_avg_data(data):
+def get_mov_avg_data(data, max_points=None, windows=None, spans=None):
     """
     Prepare time series data for Average HR and Average Pace, including their moving averages.
 
+    Moving averages are trailing calendar-window means in date order (see utils.rolling), all
+    windows and EWMA spans of a series computed together from its daily totals.
+
     Args:
-        data (pd.DataFrame): Dataset containing 'Date', 'Avg HR', 'Avg HR_MA_30',
-                             'Avg_pace_secs', and 'Pace_MA_30'.
+        data (pd.DataFrame): Dataset containing 'Date', 'Avg HR' and 'Avg_pace_secs'.
+        max_points (int): Optional cap on the dates of the series. Longer datasets are downsampled
+                          to the rows LTTB picks in any of the series (see shared_sample_rows), and
+                          every series and moving average is read at those rows, on one date axis.
+        windows (list): Extra calendar windows in days (e.g. [7, 90, 365]), returned under
+                        "moving_averages" with the 30-day one.
+        spans (list): EWMA spans in days (e.g. [7, 42]), returned under "moving_averages" too.
 
     Returns:
-        dict: Dictionary containing time series data for HR and Avg Pace with moving averages.
+        dict: The shared 'dates' and, per series (HR and Avg Pace), its values and moving averages.
     """
     try:
         # Check if required columns exist
-        required_columns = ['Date', 'Avg HR', 'Avg_HR_MA_30', 'Avg_pace_secs', 'Pace_MA_30']
-        missing_columns = [col for col in required_columns if col not in data.columns]
+        missing_columns = [col for col in TIME_SERIES_COLS if col not in data.columns]
         if missing_columns:
             raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
 
-        # Prepare time series data
-        mov_avg_data = {
-            "Avg HR": {
-                "dates": data["Date"].astype(str).tolist(),
-                "values": data["Avg HR"].tolist(),
-                "moving_average": data["Avg_HR_MA_30"].tolist()
-            },
-            "Avg Pace": {
-                "dates": data["Date"].astype(str).tolist(),
-                "values": data["Avg_pace_secs"].tolist(),
-                "moving_average": data["Pace_MA_30"].tolist()
-            }
-        }
-
-        return mov_avg_data
+        values = np.column_stack([data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                                  for col in TIME_SERIES.values()])
+        rows = slice(None)
+        if max_points is not None and len(data) > max_points:
+            timestamps = data["Date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+            rows = shared_sample_rows(timestamps, values, max_points)
+
+        # Dates are formatted only at the sampled rows
+        series = {}
+        for i, (name, values_col) in enumerate(TIME_SERIES.items()):
+            stats = rolling_stats(data["Date"], data[values_col], series_windows(windows), spans or [])
+            series[name] = (values[rows, i], {label: moving[rows] for label, moving in stats.items()})
+        return time_series_result(data["Date"].iloc[rows].astype(str).tolist(), series, extra=bool(windows or spans))
     except Exception as e:
         raise ValueError(f"Error generating moving average data: {e}")
 
 
+def shared_sample_rows(timestamps, values, max_points):
+    """
+    Rows of a downsampled date axis shared by several series: the union of the LTTB picks of
+    each series (over its present values, max_points // n_series each), so that every series
+    keeps its shape and all of them are plotted at the same dates.
+
+    Args:
+        timestamps (np.ndarray): int64 dates of the rows.
+        values (np.ndarray): n_rows x n_series float64 values (NaN for missing).
+        max_points (int): Upper bound on the rows kept (each series keeps at least 3).
+
+    Returns:
+        np.ndarray: Sorted row indices.
+    """
+    per_series = max(3, max_points // values.shape[1])
+    picks = []
+    for column in values.T:
+        present = np.flatnonzero(~np.isnan(column))
+        picks.append(present[lttb_indices(timestamps[present], column[present], per_series)])
+    return np.unique(np.concatenate(picks))
+
+
+def time_series_result(dates, series, extra=False):
+    """
+    UI format of the time series: one date axis, then per series its values (None where
+    missing, a gap in the chart) and the 30-day moving average, plus every requested window
+    and EWMA under "moving_averages" when `extra`.
+
+    Args:
+        dates (list): Dates of the rows, as strings.
+        series (dict): {name: (values, {label: moving average})} at those rows.
+    """
+    result = {"dates": dates}
+    for name, (values, stats) in series.items():
+        result[name] = {
+            "values": [value if math.isfinite(value) else None for value in np.asarray(values, dtype=np.float64).tolist()],
+            "moving_average": finite_values(stats[window_label(MOVING_AVERAGE_DAYS)]),
+        }
+        if extra:
+            result[name]["moving_averages"] = {label: finite_values(moving) for label, moving in stats.items()}
+    return result
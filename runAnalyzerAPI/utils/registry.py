@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def frame_bytes(frame):
+    """
+    Memory held by a DataFrame, string objects and categories included.
+    """
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+class DatasetRegistry:
+    """
+    Typed activity frames kept resident in this process, keyed by dataset id, so that follow-up
+    analyses (other bins, distances, date ranges...) start from the parsed frame.
+
+    Frames are sized by DataFrame.memory_usage(deep=True). Once the byte budget is exceeded the
+    least recently used frames are evicted, and frames not used for `ttl` seconds expire (checked
+    on every access). A frame larger than the whole budget is not kept, and the dataset is
+    remembered as oversized so that its analyses read only what they need from the store.
+    """
+
+    def __init__(self, max_bytes, ttl, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # dataset id -> [frame, size, last used]
+        self._oversized = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"lru": 0, "ttl": 0}
+
+    def get(self, dataset_id):
+        """
+        Return the resident frame of a dataset, or None (never loaded, evicted or expired).
+        """
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry[2] = self.clock()
+            self._entries.move_to_end(dataset_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, dataset_id, frame):
+        """
+        Make a frame resident (subject to the byte budget); return whether it was kept.
+        """
+        size = frame_bytes(frame)
+        with self._lock:
+            self._expire()
+            self._remove(dataset_id)
+            if size > self.max_bytes:
+                self._oversized.add(dataset_id)
+                return False
+            self._entries[dataset_id] = [frame, size, self.clock()]
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions["lru"] += 1
+            return True
+
+    def delete(self, dataset_id):
+        """
+        Drop a resident frame; return whether it was resident.
+        """
+        with self._lock:
+            self._oversized.discard(dataset_id)
+            return self._remove(dataset_id)
+
+    def oversized(self, dataset_id):
+        """
+        Return whether a frame of this dataset was refused as larger than the whole budget.
+        """
+        with self._lock:
+            return dataset_id in self._oversized
+
+    def stats(self):
+        """
+        Return occupancy, hit/miss counters, evictions per cause and the resident datasets
+        (least recently used first).
+        """
+        with self._lock:
+            self._expire()
+            now = self.clock()
+            lookups = self.hits + self.misses
+            return {
+                "datasets": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_secs": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": dict(self.evictions),
+                "oversized": len(self._oversized),
+                "resident": [{"dataset_id": dataset_id, "rows": len(frame), "bytes": size,
+                              "idle_secs": round(now - last_used, 3)}
+                             for dataset_id, (frame, size, last_used) in self._entries.items()],
+            }
+
+    def _expire(self):
+        # Caller holds the lock; entries are in order of last use, so the expired ones come first
+        deadline = self.clock() - self.ttl
+        while self._entries and next(iter(self._entries.values()))[2] < deadline:
+            self._remove(next(iter(self._entries)))
+            self.evictions["ttl"] += 1
+
+    def _remove(self, dataset_id):
+        # Caller holds the lock
+        entry = self._entries.pop(dataset_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
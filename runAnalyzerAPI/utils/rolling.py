@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86_400 * 10**9
+
+# Calendar window of the moving average of every time series (and of the *_MA_30 columns)
+MOVING_AVERAGE_DAYS = 30
+
+# Longest calendar window or EWMA span a request may ask for
+MAX_WINDOW_DAYS = 3650
+
+
+def day_numbers(timestamps):
+    """
+    Return the calendar day of each timestamp, as days since the epoch.
+
+    Args:
+        timestamps (np.ndarray): int64 nanoseconds (datetime64[ns] values viewed as int64).
+    """
+    return np.asarray(timestamps, dtype=np.int64) // NS_PER_DAY
+
+
+def series_windows(windows=None):
+    """
+    Windows of a time series: the MOVING_AVERAGE_DAYS one and the requested ones, in increasing order.
+    """
+    return sorted({MOVING_AVERAGE_DAYS, *(windows or [])})
+
+
+def window_label(days):
+    return f"{days}D"
+
+
+def ewma_label(span):
+    return f"EWMA {span}D"
+
+
+def daily_totals(days, values):
+    """
+    Sum and count of the non-missing values of each calendar day.
+
+    Args:
+        days (np.ndarray): Day of each value (see day_numbers), in any order.
+        values (np.ndarray): Values of the metric (NaN for missing).
+
+    Returns:
+        tuple: Sorted distinct days, float64 sums and int64 counts.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    distinct, inverse = np.unique(days, return_inverse=True)
+    sums = np.bincount(inverse[present], weights=values[present], minlength=len(distinct))
+    counts = np.bincount(inverse[present], minlength=len(distinct))
+    return distinct, sums, counts
+
+
+class DailyTotals:
+    """
+    Daily sums and counts of one metric, merged chunk by chunk.
+
+    The state grows with the calendar span of the export (one entry per active day), not with
+    its rows, and the rolling statistics computed from it are those of the full series whatever
+    the order of the chunks.
+    """
+
+    def __init__(self):
+        self.days = np.empty(0, dtype=np.int64)
+        self.sums = np.empty(0)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def update(self, days, values):
+        days, sums, counts = daily_totals(days, values)
+        merged, inverse = np.unique(np.concatenate([self.days, days]), return_inverse=True)
+        self.sums = np.bincount(inverse, weights=np.concatenate([self.sums, sums]), minlength=len(merged))
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                                  minlength=len(merged)).astype(np.int64)
+        self.days = merged
+
+    def stats(self, windows=(MOVING_AVERAGE_DAYS,), spans=()):
+        return RollingStats(self.days, self.sums, self.counts, windows, spans)
+
+
+class RollingStats:
+    """
+    Trailing calendar-window means and EWMAs of one metric, computed together on its daily grid.
+
+    The daily sums and counts are laid on a dense DatetimeIndex-like grid (one slot per day from
+    the first to the last active day) and accumulated once; the mean over the N days ending on
+    day d is then (sums[d] - sums[d - N]) / (counts[d] - counts[d - N]) for every window, and each
+    EWMA is one pass over the same grid. Everything is O(rows + days), whatever the row order.
+
+    A window covers whole days: every activity of a day gets the same value, computed from the
+    activities of that day and the N - 1 days before. Days whose window holds no value are NaN.
+    EWMA spans are in days too (alpha = 2 / (span + 1) per day, as pandas' ewm(span=...) on the
+    daily grid), so that gaps between activities decay the weights.
+    """
+
+    def __init__(self, days, sums, counts, windows=(MOVING_AVERAGE_DAYS,), spans=()):
+        self.first_day = int(days[0]) if len(days) else 0
+        n_days = int(days[-1]) - self.first_day + 1 if len(days) else 0
+        slots = np.asarray(days, dtype=np.int64) - self.first_day
+        grid_sums = np.bincount(slots, weights=sums, minlength=n_days)
+        grid_counts = np.bincount(slots, weights=counts, minlength=n_days)
+
+        # Shared running totals, with a leading zero so that any window is a difference of two
+        cumulative_sums = np.concatenate([[0.0], np.cumsum(grid_sums)])
+        cumulative_counts = np.concatenate([[0.0], np.cumsum(grid_counts)])
+        ends = np.arange(1, n_days + 1)
+
+        self.stats = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for window in windows:
+                starts = np.maximum(ends - window, 0)
+                self.stats[window_label(window)] = (
+                    (cumulative_sums[ends] - cumulative_sums[starts])
+                    / (cumulative_counts[ends] - cumulative_counts[starts])
+                )
+            for span in spans:
+                # Both averages share their weights, so their ratio weighs the values alone
+                weighted_sums = pd.Series(grid_sums).ewm(span=span).mean().to_numpy()
+                weighted_counts = pd.Series(grid_counts).ewm(span=span).mean().to_numpy()
+                self.stats[ewma_label(span)] = np.where(weighted_counts > 0, weighted_sums / weighted_counts, np.nan)
+
+    def at(self, days):
+        """
+        Return {label: values} of every statistic on the given days (which must lie on the grid).
+        """
+        slots = np.asarray(days, dtype=np.int64) - self.first_day
+        return {label: values[slots] for label, values in self.stats.items()}
+
+
+def rolling_stats(dates, values, windows=(MOVING_AVERAGE_DAYS,), spans=()):
+    """
+    Trailing calendar-window means and EWMAs of a metric, for each of its rows.
+
+    Args:
+        dates (pd.Series): datetime64 date of each row, in any order (e.g. newest first).
+        values (pd.Series): The metric (NaN for missing).
+        windows (iterable): Windows in days, e.g. (7, 30, 90, 365).
+        spans (iterable): EWMA spans in days.
+
+    Returns:
+        dict: {"30D": np.ndarray, "EWMA 14D": np.ndarray, ...} aligned with the rows.
+    """
+    days = day_numbers(dates.to_numpy(dtype="datetime64[ns]").view(np.int64))
+    stats = RollingStats(*daily_totals(days, values.to_numpy(dtype=np.float64, na_value=np.nan)), windows, spans)
+    return stats.at(days)
+
+
+def moving_average(data, col):
+    """
+    MOVING_AVERAGE_DAYS-day mean of a column of an activity frame, in date order (see RollingStats).
+    """
+    return pd.Series(rolling_stats(data['Date'], data[col])[window_label(MOVING_AVERAGE_DAYS)], index=data.index)
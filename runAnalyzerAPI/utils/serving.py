@@ -0,0 +1,119 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from utils.executor import cpu_allotment
+
+# cgroup v1 reports an unlimited memory as a huge byte count rather than "max"
+UNLIMITED_MEMORY_BYTES = 1 << 60
+
+# Columns of the export analyzed by warm_up (config.data_cols, in order)
+WARMUP_HEADER = ("Date,Title,Distance,Calories,Time,Avg HR,Max HR,Avg Run Cadence,Max Run Cadence,Avg Pace,"
+                 "Best Pace,Total Ascent,Total Descent,Avg Stride Length,Best Lap Time,Moving Time,"
+                 "Elapsed Time,Min Elevation,Max Elevation")
+
+# Startup state of this process, reported by GET /ready
+_startup = {"ready": False, "import_seconds": None, "warm_up_seconds": None}
+_warm_up_lock = threading.Lock()
+
+
+def memory_limit_mib():
+    """
+    Return the memory limit of the container in MiB (cgroup v2 `memory.max`, then v1
+    `memory.limit_in_bytes`), or None when it is not limited.
+    """
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                limit = f.read().strip()
+        except OSError:
+            continue
+        if limit == "max" or int(limit) >= UNLIMITED_MEMORY_BYTES:
+            return None
+        return int(limit) // (1024 * 1024)
+    return None
+
+
+def task_cpus(cpu_units=None):
+    """
+    Return the whole CPUs of the task (1024 units per vCPU, rounded up), or the cgroup allotment
+    when its CPU units are not known.
+    """
+    return math.ceil(cpu_units / 1024) if cpu_units else cpu_allotment()
+
+
+def worker_count(cpu_units=None, memory_mib=None, worker_memory_mib=256, reserved_mib=64):
+    """
+    Number of serving processes for the container: one per CPU, as far as the memory allows.
+
+    Args:
+        cpu_units (int): CPU of the ECS task (1024 units per vCPU); the cgroup allotment when None.
+        memory_mib (int): Memory of the task (its memory_limit_mib); the cgroup limit when None.
+        worker_memory_mib (int): Memory one worker and its analysis pool need under load.
+        reserved_mib (int): Memory kept for the master process.
+
+    Returns:
+        int: At least 1.
+    """
+    cpus = task_cpus(cpu_units)
+    memory_mib = memory_mib or memory_limit_mib()
+    if memory_mib is None:
+        return max(1, cpus)
+    return max(1, min(cpus, (memory_mib - reserved_mib) // worker_memory_mib))
+
+
+def warmup_export(rows=40):
+    """
+    A small Garmin-like export (CSV bytes) covering the layouts the parser meets: thousands
+    separators, '--' placeholders, M:S and H:M:S durations, over 80 days (several 30-day windows).
+    """
+    lines = [WARMUP_HEADER]
+    newest = datetime(2024, 12, 31, 7, 15)
+    for i in range(rows):
+        date = newest - timedelta(days=2 * i, hours=i % 12)
+        distance = (5.0, 10.0, 21.1, 8.05)[i % 4]
+        pace = 290 + i % 50
+        secs = int(distance * pace)
+        best_pace = "--" if i % 9 == 0 else f"{(pace - 25) // 60}:{(pace - 25) % 60:02}"
+        duration = f"{secs // 3600:02}:{secs // 60 % 60:02}:{secs % 60:02}"
+        lines.append(
+            f'{date:%Y-%m-%d %H:%M:%S},Run {i % 3},{distance:.2f},"1,{i:03}",{duration},{140 + i % 20},'
+            f'{165 + i % 15},{160 + i % 10},{175 + i % 10},{pace // 60}:{pace % 60:02},{best_pace},'
+            f'{20 + i},{21 + i},1.1{i % 10},05:01.2,{duration},{duration},{i % 7},{40 + i}'
+        )
+    return "\n".join(lines).encode("utf-8")
+
+
+def record_import(seconds):
+    """
+    Record how long importing the app took in this process.
+    """
+    _startup["import_seconds"] = seconds
+
+
+def warm_up():
+    """
+    Analyze and encode a small export once (in memory and in streaming mode), so that the first
+    real upload does not pay for pandas' lazy imports and first-call code paths; then mark the
+    process as ready. Called again, it returns at once.
+    """
+    with _warm_up_lock:
+        if _startup["ready"]:
+            return
+        started = time.perf_counter()
+        from utils.encoding import encode_response
+        from utils.pipeline import analyze_upload, analysis_params
+
+        export = warmup_export()
+        for streaming in (False, True):
+            body = analyze_upload(export, analysis_params(streaming=streaming))
+        encode_response(body, "application/json", "br, gzip")
+        _startup.update(ready=True, warm_up_seconds=time.perf_counter() - started)
+
+
+def readiness():
+    """
+    Return the startup state of this process: readiness, import and warm-up durations.
+    """
+    return dict(_startup)
@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from utils.data_prep import DERIVED_COLS, iter_activities, prepare_activities
+from utils.date_range import in_range
+from utils.histograms import bin_edges, histogram_counts, histogram_result, resolve_edges, weighted_quantiles
+from utils.incremental import IncrementalAggregates
+from utils.metrics import format_descriptive_matrix
+from utils.plots import TIME_SERIES, shared_sample_rows, time_series_result
+from utils.rolling import DailyTotals, day_numbers, series_windows
+from utils.timing import stage, count
+
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+# Calculated columns of a chunk: all but the moving averages, which are computed over the whole
+# series from its daily totals (a chunk alone holds only part of their windows)
+CHUNK_COLS = [col for col in DERIVED_COLS if col not in ("Pace_MA_30", "Avg_HR_MA_30")]
+
+
+class ValueCounts:
+    """
+    Distinct values of a column with their counts, merged chunk by chunk (NaN ignored).
+
+    Exports hold few distinct values per field (distances to 10 m, whole seconds, whole bpm),
+    so the state stays small whatever the number of rows, and the histograms and quantiles
+    computed from it are those of the full column.
+    """
+
+    def __init__(self):
+        self.values = np.empty(0)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+        merged, inverse = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                                  minlength=len(merged)).astype(np.int64)
+        self.values = merged
+
+    def histogram(self, bins):
+        """
+        np.histogram(column, bins) of the non-missing values.
+        """
+        edges = bin_edges(self.values, self.counts, bins=bins)
+        return histogram_counts(self.values[:, None], [edges], weights=self.counts)[0][0], edges
+
+    def describe(self):
+        """
+        count, mean, std, min, quartiles and max, as DataFrame.describe computes them.
+        """
+        n = int(self.counts.sum())
+        if n == 0:
+            return [0] + [np.nan] * (3 + len(DESCRIBE_PERCENTILES) + 1)
+
+        mean = float(np.dot(self.values, self.counts) / n)
+        std = float(np.sqrt(np.dot((self.values - mean) ** 2, self.counts) / (n - 1))) if n > 1 else np.nan
+
+        quantiles = weighted_quantiles(self.values, self.counts, DESCRIBE_PERCENTILES)
+        return [n, mean, std, float(self.values[0]), *quantiles, float(self.values[-1])]
+
+
+class TimeSeriesSample:
+    """
+    Bounded sample of the rows (date and value of every series) of the time series, with the
+    daily totals of all of them.
+
+    Rows are buffered chunk by chunk; whenever the buffer exceeds 4 * max_points it is reduced
+    to at most 2 * max_points rows shared by the series (see plots.shared_sample_rows, as in
+    get_mov_avg_data), and the final sample to max_points. Series up to max_points rows are kept
+    whole. The moving averages are computed at the kept dates once every chunk has been seen.
+    """
+
+    def __init__(self, max_points):
+        self.max_points = max_points
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, len(TIME_SERIES)))
+        self.daily = [DailyTotals() for _ in TIME_SERIES]
+
+    def update(self, timestamps, values):
+        """
+        Add the rows of a chunk, `values` holding one column per series of TIME_SERIES.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        for daily, column in zip(self.daily, values.T):
+            daily.update(day_numbers(timestamps), column)
+        self.timestamps = np.concatenate([self.timestamps, timestamps])
+        self.values = np.concatenate([self.values, values])
+        if len(self.values) > 4 * self.max_points:
+            self._reduce(2 * self.max_points)
+
+    def result(self, windows=None, spans=None):
+        if len(self.values) > self.max_points:
+            self._reduce(self.max_points)
+        days = day_numbers(self.timestamps)
+        series = {name: (self.values[:, i], daily.stats(series_windows(windows), spans or []).at(days))
+                  for i, (name, daily) in enumerate(zip(TIME_SERIES, self.daily))}
+        dates = pd.Series(pd.to_datetime(self.timestamps)).astype(str).tolist()
+        return time_series_result(dates, series, extra=bool(windows or spans))
+
+    def _reduce(self, n_out):
+        rows = shared_sample_rows(self.timestamps, self.values, n_out)
+        self.timestamps, self.values = self.timestamps[rows], self.values[rows]
+
+
+class StreamingAnalysis:
+    """
+    Running accumulators producing the sections of utils.pipeline.analyze from chunks of an export.
+
+    Totals, yearly statistics, weekday paces and best performances reuse the mergeable
+    accumulators of IncrementalAggregates (without the activity log); the descriptive matrix
+    and histograms are read from per-column ValueCounts; the time series are kept as a bounded
+    TimeSeriesSample, whose moving averages come from the daily totals of the whole series.
+    """
+
+    def __init__(self, params, max_points):
+        self.params = params
+        self.aggregates = IncrementalAggregates(params["yearly_stats_cols"], params["main_distances"],
+                                                top_k=params["best_effort_k"],
+                                                tolerance=params["best_effort_tolerance"])
+        self.describe_cols = None  # numeric desc_matrix_cols, known from the first chunk
+        self.value_counts = {}
+        self.group_counts = {}  # (histogram field, group) -> ValueCounts, with params["histogram_by"]
+        self.pace_sum = 0.0
+        self.pace_count = 0
+        self.time_series = TimeSeriesSample(max_points)
+
+    def update(self, data):
+        """
+        Fold the next prepared chunk (as returned by prepare_activities) into the accumulators.
+        """
+        self.aggregates.fold(data)
+
+        if self.describe_cols is None:
+            # describe() only reports numeric columns
+            self.describe_cols = [col for col in self.params["desc_matrix_cols"]
+                                  if col in data.columns and is_numeric_dtype(data[col])]
+        for col in {*self.describe_cols, *self.params["histogram_cols"]} & set(data.columns):
+            self.value_counts.setdefault(col, ValueCounts()).update(data[col])
+        by = self.params["histogram_by"]
+        if by is not None:
+            fields = [col for col in self.params["histogram_cols"] if col in data.columns]
+            for group, rows in data.groupby(by).indices.items():
+                for col in fields:
+                    self.group_counts.setdefault((col, group), ValueCounts()).update(data[col].to_numpy()[rows])
+
+        pace = data["Avg_pace_secs"].to_numpy(dtype=np.float64)
+        self.pace_sum += float(np.nansum(pace))
+        self.pace_count += int(np.count_nonzero(~np.isnan(pace)))
+
+        timestamps = data["Date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        self.time_series.update(timestamps, np.column_stack([data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                                                             for col in TIME_SERIES.values()]))
+
+    def results(self):
+        """
+        Return the response body, in the format of utils.pipeline.analyze.
+        """
+        aggregated = self.aggregates.results()
+        return {
+            "desc_matrix": self._descriptive_matrix(),
+            "avg_pace_day_week": aggregated["avg_pace_day_week"],
+            "totals": aggregated["totals"],
+            "yearly_statistics": aggregated["yearly_statistics"],
+            "histogram_data": self._histograms(),
+            "time_series_data": self.time_series.result(self.params["time_series_windows"],
+                                                        self.params["time_series_spans"]),
+            "best_perf": aggregated["best_perf"],
+        }
+
+    def _descriptive_matrix(self):
+        stats = pd.DataFrame(
+            [self.value_counts[col].describe() for col in self.describe_cols or []],
+            index=self.describe_cols or [],
+            columns=["count", "mean", "std", "min", "25%", "50%", "75%", "max"],
+            dtype=np.float64,
+        )
+        avg_pace = self.pace_sum / self.pace_count if self.pace_count else np.nan
+        return format_descriptive_matrix(stats, avg_pace)
+
+    def _histograms(self):
+        # Binned from the distinct values and their counts, as utils.histograms bins the rows
+        params = self.params
+        histogram_data = {}
+        for field in params["histogram_cols"]:
+            if field not in self.value_counts:
+                histogram_data[field] = {"error": f"{field} not found in dataset"}
+                continue
+            column = self.value_counts[field]
+            edges = resolve_edges(column.values, column.counts, field, params["histogram_strategy"],
+                                  params["histogram_bins"], params["histogram_widths"], params["histogram_edges"])
+            if params["histogram_by"] is None:
+                counts = histogram_counts(column.values[:, None], [edges], weights=column.counts)[0]
+                histogram_data[field] = histogram_result(edges, counts)
+                continue
+
+            names = sorted(group for col, group in self.group_counts if col == field)
+            groups = [self.group_counts[(field, name)] for name in names]
+            counts = histogram_counts(
+                np.concatenate([group.values for group in groups])[:, None], [edges],
+                weights=np.concatenate([group.counts for group in groups]),
+                groups=np.repeat(np.arange(len(groups)), [len(group.values) for group in groups]),
+                n_groups=len(groups),
+            )[0]
+            histogram_data[field] = histogram_result(edges, counts, names)
+        return histogram_data
+
+
+def analyze_stream(file, params, chunk_rows, max_points):
+    """
+    Analyze an export chunk by chunk, with memory bounded by the chunk size.
+
+    Args:
+        file: Upload content as accepted by iter_activities (a path or stream keeps memory bounded).
+        params (dict): Settings from utils.pipeline.analysis_params.
+        chunk_rows (int): Rows per chunk.
+        max_points (int): Points kept per time series.
+
+    Returns:
+        dict: The response body of utils.pipeline.analyze. Sections match the in-memory analysis
+        up to floating-point summation order; time series longer than max_points are downsampled.
+    """
+    analysis = StreamingAnalysis(params, max_points)
+    dated = params["date_start"] or params["date_end"]
+    rows = selected = 0
+    for chunk in iter_activities(file, chunk_rows):
+        prepared = prepare_activities(chunk, CHUNK_COLS)
+        rows += len(chunk)
+        if dated:
+            # A chunk is in file order, so its rows are masked rather than binary-searched
+            timestamps = prepared["Date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+            prepared = prepared[in_range(timestamps, params["date_start"], params["date_end"])]
+            if prepared.empty:
+                continue
+        with stage("accumulate"):
+            analysis.update(prepared)
+        selected += len(prepared)
+
+    if rows == 0:
+        raise ValueError("No activities in the uploaded file")
+    if selected == 0:
+        raise ValueError("No activities in the selected date range")
+    count("rows", rows)
+    with stage("finalize"):
+        return analysis.results()
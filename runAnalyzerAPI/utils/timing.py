@@ -0,0 +1,196 @@
+import contextvars
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Timer of the job running in the current thread / task (None outside run_timed)
+_current_timer = contextvars.ContextVar("stage_timer", default=None)
+
+# Bucket upper bounds of the latency histograms, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Bucket upper bounds of the upload size histograms
+ROW_BUCKETS = (100, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000)
+BYTE_BUCKETS = tuple(2 ** power for power in range(14, 32, 2))  # 16 KiB .. 1 GiB
+
+
+class StageTimer:
+    """
+    Wall-clock time of the named stages of one request, in the order they first ran.
+
+    A stage entered several times (e.g. once per chunk) accumulates its time. Counters hold
+    values measured along the way, such as the number of rows. `on_stage`, if given, is called
+    with the name of each stage as it starts (progress reporting).
+    """
+
+    def __init__(self, on_stage=None):
+        self.stages = {}
+        self.counters = {}
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        if self.on_stage is not None:
+            self.on_stage(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def merge(self, stages, counters=None):
+        """
+        Add the stages and counters measured elsewhere (e.g. in a worker process).
+        """
+        for name, seconds in stages.items():
+            self.add(name, seconds)
+        self.counters.update(counters or {})
+
+    def server_timing(self):
+        """
+        Format the stages as a Server-Timing header value ('load_data;dur=12.3, ...').
+        """
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a pipeline step into the timer of the current job; a no-op when none is active.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def count(name, value):
+    """
+    Record a counter (e.g. rows) into the timer of the current job, if any.
+    """
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.counters[name] = value
+
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of this process, in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+
+
+def run_timed(func, *args):
+    """
+    Run `func(*args)` with a fresh StageTimer active; the unit of work sent to the executor.
+
+    Returns:
+        tuple: (result, stages, counters), picklable so that it can leave a worker process.
+        counters include the peak RSS of the process that ran the job.
+    """
+    return run_timed_reporting(None, func, *args)
+
+
+def run_timed_on_frame(frame, func, *args):
+    """
+    run_timed(func, frame, *args), in the argument order of AnalysisExecutor.run_on_frame.
+    """
+    return run_timed(func, frame, *args)
+
+
+def run_timed_reporting(on_stage, func, *args):
+    """
+    run_timed, calling `on_stage(name)` as each stage starts (must be picklable for a process pool).
+    """
+    timer = StageTimer(on_stage)
+    token = _current_timer.set(timer)
+    try:
+        result = func(*args)
+    finally:
+        _current_timer.reset(token)
+    timer.counters["peak_rss_bytes"] = peak_rss_bytes()
+    return result, timer.stages, timer.counters
+
+
+class Histogram:
+    """
+    Cumulative Prometheus histogram, one series per label value.
+    """
+
+    def __init__(self, name, help_text, buckets, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self.series = {}  # label value -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, label_value=None):
+        series = self.series.setdefault(label_value, [0] * (len(self.buckets) + 1) + [0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, series in sorted(self.series.items(), key=lambda item: str(item[0])):
+            labels = f'{self.label}="{label_value}",' if self.label else ""
+            for bound, bucket_count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{labels}le="+Inf"}} {series[-2]}')
+            suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-1]:.6g}")
+            lines.append(f"{self.name}_count{suffix} {series[-2]}")
+        return lines
+
+
+class UploadMetrics:
+    """
+    Process-wide latency, size and memory metrics of the uploads, in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = Histogram("runapi_upload_stage_seconds", "Time spent per pipeline stage of an upload.",
+                                       LATENCY_BUCKETS, label="stage")
+        self.request_seconds = Histogram("runapi_upload_seconds", "Total handling time of an upload.",
+                                         LATENCY_BUCKETS, label="cache")
+        self.rows = Histogram("runapi_upload_rows", "Activities per analyzed upload.", ROW_BUCKETS)
+        self.upload_bytes = Histogram("runapi_upload_bytes", "Size of the uploaded files.", BYTE_BUCKETS)
+        self.peak_rss = 0
+
+    def observe(self, timer, total_seconds, upload_bytes=None, cache_hit=False):
+        """
+        Record the stages and counters of one upload.
+        """
+        with self._lock:
+            for name, seconds in timer.stages.items():
+                self.stage_seconds.observe(seconds, name)
+            self.request_seconds.observe(total_seconds, "hit" if cache_hit else "miss")
+            if "rows" in timer.counters:
+                self.rows.observe(timer.counters["rows"])
+            if upload_bytes is not None:
+                self.upload_bytes.observe(upload_bytes)
+            self.peak_rss = max(self.peak_rss, timer.counters.get("peak_rss_bytes", 0))
+
+    def render(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = []
+            for histogram in (self.stage_seconds, self.request_seconds, self.rows, self.upload_bytes):
+                lines.extend(histogram.render())
+            lines += ["# HELP runapi_peak_rss_bytes Peak resident set size of the API and its analysis workers.",
+                      "# TYPE runapi_peak_rss_bytes gauge",
+                      f"runapi_peak_rss_bytes {max(self.peak_rss, peak_rss_bytes())}"]
+        return "\n".join(lines) + "\n"
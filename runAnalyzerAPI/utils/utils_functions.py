@@ -1,28 +1,15 @@
 import numpy as np
 import pandas as pd
-
-
-def list_element_to_int(my_list: list):
-    """
-    returns elements of a list as integers
-    """
-    try:
-        res = [int(x) for x in my_list]
-        if len(res) > 2:
-            return res[0] * 3600 + res[1] * 60 + res[2]
-        else:
-            return res[0] * 60 + res[1]
-    except Exception as e:
-        return np.nan
+from pandas.api.types import is_datetime64_any_dtype, is_float_dtype
+from utils.durations import parse_durations
 
 
 def hms_to_secs(time: pd.Series):
     """
-    Converts time in the h:m:s format to seconds using the list_element_to_int fun
+    Converts time in the h:m:s format to seconds (decimals are dropped).
+    Kept for backwards compatibility, see utils.durations.parse_durations
     """
-    temp = time.apply(lambda x: x.split('.')[0])  # remove decimals (all after .)
-    temp2 = temp.str.split(':')
-    return temp2.apply(lambda x: list_element_to_int(x))
+    return parse_durations(time, keep_fraction=False)
 
 
 def secs_to_hms(seconds):
@@ -50,23 +37,41 @@ def secs_to_hms(seconds):
         return f"{minutes:02}:{remaining_seconds:05.2f}"  # MM:SS.ss
 
 
-def clean_nan_values(data):
+def finite_values(values):
     """
-    Recursively replace NaN and invalid float values in nested structures (dicts/lists).
+    Convert an array-like to a list, replacing NaN and infinite floats with 0 (JSON has no NaN).
 
     Args:
-        data: The data to clean (can be dict, list, or scalar).
+        values: Array-like of numbers.
 
     Returns:
-        Cleaned data with NaN and invalid values replaced.
+        list: Python scalars ready for json.dumps.
     """
-    if isinstance(data, dict):
-        return {k: clean_nan_values(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [clean_nan_values(v) for v in data]
-    elif isinstance(data, float):
-        # Replace NaNs and infinities with 0 (or another default value)
-        if data != data or data in [float("inf"), float("-inf")]:
-            return 0
-    return data
+    array = np.asarray(values)
+    if array.dtype.kind == "f":
+        array = np.where(np.isfinite(array), array, 0.0)
+    return array.tolist()
+
 
+def json_ready_frame(frame):
+    """
+    Make a DataFrame safe for json.dumps column by column: NaN and infinite floats become 0,
+    missing objects become 0 and datetimes become ISO 8601 strings.
+
+    Args:
+        frame (pd.DataFrame): Frame about to be converted with to_dict.
+
+    Returns:
+        pd.DataFrame: Cleaned copy of the frame.
+    """
+    columns = {}
+    for col in frame.columns:
+        series = frame[col]
+        if is_datetime64_any_dtype(series):
+            series = series.map(pd.Timestamp.isoformat, na_action="ignore").astype(object)
+        elif is_float_dtype(series):
+            series = series.where(np.isfinite(series), 0.0)
+        elif series.dtype == object:
+            series = series.where(series.notna(), 0)
+        columns[col] = series
+    return pd.DataFrame(columns, index=frame.index)
@@ -1,24 +1,59 @@
+import os
+
 from aws_cdk import (
     Stack,
+    Duration,
     RemovalPolicy,
     CfnOutput
 )
 from aws_cdk import aws_ec2 as ec2
 from aws_cdk import aws_ecs as ecs
+from aws_cdk import aws_efs as efs
 from aws_cdk import aws_autoscaling as autoscaling
+from aws_cdk import aws_elasticloadbalancingv2 as elbv2
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_s3 as s3
 from aws_cdk import aws_s3_deployment as s3_deployment
 from constructs import Construct
 
+# The web UI sources, found from any working directory
+WEB_UI_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web-ui")
+
+# Mount point of the EFS volume the tasks share
+SHARED_DATA_DIR = "/data"
+
+# Ephemeral ports ECS picks the host ports of the tasks from (dynamic port mapping)
+EPHEMERAL_PORTS = ec2.Port.tcp_range(32768, 65535)
+
+
 class RunAppAwsStack(Stack):
-    def __init__(self, scope: Construct, id: str, **kwargs) -> None:
+    """
+    The API on ECS (EC2 launch type) behind an Application Load Balancer, and the web UI on S3.
+
+    Tasks scale out on CPU and on requests per task; the Auto Scaling Group follows the tasks
+    through the capacity provider's managed scaling. Tasks get dynamic host ports, so several
+    of them fit on one instance. Jobs, stored datasets and incremental aggregates are kept on
+    an EFS file system every task mounts, so any task answers for them; sticky sessions keep a
+    client on the task whose in-memory caches hold its results.
+
+    Args:
+        admin_cidr (str): Network allowed to SSH into the instances (no SSH access when None).
+        instance_type (str): EC2 instance type of the cluster.
+        min_tasks, max_tasks (int): Bounds of the number of API tasks.
+        max_instances (int): Upper bound of the Auto Scaling Group.
+        target_cpu_percent (int): Average CPU of the tasks the service scales to.
+        requests_per_task (int): ALB requests per task and minute the service scales to.
+    """
+
+    def __init__(self, scope: Construct, id: str, admin_cidr: str = None, instance_type: str = "t3.small",
+                 min_tasks: int = 1, max_tasks: int = 6, max_instances: int = 3, target_cpu_percent: int = 60,
+                 requests_per_task: int = 120, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Create a VPC with public subnets
+        # Create a VPC with public subnets (two AZs, as the load balancer requires)
         vpc = ec2.Vpc(
             self, "RunApiVpc",
-            max_azs=1,
+            max_azs=2,
             subnet_configuration=[
                 ec2.SubnetConfiguration(
                     subnet_type=ec2.SubnetType.PUBLIC,
@@ -35,24 +70,13 @@ class RunAppAwsStack(Stack):
             allow_all_outbound=True
         )
 
-        # Inbound rules
-        security_group.add_ingress_rule(
-            peer=ec2.Peer.ipv4(""), # Update with your IP
-            connection=ec2.Port.tcp(8000),
-            description="Allow Custom TCP on 8000"
-        )
-        security_group.add_ingress_rule(
-            peer=ec2.Peer.any_ipv4(),
-            connection=ec2.Port.tcp(80),
-            description="Allow HTTP access"
-        )
-        
-        # Add SSH access to Security Group
-        security_group.add_ingress_rule(
-            peer=ec2.Peer.ipv4(""),  # Update with your IP
-            connection=ec2.Port.tcp(22),
-            description="Allow SSH access"
-        )
+        # Inbound rules: API traffic only comes through the load balancer (see below)
+        if admin_cidr:
+            security_group.add_ingress_rule(
+                peer=ec2.Peer.ipv4(admin_cidr),
+                connection=ec2.Port.tcp(22),
+                description="Allow SSH access"
+            )
 
         # ECS Cluster
         cluster = ecs.Cluster(
@@ -74,23 +98,26 @@ class RunAppAwsStack(Stack):
         # Create an Auto Scaling Group
         asg = autoscaling.AutoScalingGroup(
             self, "RunApiASG",
-            instance_type=ec2.InstanceType("t3.micro"),
+            instance_type=ec2.InstanceType(instance_type),
             machine_image=ecs.EcsOptimizedImage.amazon_linux2(),
             vpc=vpc,
             role=ec2_instance_role,
             security_group=security_group,
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC),
-            desired_capacity=1,  # Number of EC2 instances
+            min_capacity=1,
+            max_capacity=max_instances,
             key_name="ec2-run" # beforehand, create a key pair for the EC2 instance and assign it here
         )
 
-        # Attach the Auto Scaling Group to the ECS cluster
-        cluster.add_asg_capacity_provider(
-            ecs.AsgCapacityProvider(
-                self, "AsgCapacityProvider",
-                auto_scaling_group=asg
-            )
+        # Attach the Auto Scaling Group to the ECS cluster. Managed scaling tracks the capacity the
+        # tasks reserve: instances are added when a new task does not fit and removed once empty
+        capacity_provider = ecs.AsgCapacityProvider(
+            self, "AsgCapacityProvider",
+            auto_scaling_group=asg,
+            enable_managed_scaling=True,
+            target_capacity_percent=100,
         )
+        cluster.add_asg_capacity_provider(capacity_provider)
 
         task_execution_role = iam.Role(
             self, "RunApiTaskExecutionRole",
@@ -124,16 +151,57 @@ class RunAppAwsStack(Stack):
             execution_role=task_execution_role
         )
 
+        # Shared state of the tasks (jobs, stored datasets, incremental aggregates) lives on EFS, so that
+        # any task can answer for it; the result cache and resident frames stay per task
+        file_system = efs.FileSystem(
+            self, "RunApiData",
+            vpc=vpc,
+            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC),
+            encrypted=True,
+            removal_policy=RemovalPolicy.RETAIN,
+        )
+        file_system.connections.allow_default_port_from(security_group, "NFS from the container instances")
+        task_definition.add_volume(
+            name="run-api-data",
+            efs_volume_configuration=ecs.EfsVolumeConfiguration(
+                file_system_id=file_system.file_system_id,
+                transit_encryption="ENABLED",
+            ),
+        )
+
+        # The API sizes its worker processes from the task's CPU and memory (gunicorn.conf.py)
+        api_memory_limit_mib = 512
+        api_cpu_units = 256
+
         container = task_definition.add_container(
             "RunApiContainer",
             image=ecs.ContainerImage.from_registry("767397959554.dkr.ecr.eu-central-1.amazonaws.com/run-api-repo:latest"),
-            memory_limit_mib=512,
-            cpu=256,
+            memory_limit_mib=api_memory_limit_mib,
+            cpu=api_cpu_units,
+            environment={
+                "RUNAPI_MEMORY_LIMIT_MIB": str(api_memory_limit_mib),
+                "RUNAPI_CPU_UNITS": str(api_cpu_units),
+                # Job records in files, readable from every task; incremental updates lock their file
+                "RUNAPI_JOB_STORE": "file",
+                "RUNAPI_JOB_DIR": f"{SHARED_DATA_DIR}/jobs",
+                "RUNAPI_DATASET_DIR": f"{SHARED_DATA_DIR}/datasets",
+                "RUNAPI_INCREMENTAL_DIR": f"{SHARED_DATA_DIR}/incremental",
+            },
+            # Liveness only: /health answers without pandas, while /ready waits for the warm-up
+            health_check=ecs.HealthCheck(
+                command=["CMD-SHELL", "python -c \"import urllib.request; urllib.request.urlopen('http://localhost:8000/health')\""],
+                start_period=Duration.seconds(30),
+            ),
             logging=ecs.LogDrivers.aws_logs(stream_prefix="RunApi")
         )
 
+        container.add_mount_points(
+            ecs.MountPoint(container_path=SHARED_DATA_DIR, source_volume="run-api-data", read_only=False)
+        )
+
+        # Host port 0: ECS picks a free ephemeral port per task, so several tasks share an instance
         container.add_port_mappings(
-            ecs.PortMapping(container_port=8000, host_port=8000)
+            ecs.PortMapping(container_port=8000, host_port=0)
         )
 
         # ECS Service
@@ -141,7 +209,53 @@ class RunAppAwsStack(Stack):
             self, "RunApiService",
             cluster=cluster,
             task_definition=task_definition,
-            desired_count=1
+            desired_count=min_tasks,
+            capacity_provider_strategies=[
+                ecs.CapacityProviderStrategy(capacity_provider=capacity_provider.capacity_provider_name, weight=1)
+            ],
+            # Time for the app to import and warm up before the load balancer checks count
+            health_check_grace_period=Duration.seconds(60),
+        )
+
+        # Internet-facing load balancer in front of the tasks
+        load_balancer = elbv2.ApplicationLoadBalancer(
+            self, "RunApiLoadBalancer",
+            vpc=vpc,
+            internet_facing=True,
+        )
+        listener = load_balancer.add_listener("RunApiListener", port=80, open=True)
+
+        # A task receives requests once /ready answers, i.e. after its warm-up analysis
+        target_group = listener.add_targets(
+            "RunApiTargets",
+            port=80,
+            targets=[ecs_service.load_balancer_target(container_name="RunApiContainer", container_port=8000)],
+            health_check=elbv2.HealthCheck(
+                path="/ready",
+                interval=Duration.seconds(15),
+                healthy_threshold_count=2,
+                unhealthy_threshold_count=3,
+            ),
+            deregistration_delay=Duration.seconds(30),
+            # A client keeps hitting one task: its follow-ups find the frames and results that task holds
+            stickiness_cookie_duration=Duration.hours(1),
+        )
+        security_group.connections.allow_from(load_balancer, EPHEMERAL_PORTS, "Load balancer to the tasks")
+
+        # Task count tracking CPU and requests per task, whichever asks for more tasks
+        task_scaling = ecs_service.auto_scale_task_count(min_capacity=min_tasks, max_capacity=max_tasks)
+        task_scaling.scale_on_cpu_utilization(
+            "CpuScaling",
+            target_utilization_percent=target_cpu_percent,
+            scale_in_cooldown=Duration.seconds(300),
+            scale_out_cooldown=Duration.seconds(60),
+        )
+        task_scaling.scale_on_request_count(
+            "RequestScaling",
+            requests_per_target=requests_per_task,
+            target_group=target_group,
+            scale_in_cooldown=Duration.seconds(300),
+            scale_out_cooldown=Duration.seconds(60),
         )
 
         # S3 Bucket for Web UI
@@ -157,10 +271,16 @@ class RunAppAwsStack(Stack):
 
         s3_deployment.BucketDeployment(
             self, "DeployWebUi",
-            sources=[s3_deployment.Source.asset("./web-ui")],
+            sources=[s3_deployment.Source.asset(WEB_UI_DIR)],
             destination_bucket=web_ui_bucket
         )
 
+        CfnOutput(
+            self, "ApiUrl",
+            value=f"http://{load_balancer.load_balancer_dns_name}",
+            description="URL of the API behind the load balancer"
+        )
+
         CfnOutput(
             self, "WebUiBucketUrl",
             value=web_ui_bucket.bucket_website_url,
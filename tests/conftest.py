@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The API modules import each other as top-level packages (`utils`, `config`, `api`),
+# the same way they are resolved inside the container's working directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runAnalyzerAPI"))
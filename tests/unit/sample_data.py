@@ -0,0 +1,18 @@
+"""
+A tiny Garmin Connect activities export used by the API tests.
+"""
+
+HEADER = ("Activity Type,Date,Favorite,Title,Distance,Calories,Time,Avg HR,Max HR,Avg Run Cadence,"
+          "Max Run Cadence,Avg Pace,Best Pace,Total Ascent,Total Descent,Avg Stride Length,"
+          "Best Lap Time,Moving Time,Elapsed Time,Min Elevation,Max Elevation")
+
+ROWS = [
+    'Running,2024-03-10 08:15:00,false,Sunday Run,10.01,"1,012",00:52:10,151,172,166,182,5:13,4:40,85,84,1.15,00:05:01.2,00:52:00,00:53:30,12,48',
+    'Running,2024-03-07 18:30:00,false,Evening Run,5.00,402,00:27:30,146,165,164,178,5:30,4:55,30,31,1.10,00:05:20.4,00:27:20,00:28:00,10,25',
+    'Running,2024-03-05 07:00:00,false,Tempo,8.05,688,00:38:00,160,178,170,186,4:43,4:20,45,44,1.21,00:04:35.9,00:37:50,00:38:40,11,40',
+    'Running,2023-11-20 12:00:00,false,Long Run,21.10,"1,905",01:55:03,149,169,163,180,5:27,--,210,209,1.12,00:05:10.0,01:54:30,01:58:00,9,120',
+]
+
+
+def make_csv(rows=ROWS):
+    return "\n".join([HEADER] + rows).encode("utf-8")
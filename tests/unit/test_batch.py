@@ -0,0 +1,46 @@
+import io
+import zipfile
+
+import pytest
+
+from tests.unit.sample_data import ROWS, make_csv
+from utils.batch import expand_uploads, merge_activities, read_batch
+from utils.data_prep import load_data
+from utils.pipeline import analyze, analyze_batch
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_expand_uploads_reads_csvs_and_zip_members():
+    archive = make_zip({"a.csv": make_csv(ROWS[:2]), "notes.txt": b"x", "__MACOSX/._a.csv": b"x"})
+    sources = expand_uploads([("b.csv", make_csv(ROWS[2:])), ("export.zip", archive)], max_files=10, max_bytes=10**6)
+
+    assert [name for name, _ in sources] == ["b.csv", "export.zip/a.csv"]
+    with pytest.raises(ValueError):
+        expand_uploads([("export.zip", archive)], max_files=10, max_bytes=10)
+    with pytest.raises(ValueError):
+        expand_uploads([("a.json", b"{}")], max_files=10, max_bytes=10**6)
+
+
+def test_merge_dedupes_overlaps_and_sorts_newest_first():
+    # Oldest export first, overlapping on ROWS[2]
+    frames = read_batch([("old.csv", make_csv(ROWS[2:])), ("new.csv", make_csv(ROWS[:3]))], max_workers=2)
+    merged = merge_activities(frames)
+
+    assert len(merged) == len(ROWS)
+    assert merged["Date"].is_monotonic_decreasing
+
+
+def test_batch_analysis_matches_single_export():
+    body = analyze_batch([("old.csv", make_csv(ROWS[1:])), ("new.zip", make_zip({"new.csv": make_csv(ROWS[:2])}))])
+    full = analyze(load_data(make_csv()))
+
+    assert body["unique_activities"] == len(ROWS) and body["total_activities"] == len(ROWS) + 1
+    for section, value in full.items():
+        assert body[section] == value
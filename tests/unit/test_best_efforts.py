@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from utils.best_efforts import best_efforts
+
+
+def make_runs(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    distance = np.round(rng.uniform(0.5, 25, n), 2)
+    pace = rng.integers(240, 420, n).astype(float)
+    pace[::37] = np.nan
+    return pd.DataFrame({
+        "Date": pd.date_range("2020-01-01", periods=n, freq="D"),
+        "Distance": distance,
+        "Time": "00:30:00",
+        "Avg Pace": "5:00",
+        "Avg_pace_secs": pace,
+    })
+
+
+def test_matches_mask_and_sort():
+    data = make_runs()
+    distances = list(range(1, 26))
+    result = best_efforts(data, distances, tolerance=0.3, k=4)
+
+    for target in distances:
+        window = data[(data["Distance"] <= target + 0.3) & (data["Distance"] >= target - 0.3)]
+        expected = window.sort_values("Avg_pace_secs", kind="stable").head(4)
+        assert [r["Date"] for r in result[target]] == [d.isoformat() for d in expected["Date"]]
+
+
+def test_missing_paces_rank_last():
+    data = pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=3, freq="D"),
+        "Distance": [5.0, 5.01, 4.99],
+        "Time": ["a", "b", "c"],
+        "Avg Pace": ["", "", ""],
+        "Avg_pace_secs": [np.nan, 300.0, 310.0],
+    })
+    result = best_efforts(data, [5, 10], k=3)
+    assert [r["Time"] for r in result[5]] == ["b", "c", "a"]
+    assert result[10] == []
@@ -0,0 +1,68 @@
+import hashlib
+import io
+import os
+
+from utils import cache
+from utils.cache import AnalysisCache, make_cache_key, make_dataset_cache_key
+
+
+def test_cache_key_depends_on_content_and_params():
+    stream = io.BytesIO(b"Date,Title\n2024-01-01,Run\n")
+    key = make_cache_key(stream, {"bins": 10})
+
+    assert stream.tell() == 0  # rewound for the parser
+    assert key == make_cache_key(io.BytesIO(stream.getvalue()), {"bins": 10})
+    assert key != make_cache_key(io.BytesIO(stream.getvalue()), {"bins": 20})
+    assert key != make_cache_key(io.BytesIO(b"other"), {"bins": 10})
+
+
+def test_lru_eviction_respects_byte_budget():
+    cache = AnalysisCache(max_bytes=250)
+    cache.put("a", "x" * 100)
+    cache.put("b", "x" * 100)
+    assert cache.get("a") is not None  # "b" becomes least recently used
+    cache.put("c", "x" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= 250
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    AnalysisCache(max_bytes=1024, disk_dir=str(tmp_path)).put("k", {"totals": 1})
+
+    restarted = AnalysisCache(max_bytes=1024, disk_dir=str(tmp_path))
+    assert restarted.get("k") == {"totals": 1}
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_result_keys_carry_the_result_version(monkeypatch):
+    content = b"Date,Title\n2024-01-01,Run\n"
+    key = make_cache_key(io.BytesIO(content), {"bins": 10})
+    dataset_key = make_dataset_cache_key("abc", {"bins": 10})
+    dataset_id = make_cache_key(io.BytesIO(content))
+
+    monkeypatch.setattr(cache, "RESULT_VERSION", cache.RESULT_VERSION + 1)
+    assert make_cache_key(io.BytesIO(content), {"bins": 10}) != key
+    assert make_dataset_cache_key("abc", {"bins": 10}) != dataset_key
+    # Plain content hashes (dataset ids) do not depend on it
+    assert make_cache_key(io.BytesIO(content)) == dataset_id == hashlib.sha256(content).hexdigest()
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache_ = AnalysisCache(max_bytes=1024, disk_dir=str(tmp_path), disk_max_bytes=2500)
+    payload = "x" * 1000
+    cache_.put("a", payload)
+    cache_.put("b", payload)
+    os.utime(tmp_path / "a.pkl", (0, 0))  # "a" unused for a long time
+    cache_.put("c", payload)
+
+    assert sorted(os.listdir(tmp_path)) == ["b.pkl", "c.pkl"]
+    stats = cache_.stats()
+    assert stats["disk_evictions"] == 1 and stats["disk_bytes"] <= 2500
+
+    # A restart measures what is already on disk
+    assert AnalysisCache(max_bytes=1024, disk_dir=str(tmp_path), disk_max_bytes=2500).stats()["disk_bytes"] \
+        == stats["disk_bytes"]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import data_cols
+from tests.unit.sample_data import ROWS, make_csv
+from utils.data_prep import load_data, parse_dates, read_activities, resolve_derived_cols
+
+
+def test_read_activities_applies_schema():
+    # Second row: missing heart rate and ascent, as exported without a sensor
+    rows = [ROWS[0], ROWS[1].replace(",146,", ",--,").replace(",30,31,", ",--,31,")]
+    data = read_activities(make_csv(rows), engine="c")
+
+    assert list(data.columns) == data_cols
+    assert data["Calories"].tolist() == [1012, 402] and data["Calories"].dtype == np.int64
+    assert data["Max HR"].dtype == np.int64
+    assert np.isnan(data["Avg HR"][1]) and np.isnan(data["Total Ascent"][1])
+    assert data["Best Pace"].tolist() == ["4:40", "4:55"]
+    assert pd.isna(read_activities(make_csv(ROWS[3:]), engine="c")["Best Pace"][0])
+
+
+def test_pyarrow_engine_matches_c_engine():
+    pytest.importorskip("pyarrow")
+    pd.testing.assert_frame_equal(read_activities(make_csv(), engine="pyarrow"), read_activities(make_csv(), engine="c"))
+
+
+def test_parse_dates_uses_detected_format_with_fallback():
+    dates = parse_dates(pd.Series(["2024-03-10 08:15:00", "2024-03-07 18:30:00", "03/05/2024 07:00", "not a date"]))
+    assert dates.tolist()[:3] == [pd.Timestamp("2024-03-10 08:15"), pd.Timestamp("2024-03-07 18:30"),
+                                  pd.Timestamp("2024-03-05 07:00")]
+    assert pd.isna(dates[3])
+
+
+def test_derived_columns_are_built_from_their_dependencies_only():
+    assert resolve_derived_cols(["Pace_MA_30", "Year", "Distance"]) == ["Date", "Avg_pace_secs", "Pace_MA_30", "Year"]
+    assert resolve_derived_cols(["Calories", "Distance"]) == []
+
+    data = load_data(make_csv(), columns=["Calories", "Distance"])
+    assert "Short_date" not in data.columns and "Pace_MA_30" not in data.columns
+    assert data["Calories"].sum() == 4007
+
+
+def test_calendar_fields_are_compact():
+    data = load_data(make_csv())
+
+    assert data["Day_of_week"].dtype == np.int8 and data["Day_of_week"].tolist() == [6, 3, 1, 0]
+    assert data["Month"].dtype == np.int8 and data["Year"].dtype == np.int16
+    assert data["Year"].tolist() == [2024, 2024, 2024, 2023]
+    assert isinstance(data["Hour_of_day"].dtype, pd.CategoricalDtype)
+    assert data["Hour_of_day"].astype(int).tolist() == [8, 18, 7, 12]
+    assert data["Short_date"][0] == pd.Timestamp("2024-03-10")
+    assert data["Distance_in_miles"].dtype == np.float32
+    assert data["Title"].dtype == "category" and data["Title"][3] == "Long Run"
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from tests.unit.sample_data import make_csv
+from utils.data_prep import load_data
+from utils.pipeline import analysis_params, analyze, analyze_dataset, store_dataset
+from utils.datasets import DatasetStore
+
+pytest.importorskip("pyarrow")
+
+
+def test_store_round_trip(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    data = load_data(make_csv())
+    info = store.save("runs", data)
+
+    assert info["rows"] == len(data) and info["columns"] == list(data.columns)
+    pd.testing.assert_frame_equal(store.load("runs"), data)
+    assert list(store.load("runs", ["Calories", "Distance", "nope"]).columns) == ["Distance", "Calories"]
+
+    assert store.delete("runs") and store.info("runs") is None
+    with pytest.raises(KeyError):
+        store.load("runs")
+
+
+def test_stored_dataset_analysis_matches_upload(tmp_path):
+    store_dataset(make_csv(), str(tmp_path), "runs")
+
+    assert analyze_dataset(str(tmp_path), "runs") == analyze(load_data(make_csv()))
+    params = analysis_params(sections=["totals"], best_effort_k=1)
+    assert analyze_dataset(str(tmp_path), "runs", params) == {
+        "totals": {"total_calories": 4007, "total_distance": 44.2}}
+
+
+def test_stored_dataset_date_range(tmp_path):
+    store_dataset(make_csv(), str(tmp_path), "runs")
+    store = DatasetStore(str(tmp_path))
+
+    assert store.load("runs", ["Date"], start="2024-03-06")["Date"].dt.day.tolist() == [10, 7]
+    assert len(store.load("runs", ["Distance"], end="2023-12-31")) == 1
+    params = analysis_params(sections=["totals"], date_start="2024-01-01", date_end="2024-03-07")
+    assert analyze_dataset(str(tmp_path), "runs", params) == {
+        "totals": {"total_calories": 1090, "total_distance": 13.0}}
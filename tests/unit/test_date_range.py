@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.unit.sample_data import ROWS, make_csv
+from utils.data_prep import load_data
+from utils.date_range import date_bounds, in_range, row_range, select_dates
+from utils.pipeline import analysis_params, analyze, analyze_upload
+
+
+def test_binary_search_matches_mask():
+    rng = np.random.default_rng(0)
+    dates = pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000 * 24, 500), unit="h"))
+    timestamps = np.sort(dates.to_numpy(dtype="datetime64[ns]").view(np.int64))[::-1].copy()
+
+    for start, end in [(None, "2021-06-30"), ("2022-02-01", None), ("2021-01-01", "2021-01-01"),
+                       ("2019-01-01", "2019-12-31"), ("2020-03-01", "2024-12-31")]:
+        first, stop = row_range(timestamps, start, end)
+        expected = np.flatnonzero(in_range(timestamps, start, end))
+        assert np.arange(first, stop).tolist() == expected.tolist()
+
+
+def test_date_bounds():
+    assert date_bounds(year=2024) == ("2024-01-01", "2024-12-31")
+    assert date_bounds("2024-03-01") == ("2024-03-01", None)
+    with pytest.raises(ValueError):
+        date_bounds("2024-03-01", year=2024)
+    with pytest.raises(ValueError):
+        date_bounds("2024-03-10", "2024-03-01")
+
+
+def test_selected_rows_share_the_frame_memory():
+    data = load_data(make_csv())
+    march = select_dates(data, "2024-03-05", "2024-03-07")
+
+    assert march["Date"].dt.day.tolist() == [7, 5]
+    assert np.shares_memory(march["Avg HR"].to_numpy(), data["Avg HR"].to_numpy())
+
+
+def test_load_data_sorts_newest_first():
+    data = load_data(make_csv([ROWS[3], ROWS[1], ROWS[0], ROWS[2]]))
+    assert data["Date"].is_monotonic_decreasing and data.index.tolist() == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_date_range_analysis(streaming):
+    params = analysis_params(sections=["totals", "yearly_statistics"], date_start="2024-01-01", streaming=streaming)
+    body = analyze_upload(io.BytesIO(make_csv()), params)
+
+    # The 2023 long run is left out
+    assert body["totals"] == {"total_calories": 2102, "total_distance": 23.1}
+    assert body == analyze(load_data(make_csv(ROWS[:3])), analysis_params(sections=["totals", "yearly_statistics"]))
+    with pytest.raises(ValueError):
+        analyze_upload(io.BytesIO(make_csv()), {**params, "date_start": "2025-01-01"})
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from utils.downsample import lttb_indices
+from utils.plots import get_mov_avg_data, shared_sample_rows
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[437] = 25.0  # a spike every-n-th sampling would likely miss
+
+    idx = lttb_indices(x, y, 50)
+    assert len(idx) == 50
+    assert idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+    assert 437 in idx
+
+
+def test_lttb_returns_everything_for_short_series():
+    assert lttb_indices(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_mov_avg_data_samples_every_series_on_one_date_axis():
+    rng = np.random.default_rng(0)
+    hr = rng.normal(150, 10, 500)
+    hr[rng.random(500) < 0.2] = np.nan
+    data = pd.DataFrame({"Date": pd.Timestamp("2025-01-01") - pd.to_timedelta(np.arange(500), unit="D"),
+                         "Avg HR": hr, "Avg_pace_secs": rng.normal(320, 30, 500)})
+    full = get_mov_avg_data(data)
+    small = get_mov_avg_data(data, max_points=40)
+
+    assert 20 <= len(small["dates"]) <= 40
+    assert small["dates"][0] == full["dates"][0] and small["dates"][-1] == full["dates"][-1]
+    rows = [full["dates"].index(date) for date in small["dates"]]
+    for name in ("Avg HR", "Avg Pace"):
+        assert len(small[name]["values"]) == len(small[name]["moving_average"]) == len(small["dates"])
+        assert small[name]["values"] == [full[name]["values"][row] for row in rows]
+        assert small[name]["moving_average"] == [full[name]["moving_average"][row] for row in rows]
+    assert None in small["Avg HR"]["values"]  # missing heart rates are gaps, not zeros
+
+
+def test_shared_sample_rows_keep_the_picks_of_each_series():
+    x = np.arange(1000)
+    values = np.column_stack([np.sin(x / 50), np.cos(x / 80)])
+    values[437, 0], values[612, 1] = 25.0, -25.0
+    values[::7, 1] = np.nan
+
+    rows = shared_sample_rows(x, values, 100)
+    assert len(rows) <= 100 and np.all(np.diff(rows) > 0)
+    assert {0, 437, 612, 999} <= set(rows.tolist())
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from utils.durations import parse_durations, format_durations
+from utils.utils_functions import secs_to_hms
+
+
+def test_parse_durations_formats_and_placeholders():
+    values = pd.Series(["1:02:03.5", "5:47", "00:31:48", "--", None, "", "abc", "12"])
+    secs = parse_durations(values)
+
+    assert secs[:3].tolist() == [3723.5, 347.0, 1908.0]
+    assert secs[3:].isna().all()
+
+
+def test_parse_durations_can_drop_fraction():
+    secs = parse_durations(pd.Series(["00:04:03.98", "4:29.9"]), keep_fraction=False)
+    assert secs.tolist() == [243.0, 269.0]
+
+
+def test_format_durations_matches_secs_to_hms():
+    secs = np.concatenate([np.random.default_rng(0).uniform(0, 20000, 1000), [0.015, 59.999, 1.005, 3600.0]])
+    assert format_durations(secs).tolist() == [secs_to_hms(s) for s in secs]
+    assert format_durations(pd.Series([np.nan])).tolist() == [None]
@@ -0,0 +1,61 @@
+import io
+
+import msgpack
+import numpy as np
+from fastapi.testclient import TestClient
+
+from main import app
+from tests.unit.sample_data import make_csv
+from utils.encoding import FLOAT64_ARRAY_EXT, encode_columnar, negotiate_content_encoding, wants_columnar
+
+
+def _decode_ext(code, data):
+    assert code == FLOAT64_ARRAY_EXT
+    return np.frombuffer(data, dtype="<f8").tolist()
+
+
+def test_negotiation_follows_header_qualities():
+    assert negotiate_content_encoding("gzip, deflate, br") == "br"
+    assert negotiate_content_encoding("gzip, br;q=0") == "gzip"
+    assert negotiate_content_encoding("identity") is None
+    assert wants_columnar("application/x-msgpack, application/json;q=0.9")
+    assert not wants_columnar("application/json, application/x-msgpack;q=0.5")
+
+
+def test_columnar_encoding_packs_chart_sections():
+    body = {
+        "totals": {"total_distance": 44.2},
+        "histogram_data": {"Distance": {"bins": [1.5, 2.5], "counts": [3, 0]}},
+        "time_series_data": {"dates": ["2024-01-02 07:00:00", "NaT"], "Avg HR": {"values": [150.0, None]}},
+    }
+    decoded = msgpack.unpackb(encode_columnar(body), ext_hook=_decode_ext)
+
+    assert decoded["totals"] == body["totals"]
+    assert decoded["histogram_data"]["Distance"] == {"bins": [1.5, 2.5], "counts": [3.0, 0.0]}
+    dates = decoded["time_series_data"]["dates"]
+    assert dates[0] == np.datetime64("2024-01-02T07:00:00", "ms").astype(np.int64)
+    assert np.isnan(dates[1])
+    assert decoded["time_series_data"]["Avg HR"]["values"][0] == 150.0
+    assert np.isnan(decoded["time_series_data"]["Avg HR"]["values"][1])
+
+
+def test_upload_response_negotiation():
+    client = TestClient(app)
+
+    def upload(headers):
+        files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+        return client.post("/api/upload", files=files, params={"k": 2}, headers=headers)
+
+    plain = upload({"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    # The client decodes the gzip body transparently
+    compressed = upload({"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json() == plain.json()
+
+    columnar = upload({"Accept": "application/x-msgpack", "Accept-Encoding": "identity"})
+    assert columnar.headers["content-type"] == "application/x-msgpack"
+    decoded = msgpack.unpackb(columnar.content, ext_hook=_decode_ext)
+    assert decoded["totals"] == plain.json()["totals"]
+    assert decoded["time_series_data"]["Avg HR"]["values"] == plain.json()["time_series_data"]["Avg HR"]["values"]
@@ -0,0 +1,69 @@
+import asyncio
+import io
+import time
+
+import pytest
+
+from utils.data_prep import load_data
+from utils.executor import AnalysisExecutor, SharedFrame, cpu_allotment
+from utils.metrics import compute_totals
+from tests.unit.sample_data import make_csv
+
+
+def test_cpu_allotment_is_positive():
+    assert cpu_allotment() >= 1
+
+
+def test_shared_frame_round_trip():
+    data = load_data(io.BytesIO(make_csv()))
+    shared = SharedFrame.create(data)
+    try:
+        rebuilt = shared.to_frame()
+        assert list(rebuilt.columns) == list(data.columns)
+        assert rebuilt.equals(data)
+        assert "Avg_pace_secs" not in shared.objects.columns  # numeric columns are not pickled
+    finally:
+        shared.unlink()
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_run_on_frame(kind):
+    data = load_data(io.BytesIO(make_csv()))
+    executor = AnalysisExecutor(kind=kind, max_workers=1)
+    try:
+        assert asyncio.run(executor.run_on_frame(compute_totals, data)) == compute_totals(data)
+    finally:
+        executor.shutdown()
+
+
+def test_timeout_recycles_process_pool():
+    executor = AnalysisExecutor(kind="process", max_workers=1, timeout=0.5)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(executor.run(time.sleep, 30))
+        assert asyncio.run(executor.run(sum, [1, 2])) == 3
+    finally:
+        executor.shutdown()
+
+
+def test_timeout_spares_other_jobs_of_the_pool():
+    executor = AnalysisExecutor(kind="process", max_workers=2, timeout=0.5)
+
+    async def scenario():
+        stuck = asyncio.create_task(executor.run(time.sleep, 30))
+        slow = asyncio.create_task(executor.run(time.sleep, 1.5, timeout=10))
+        with pytest.raises(asyncio.TimeoutError):
+            await stuck
+        workers = list(next(iter(executor._retired))._processes.values())
+        # The other job of the retired pool still completes, then its workers are stopped
+        assert await slow is None
+        assert not executor._retired
+        for process in workers:
+            process.join(5)
+            assert not process.is_alive()
+        assert await executor.run(sum, [1, 2]) == 3
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
@@ -0,0 +1,73 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.histograms import MAX_BINS, bin_edges, compute_histograms, histogram_counts, merge_histograms
+
+
+def test_counts_match_numpy_with_missing_values():
+    rng = np.random.default_rng(0)
+    matrix = np.round(rng.normal(300, 40, (500, 3)), 1)
+    matrix[rng.random(matrix.shape) < 0.1] = np.nan
+    edges = [bin_edges(matrix[:, i], bins=bins) for i, bins in enumerate((10, 7, 1))]
+
+    for column, field_edges, counts in zip(matrix.T, edges, histogram_counts(matrix, edges)):
+        expected, expected_edges = np.histogram(column[~np.isnan(column)], bins=len(field_edges) - 1)
+        assert counts[0].tolist() == expected.tolist() and np.array_equal(field_edges, expected_edges)
+
+
+def test_strategies():
+    values = np.array([281.0, 299.0, 300.0, 317.5, np.nan])
+    assert bin_edges(values, strategy="width", width=10).tolist() == [280.0, 290.0, 300.0, 310.0, 320.0]
+    assert np.array_equal(bin_edges(values, strategy="fd"), np.histogram_bin_edges(values[:-1], bins="fd"))
+
+    # Distinct values with their counts give the edges of the expanded values
+    distinct, counts = np.unique(np.repeat(values[:-1], [3, 1, 4, 2]), return_counts=True)
+    assert np.array_equal(bin_edges(distinct, counts, strategy="fd"),
+                          np.histogram_bin_edges(np.repeat(values[:-1], [3, 1, 4, 2]), bins="fd"))
+    with pytest.raises(ValueError):
+        bin_edges(values, strategy="width")
+
+
+def test_fd_is_capped_at_max_bins():
+    # A tight bulk and one far outlier: Freedman-Diaconis asks for about 60k bins
+    values = np.concatenate([np.linspace(300.0, 301.0, 1000), [100_000.0]])
+    assert len(bin_edges(values, strategy="fd")) - 1 == MAX_BINS
+    with pytest.raises(ValueError):
+        bin_edges(values, strategy="width", width=0.01)
+
+
+def test_tiny_width_fails_before_allocating_the_edges():
+    # 500 million edges (4 GB) if they were built before counting them
+    tracemalloc.start()
+    try:
+        with pytest.raises(ValueError):
+            bin_edges([0.5, 50.0], strategy="width", width=1e-7)
+        assert tracemalloc.get_traced_memory()[1] < 1_000_000
+    finally:
+        tracemalloc.stop()
+
+
+def test_grouped_histograms_share_edges_and_merge():
+    data = pd.DataFrame({"Avg_pace_secs": [281.0, 299.0, 305.0, np.nan], "Year": [2023, 2024, 2024, 2024]})
+    first = compute_histograms(data, ["Avg_pace_secs", "Avg HR"], strategy="width",
+                               widths={"Avg_pace_secs": 10}, by="Year")
+    assert first["Avg_pace_secs"] == {
+        "bins": [285.0, 295.0, 305.0],
+        "counts": [1, 1, 1],
+        "edges": [280.0, 290.0, 300.0, 310.0],
+        "groups": {"2023": [1, 0, 0], "2024": [0, 1, 1]},
+    }
+    assert first["Avg HR"] == {"error": "Avg HR not found in dataset"}
+
+    second = compute_histograms(pd.DataFrame({"Avg_pace_secs": [312.0], "Year": [2025]}), ["Avg_pace_secs"],
+                                strategy="width", widths={"Avg_pace_secs": 10}, by="Year")
+    merged = merge_histograms(first["Avg_pace_secs"], second["Avg_pace_secs"])
+    assert merged["counts"] == [1, 1, 1, 1] and merged["edges"][-1] == 320.0
+    assert merged["groups"]["2025"] == [0, 0, 0, 1]
+
+    # Edges of an earlier result put another dataset on the same grid
+    reused = compute_histograms(data, ["Avg_pace_secs"], edges={"Avg_pace_secs": [270.0, 290.0, 310.0]})
+    assert reused["Avg_pace_secs"]["counts"] == [1, 2]
@@ -0,0 +1,53 @@
+import fcntl
+import io
+
+import pytest
+
+from config import yearly_stats_cols, main_distances
+from utils.data_prep import load_data, read_activities, prepare_activities
+from utils.incremental import IncrementalAggregates, IncrementalStore
+from utils.pipeline import analyze
+from tests.unit.sample_data import ROWS, make_csv
+
+
+def ingest(aggregates, rows):
+    return aggregates.ingest(read_activities(io.BytesIO(make_csv(rows))), prepare_activities)
+
+
+def test_cumulative_uploads_only_fold_new_activities():
+    aggregates = IncrementalAggregates(yearly_stats_cols, main_distances)
+
+    assert ingest(aggregates, ROWS[2:]) == 2
+    assert ingest(aggregates, ROWS) == 2  # the two older runs are already in the log
+    assert ingest(aggregates, ROWS) == 0
+
+    full = analyze(load_data(io.BytesIO(make_csv())))
+    result = aggregates.results()
+    assert result["totals"] == full["totals"]
+    assert result["avg_pace_day_week"] == full["avg_pace_day_week"]
+    assert result["best_perf"] == full["best_perf"]
+    for col in yearly_stats_cols:
+        assert result["yearly_statistics"][col]["Year"] == full["yearly_statistics"][col]["Year"]
+        for stat in ("mean", "std", "min", "max"):
+            assert result["yearly_statistics"][col][stat] == pytest.approx(full["yearly_statistics"][col][stat])
+
+
+def test_store_round_trip(tmp_path):
+    store = IncrementalStore(str(tmp_path), yearly_stats_cols, main_distances)
+    aggregates = store.load("runner-1")
+    ingest(aggregates, ROWS)
+    store.save("runner-1", aggregates)
+
+    assert len(store.load("runner-1").seen) == len(ROWS)
+    assert len(store.load("runner-2").seen) == 0
+
+
+def test_store_lock_excludes_other_processes(tmp_path):
+    store = IncrementalStore(str(tmp_path), yearly_stats_cols, main_distances)
+    with store.lock("runner-1"):
+        # Another process (another open file description) cannot take the dataset's lock
+        with open(tmp_path / "runner-1.pkl.lock", "a") as other:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with open(tmp_path / "runner-2.pkl.lock", "a") as other:
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
@@ -0,0 +1,79 @@
+import asyncio
+import io
+import time
+
+from tests.unit.sample_data import make_csv
+from utils.executor import AnalysisExecutor
+from utils.jobs import DONE, FAILED, RUNNING, FileJobStore, InMemoryJobStore, JobQueue, QueueFullError
+from utils.pipeline import analyze_upload
+from utils.timing import stage
+
+
+def _staged(value):
+    with stage("first"):
+        pass
+    with stage("second"):
+        return value * 2
+
+
+def _fails():
+    raise ValueError("bad export")
+
+
+async def _wait(store, job_id):
+    while store.get(job_id)["status"] not in (DONE, FAILED):
+        await asyncio.sleep(0.01)
+    return store.get(job_id)
+
+
+def test_job_queue_runs_jobs_and_reports_stages():
+    async def scenario():
+        store = InMemoryJobStore(ttl=60)
+        jobs = JobQueue(store, AnalysisExecutor(kind="thread", max_workers=1), max_pending=4, workers=1)
+        results = []
+        done = await _wait(store, jobs.submit(_staged, 21, on_result=results.append))
+        failed = await _wait(store, jobs.submit(_fails))
+        analyzed = await _wait(store, jobs.submit(analyze_upload, io.BytesIO(make_csv())))
+        return done, failed, analyzed, results
+
+    done, failed, analyzed, results = asyncio.run(scenario())
+    assert done["result"] == 42 and results == [42]
+    assert failed["status"] == FAILED and failed["error"] == "bad export"
+    assert analyzed["result"]["totals"] == {"total_calories": 4007, "total_distance": 44.2}
+    assert "read_csv" in analyzed["stages"]
+
+
+def test_job_queue_is_bounded():
+    async def scenario():
+        jobs = JobQueue(InMemoryJobStore(ttl=60), AnalysisExecutor(kind="thread", max_workers=1),
+                        max_pending=1, workers=1)
+        jobs.submit(_staged, 1)
+        try:
+            jobs.submit(_staged, 2)
+        except QueueFullError:
+            return True
+        return False
+
+    assert asyncio.run(scenario())
+
+
+def test_finished_jobs_expire_after_ttl():
+    store = InMemoryJobStore(ttl=0.05)
+    store.create({"job_id": "a", "status": DONE, "stages": [], "finished": time.time()})
+    assert store.get("a") is not None
+    time.sleep(0.1)
+    assert store.get("a") is None
+
+
+def test_file_job_store_is_shared_between_instances(tmp_path):
+    writer, reader = FileJobStore(str(tmp_path), ttl=0.05), FileJobStore(str(tmp_path), ttl=0.05)
+    job_id = "0" * 32
+    writer.create({"job_id": job_id, "status": RUNNING, "stage": None, "stages": [], "finished": None})
+    writer.add_stage(job_id, "read_csv")
+    assert reader.get(job_id)["stage"] == "read_csv"
+
+    writer.update(job_id, status=DONE, result={"totals": {}}, finished=time.time())
+    assert reader.get(job_id)["result"] == {"totals": {}}
+    assert reader.get("../secrets") is None
+    time.sleep(0.1)
+    assert reader.get(job_id) is None
@@ -0,0 +1,55 @@
+import io
+import json
+
+import pytest
+
+from config import desc_matrix_cols, yearly_stats_cols, main_distances
+from utils.data_prep import load_data
+from utils.metrics import (
+    compute_metrics,
+    get_descriptive_matrix,
+    get_avg_pace_by_day_of_week,
+    compute_totals,
+    get_yearly_statistics,
+    get_three_best_performances,
+)
+from tests.unit.sample_data import make_csv
+
+
+@pytest.fixture
+def data():
+    return load_data(io.BytesIO(make_csv()))
+
+
+def test_planner_matches_individual_functions(data):
+    metrics = compute_metrics(data, desc_matrix_cols=desc_matrix_cols,
+                              yearly_statistics_cols=yearly_stats_cols, distances=main_distances)
+
+    assert metrics["desc_matrix"] == get_descriptive_matrix(data, desc_matrix_cols)
+    assert metrics["avg_pace_day_week"] == get_avg_pace_by_day_of_week(data)
+    assert metrics["totals"] == compute_totals(data)
+    # Single-run years have NaN std, so compare the representations
+    assert repr(metrics["yearly_statistics"]) == repr(get_yearly_statistics(data, yearly_stats_cols))
+    assert metrics["best_perf"] == get_three_best_performances(data, main_distances)
+
+
+def test_planner_computes_only_requested_outputs(data):
+    metrics = compute_metrics(data, ["totals", "avg_pace_day_week"])
+
+    assert list(metrics) == ["totals", "avg_pace_day_week"]
+    assert metrics["avg_pace_day_week"] == {"Monday": "05:27.00", "Tuesday": "04:43.00",
+                                            "Thursday": "05:30.00", "Sunday": "05:13.00"}
+
+
+def test_planner_rejects_unknown_outputs(data):
+    with pytest.raises(ValueError):
+        compute_metrics(data, ["totals", "nope"])
+
+
+def test_analysis_body_has_no_nan(data):
+    from utils.pipeline import analyze
+
+    # Best_pace_secs has a '--' placeholder and 2023 has a single run (NaN std)
+    body = analyze(data)
+    json.dumps(body, allow_nan=False)
+    assert body["yearly_statistics"]["Distance"]["std"][0] == 0
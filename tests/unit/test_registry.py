@@ -0,0 +1,53 @@
+import pandas as pd
+
+from tests.unit.sample_data import make_csv
+from utils.data_prep import load_data
+from utils.registry import DatasetRegistry, frame_bytes
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_within_byte_budget():
+    data = load_data(make_csv())
+    size = frame_bytes(data)
+    assert size == data.memory_usage(deep=True).sum()
+
+    registry = DatasetRegistry(max_bytes=2 * size, ttl=60)
+    assert registry.put("a", data) and registry.put("b", data.copy())
+    assert registry.get("a") is data  # "b" is now the least recently used
+    registry.put("c", data.copy())
+
+    assert registry.get("b") is None and registry.get("a") is data
+    stats = registry.stats()
+    assert stats["bytes"] == 2 * size and stats["evictions"] == {"lru": 1, "ttl": 0}
+    assert [entry["dataset_id"] for entry in stats["resident"]] == ["c", "a"]
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+    # Larger than the whole budget: analyzed, but not kept
+    assert not registry.put("big", pd.concat([data] * 3))
+    assert registry.get("big") is None
+    assert registry.oversized("big") and not registry.oversized("a")
+    registry.delete("big")
+    assert not registry.oversized("big")
+
+
+def test_idle_frames_expire():
+    clock = Clock()
+    registry = DatasetRegistry(max_bytes=1 << 30, ttl=10, clock=clock)
+    data = load_data(make_csv())
+    registry.put("a", data)
+    registry.put("b", data)
+
+    clock.now = 8
+    assert registry.get("a") is data
+    clock.now = 15  # "b" idle for 15 s, "a" for 7 s
+    assert registry.stats()["datasets"] == 1
+    assert registry.get("b") is None and registry.get("a") is data
+    assert registry.stats()["evictions"] == {"lru": 0, "ttl": 1}
+    assert registry.delete("a") and registry.stats()["bytes"] == 0
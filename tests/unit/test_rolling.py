@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.rolling import DailyTotals, day_numbers, rolling_stats
+
+
+def make_series(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Series(pd.Timestamp("2022-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 900 * 24, n)), unit="h"))
+    values = pd.Series(np.round(rng.normal(300, 25, n)))
+    values[rng.random(n) < 0.1] = np.nan
+    # Newest first, as Garmin exports are
+    return dates[::-1].reset_index(drop=True), values[::-1].reset_index(drop=True)
+
+
+def test_windows_match_pandas_on_the_daily_grid():
+    dates, values = make_series()
+    stats = rolling_stats(dates, values, windows=[7, 30, 365])
+
+    daily = pd.DataFrame({"sum": values.to_numpy(), "count": values.notna().to_numpy(dtype=int)},
+                         index=dates.dt.normalize()).groupby(level=0).sum().asfreq("D", fill_value=0)
+    for window in (7, 30, 365):
+        totals = daily.rolling(window, min_periods=1).sum()
+        expected = (totals["sum"] / totals["count"]).where(totals["count"] > 0)
+        np.testing.assert_allclose(stats[f"{window}D"], expected.loc[dates.dt.normalize()].to_numpy(),
+                                   rtol=1e-9, equal_nan=True)
+
+
+def test_ewma_weighs_values_by_day():
+    dates, values = make_series(n=60, seed=1)
+    span = 14
+    ewma = rolling_stats(dates, values, windows=[], spans=[span])[f"EWMA {span}D"]
+
+    decay = 1 - 2 / (span + 1)
+    days = day_numbers(dates.to_numpy(dtype="datetime64[ns]").view(np.int64))
+    present = values.notna().to_numpy()
+    for row, day in enumerate(days):
+        weights = np.where((days <= day) & present, decay ** (day - days).astype(float), 0.0)
+        expected = np.dot(weights, values.fillna(0)) / weights.sum() if weights.sum() else np.nan
+        assert ewma[row] == pytest.approx(expected, nan_ok=True)
+
+
+def test_daily_totals_merged_across_chunks_give_the_same_stats():
+    dates, values = make_series()
+    days = day_numbers(dates.to_numpy(dtype="datetime64[ns]").view(np.int64))
+    totals = DailyTotals()
+    for i in range(0, len(days), 37):
+        totals.update(days[i:i + 37], values.to_numpy()[i:i + 37])
+
+    chunked = totals.stats(windows=[7, 90], spans=[28]).at(days)
+    for label, expected in rolling_stats(dates, values, windows=[7, 90], spans=[28]).items():
+        np.testing.assert_allclose(chunked[label], expected, rtol=1e-12, equal_nan=True)
@@ -1,15 +1,79 @@
-import aws_cdk as core
-import aws_cdk.assertions as assertions
+import pytest
 
-from run_app_aws.run_app_aws_stack import RunAppAwsStack
+core = pytest.importorskip("aws_cdk")
+from aws_cdk import assertions  # noqa: E402
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in run_app_aws/run_app_aws_stack.py
-def test_sqs_queue_created():
+from run_app_aws.run_app_aws_stack import RunAppAwsStack  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def template():
     app = core.App()
-    stack = RunAppAwsStack(app, "run-app-aws")
-    template = assertions.Template.from_stack(stack)
+    stack = RunAppAwsStack(app, "run-app-aws", min_tasks=2, max_tasks=8, max_instances=4)
+    return assertions.Template.from_stack(stack)
+
+
+def test_service_behind_load_balancer(template):
+    template.resource_count_is("AWS::ElasticLoadBalancingV2::LoadBalancer", 1)
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::LoadBalancer", {"Scheme": "internet-facing"})
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::TargetGroup", {
+        "HealthCheckPath": "/ready",
+        "TargetType": "instance",
+    })
+    template.has_resource_properties("AWS::ECS::TaskDefinition", {
+        "ContainerDefinitions": [assertions.Match.object_like({
+            "PortMappings": [{"ContainerPort": 8000, "HostPort": 0, "Protocol": "tcp"}],
+        })],
+    })
+    template.has_resource_properties("AWS::ECS::Service", {
+        "DesiredCount": 2,
+        "LoadBalancers": [assertions.Match.object_like({"ContainerPort": 8000})],
+    })
+    # The instances accept the ephemeral host ports from the load balancer only
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {"FromPort": 32768, "ToPort": 65535})
+
+
+def test_task_scaling_policies(template):
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalableTarget", {
+        "MinCapacity": 2,
+        "MaxCapacity": 8,
+        "ScalableDimension": "ecs:service:DesiredCount",
+    })
+    policies = template.find_resources("AWS::ApplicationAutoScaling::ScalingPolicy")
+    metrics = {policy["Properties"]["TargetTrackingScalingPolicyConfiguration"]["PredefinedMetricSpecification"]
+               ["PredefinedMetricType"]: policy["Properties"]["TargetTrackingScalingPolicyConfiguration"]["TargetValue"]
+               for policy in policies.values()}
+    assert metrics == {"ECSServiceAverageCPUUtilization": 60, "ALBRequestCountPerTarget": 120}
+
+
+def test_instance_capacity_follows_the_tasks(template):
+    template.has_resource_properties("AWS::AutoScaling::AutoScalingGroup", {"MinSize": "1", "MaxSize": "4"})
+    template.has_resource_properties("AWS::ECS::CapacityProvider", {
+        "AutoScalingGroupProvider": assertions.Match.object_like({
+            "ManagedScaling": assertions.Match.object_like({"Status": "ENABLED", "TargetCapacity": 100}),
+        }),
+    })
+
 
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
+def test_tasks_share_state_on_efs(template):
+    template.resource_count_is("AWS::EFS::FileSystem", 1)
+    template.has_resource_properties("AWS::ECS::TaskDefinition", {
+        "Volumes": [assertions.Match.object_like({
+            "EFSVolumeConfiguration": assertions.Match.object_like({"TransitEncryption": "ENABLED"}),
+        })],
+        "ContainerDefinitions": [assertions.Match.object_like({
+            "MountPoints": [assertions.Match.object_like({"ContainerPath": "/data", "ReadOnly": False})],
+            "Environment": assertions.Match.array_with([
+                {"Name": "RUNAPI_JOB_STORE", "Value": "file"},
+                {"Name": "RUNAPI_DATASET_DIR", "Value": "/data/datasets"},
+                {"Name": "RUNAPI_INCREMENTAL_DIR", "Value": "/data/incremental"},
+            ]),
+        })],
+    })
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {"FromPort": 2049, "ToPort": 2049})
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::TargetGroup", {
+        "TargetGroupAttributes": assertions.Match.array_with([
+            {"Key": "stickiness.enabled", "Value": "true"},
+        ]),
+    })
+    template.has_resource_properties("AWS::AutoScaling::LaunchConfiguration", {"InstanceType": "t3.small"})
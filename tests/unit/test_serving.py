@@ -0,0 +1,21 @@
+import io
+
+from config import data_cols
+from utils.data_prep import load_data
+from utils.serving import WARMUP_HEADER, warmup_export, worker_count
+
+
+def test_worker_count_follows_cpu_and_memory():
+    assert worker_count(cpu_units=256, memory_mib=512) == 1
+    assert worker_count(cpu_units=4096, memory_mib=8192) == 4
+    # 2 GiB leave room for 7 workers of 256 MiB, not for one per CPU
+    assert worker_count(cpu_units=16384, memory_mib=2048) == 7
+    assert worker_count(cpu_units=2048, memory_mib=128) == 1
+
+
+def test_warmup_export_matches_the_schema():
+    assert WARMUP_HEADER.split(",") == data_cols
+    data = load_data(io.BytesIO(warmup_export()))
+    assert len(data) == 40 and data["Pace_MA_30"].notna().all()
+    assert data["Best_pace_secs"].isna().sum() == 5
+    assert data["Calories"].min() == 1000
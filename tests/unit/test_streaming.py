@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.unit.sample_data import ROWS, make_csv
+from utils.pipeline import analysis_params, analyze_upload
+from utils.streaming import ValueCounts
+
+
+def test_value_counts_match_full_column():
+    values = np.round(np.random.default_rng(1).normal(10, 3, 1000), 2)
+    values[::50] = np.nan
+    counts = ValueCounts()
+    for i in range(0, 1000, 128):
+        counts.update(values[i:i + 128])
+
+    expected = pd.Series(values).describe()
+    assert counts.describe() == pytest.approx(expected.tolist())
+    hist, edges = counts.histogram(10)
+    expected_hist, expected_edges = np.histogram(values[~np.isnan(values)], bins=10)
+    assert hist.tolist() == expected_hist.tolist() and np.allclose(edges, expected_edges)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 3])
+def test_streaming_matches_in_memory_analysis(chunk_rows):
+    full = analyze_upload(io.BytesIO(make_csv()))
+    streamed = analyze_upload(io.BytesIO(make_csv()), analysis_params(streaming=True, stream_chunk_rows=chunk_rows))
+
+    for section in ("avg_pace_day_week", "totals", "histogram_data", "best_perf", "time_series_data"):
+        assert streamed[section] == full[section]
+    assert streamed["desc_matrix"]["index"] == full["desc_matrix"]["index"]
+    for stat in ("count", "mean", "std", "50%", "max"):
+        assert streamed["desc_matrix"][stat][:-1] == pytest.approx(full["desc_matrix"][stat][:-1])
+    assert len(ROWS) == streamed["desc_matrix"]["count"][0]
+
+
+@pytest.mark.parametrize("strategy", ["fd", "width"])
+def test_streaming_histograms_match_in_memory(strategy):
+    params = analysis_params(sections=["histogram_data"], histogram_strategy=strategy, histogram_by="Year",
+                             histogram_widths={"Avg_pace_secs": 10})
+    full = analyze_upload(io.BytesIO(make_csv()), params)
+    streamed = analyze_upload(io.BytesIO(make_csv()), {**params, "streaming": True, "stream_chunk_rows": 1})
+    assert streamed == full
+
+
+def test_streaming_moving_average_windows_match_in_memory():
+    params = analysis_params(sections=["time_series_data"], time_series_windows=[7, 365], time_series_spans=[14])
+    full = analyze_upload(io.BytesIO(make_csv()), params)
+    streamed = analyze_upload(io.BytesIO(make_csv()), {**params, "streaming": True, "stream_chunk_rows": 1})
+    assert streamed == full
+    assert list(full["time_series_data"]["Avg HR"]["moving_averages"]) == ["7D", "30D", "365D", "EWMA 14D"]
+
+
+def test_streaming_samples_the_time_series_on_one_date_axis():
+    # 200 activities, a day apart
+    rows = [f"Running,{day.strftime('%Y-%m-%d %H:%M:%S')},{ROWS[i % 4].split(',', 2)[2]}"
+            for i, day in enumerate(pd.date_range("2024-12-31 08:00", periods=200, freq="-1D"))]
+    params = analysis_params(sections=["time_series_data"], time_series_max_points=20)
+    full = analyze_upload(io.BytesIO(make_csv(rows)), analysis_params(sections=["time_series_data"]))
+    series = analyze_upload(io.BytesIO(make_csv(rows)),
+                            {**params, "streaming": True, "stream_chunk_rows": 7})["time_series_data"]
+
+    assert 0 < len(series["dates"]) <= 20
+    assert set(series["dates"]) <= set(full["time_series_data"]["dates"])
+    for name in ("Avg HR", "Avg Pace"):
+        assert len(series[name]["values"]) == len(series[name]["moving_average"]) == len(series["dates"])
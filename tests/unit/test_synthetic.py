@@ -0,0 +1,40 @@
+import io
+
+import pandas as pd
+
+from benchmarks.bench_suite import compare_results
+from benchmarks.synthetic import make_export, write_export
+from config import data_cols
+from utils.data_prep import load_data
+
+
+def test_synthetic_export_has_garmin_quirks_and_loads():
+    content = make_export(500, seed=3)
+    raw = pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False)
+
+    assert set(data_cols) <= set(raw.columns)
+    assert raw["Calories"].str.contains(",").any()
+    assert (raw["Best Pace"] == "--").any() and (raw["Total Ascent"] == "--").any()
+    colons = raw["Time"].str.count(":")
+    assert (colons == 1).any() and (colons == 2).any()
+
+    data = load_data(content)
+    assert len(data) == 500 and data["Time_in_secs"].notna().all()
+    assert data["Date"].is_monotonic_decreasing
+
+
+def test_write_export_in_blocks(tmp_path):
+    path = tmp_path / "activities.csv"
+    write_export(str(path), 250, block=100)
+
+    data = load_data(str(path))
+    assert len(data) == 250
+    assert data["Date"].is_monotonic_decreasing
+
+
+def test_compare_results_flags_regressions():
+    baseline = {"1k": {"load_data": 0.10, "plots.get_mov_avg_data": 0.02}}
+    current = {"1k": {"load_data": 0.13, "plots.get_mov_avg_data": 0.02, "api.upload": 0.5}}
+
+    regressions = {case: regression for _, case, *_, regression in compare_results(current, baseline, 0.2)}
+    assert regressions == {"load_data": True, "plots.get_mov_avg_data": False}
@@ -0,0 +1,51 @@
+from utils.timing import Histogram, StageTimer, UploadMetrics, count, run_timed, stage
+
+
+def _job():
+    with stage("load"):
+        count("rows", 3)
+    with stage("load"):
+        pass
+    return "done"
+
+
+def test_run_timed_collects_stages_of_the_job():
+    result, stages, counters = run_timed(_job)
+
+    assert result == "done"
+    assert list(stages) == ["load"]
+    assert counters["rows"] == 3 and counters["peak_rss_bytes"] > 0
+
+    # Outside run_timed, stages are not recorded anywhere
+    assert _job() == "done"
+
+
+def test_server_timing_header():
+    timer = StageTimer()
+    timer.add("read_csv", 0.0123)
+    timer.merge({"metrics.totals": 0.002}, {"rows": 10})
+    assert timer.server_timing() == "read_csv;dur=12.3, metrics.totals;dur=2.0"
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", (0.1, 1), label="stage")
+    for value in (0.05, 0.5, 3):
+        histogram.observe(value, "load")
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{stage="load",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="load",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="load",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="load"} 3' in lines
+
+
+def test_upload_metrics_render():
+    metrics = UploadMetrics()
+    timer = StageTimer()
+    timer.add("read_csv", 0.01)
+    timer.counters.update(rows=500, peak_rss_bytes=1)
+    metrics.observe(timer, 0.02, upload_bytes=20_000)
+
+    text = metrics.render()
+    assert 'runapi_upload_seconds_count{cache="miss"} 1' in text
+    assert "runapi_upload_rows_count 1" in text and "runapi_upload_bytes_count 1" in text
@@ -0,0 +1,289 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from utils import serving
+from utils.histograms import merge_histograms
+from tests.unit.sample_data import ROWS, make_csv
+
+
+def test_upload_parses_csv_from_stream():
+    client = TestClient(app)
+    response = client.post("/api/upload", files={"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["totals"] == {"total_calories": 4007, "total_distance": 44.2}
+    assert [run["Distance"] for run in body["best_perf"]["10"]] == [10.01]
+
+
+def test_upload_rejects_non_csv():
+    client = TestClient(app)
+    response = client.post("/api/upload", files={"file": ("activities.txt", io.BytesIO(b"x"), "text/plain")})
+    assert response.status_code == 400
+
+
+def test_repeated_upload_is_served_from_cache():
+    client = TestClient(app)
+    before = client.get("/api/cache/stats").json()
+
+    payload = make_csv(ROWS[:3])
+    first = client.post("/api/upload", files={"file": ("a.csv", io.BytesIO(payload), "text/csv")})
+    second = client.post("/api/upload", files={"file": ("b.csv", io.BytesIO(payload), "text/csv")})
+
+    after = client.get("/api/cache/stats").json()
+    assert first.json() == second.json()
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_incremental_upload_counts_new_activities(tmp_path, monkeypatch):
+    from api import routes
+    monkeypatch.setattr(routes.incremental_store, "directory", str(tmp_path))
+    client = TestClient(app)
+
+    def upload(rows):
+        files = {"file": ("activities.csv", io.BytesIO(make_csv(rows)), "text/csv")}
+        return client.post("/api/upload/incremental", params={"dataset_id": "runner-1"}, files=files).json()
+
+    assert upload(ROWS[1:])["new_activities"] == 3
+    body = upload(ROWS)
+    assert (body["new_activities"], body["total_activities"]) == (1, 4)
+    assert body["totals"] == {"total_calories": 4007, "total_distance": 44.2}
+
+
+def test_upload_best_performance_parameters():
+    client = TestClient(app)
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    body = client.post("/api/upload", params={"distances": "5,8", "tolerance": 0.1, "k": 1}, files=files).json()
+
+    assert list(body["best_perf"]) == ["5", "8"]
+    assert [run["Distance"] for run in body["best_perf"]["8"]] == [8.05]
+
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    assert client.post("/api/upload", params={"distances": "5,x"}, files=files).status_code == 400
+
+
+def test_upload_streaming_mode():
+    client = TestClient(app)
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    body = client.post("/api/upload", params={"stream": True}, files=files).json()
+
+    assert body["totals"] == {"total_calories": 4007, "total_distance": 44.2}
+    assert [run["Distance"] for run in body["best_perf"]["10"]] == [10.01]
+
+
+def test_upload_reports_stage_timings_and_metrics():
+    client = TestClient(app)
+    payload = make_csv(ROWS[1:])
+    response = client.post("/api/upload", files={"file": ("activities.csv", io.BytesIO(payload), "text/csv")})
+
+    stages = [item.split(";")[0] for item in response.headers["server-timing"].split(", ")]
+    assert {"receive", "cache_lookup", "read_csv", "add_cols", "metrics.best_perf", "encode", "total"} <= set(stages)
+
+    metrics = client.get("/metrics").text
+    assert 'runapi_upload_stage_seconds_count{stage="read_csv"}' in metrics
+    assert "runapi_upload_rows_bucket" in metrics and "runapi_peak_rss_bytes" in metrics
+
+
+def test_upload_computes_only_requested_sections():
+    client = TestClient(app)
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    body = client.post("/api/upload", params={"sections": "histogram_data,totals"}, files=files).json()
+
+    assert list(body) == ["totals", "histogram_data"]
+    assert body["totals"] == {"total_calories": 4007, "total_distance": 44.2}
+
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    assert client.post("/api/upload", params={"sections": "totals,nope"}, files=files).status_code == 400
+
+
+def test_batch_upload_merges_files():
+    client = TestClient(app)
+    files = [
+        ("files", ("old.csv", io.BytesIO(make_csv(ROWS[2:])), "text/csv")),
+        ("files", ("new.csv", io.BytesIO(make_csv(ROWS[:3])), "text/csv")),
+    ]
+    body = client.post("/api/upload/batch", files=files).json()
+
+    assert body["unique_activities"] == len(ROWS)
+    assert body["totals"] == {"total_calories": 4007, "total_distance": 44.2}
+
+
+@pytest.mark.parametrize("method, path, field", [
+    ("post", "/api/upload", "file"),
+    ("post", "/api/upload/batch", "files"),
+    ("post", "/api/jobs", "file"),
+    ("get", "/api/datasets/0123456789abcdef/analysis", None),
+])
+def test_analysis_endpoints_share_the_query_parameters(method, path, field):
+    client = TestClient(app)
+    files = {field: ("activities.csv", io.BytesIO(make_csv()), "text/csv")} if field else None
+    for params in ({"sections": "nope"}, {"ma_windows": "0"}, {"year": 2024, "end": "2024-03-01"}):
+        response = getattr(client, method)(path, params=params, **({"files": files} if files else {}))
+        assert response.status_code == 400
+
+
+def test_job_api_runs_upload_in_background():
+    with TestClient(app) as client:
+        files = {"file": ("activities.csv", io.BytesIO(make_csv(ROWS[:2])), "text/csv")}
+        response = client.post("/api/jobs", params={"sections": "totals"}, files=files)
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        events = client.get(f"/api/jobs/{job_id}/events").text
+        assert "event: done" in events
+        assert client.get(f"/api/jobs/{job_id}").json()["status"] == "done"
+        assert client.get(f"/api/jobs/{job_id}/result").json() == {
+            "totals": {"total_calories": 1414, "total_distance": 15.0}}
+        assert client.get("/api/jobs/nope").status_code == 404
+
+
+def test_stored_dataset_is_analyzed_without_reupload(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from api import routes
+    monkeypatch.setattr(routes.dataset_store, "directory", str(tmp_path))
+    client = TestClient(app)
+
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    created = client.post("/api/datasets", files=files)
+    assert created.status_code == 201 and created.json()["rows"] == len(ROWS)
+
+    dataset_id = created.json()["dataset_id"]
+    body = client.get(f"/api/datasets/{dataset_id}/analysis", params={"sections": "totals"}).json()
+    assert body == {"totals": {"total_calories": 4007, "total_distance": 44.2}}
+    assert client.get("/api/datasets/unknown/analysis").status_code == 404
+
+
+def test_health_and_readiness():
+    with TestClient(app) as client:
+        assert client.get("/health").json() == {"status": "ok"}
+        serving.warm_up()  # Waits for the warm-up started with the app
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] and response.json()["warm_up_seconds"] > 0
+
+
+def test_upload_histogram_strategies():
+    client = TestClient(app)
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    params = {"sections": "histogram_data", "hist_strategy": "width", "hist_width": "Avg_pace_secs:10", "hist_by": "Year"}
+    pace = client.post("/api/upload", params=params, files=files).json()["histogram_data"]["Avg_pace_secs"]
+
+    # Paces 4:43, 5:13 and 5:30 in 2024, 5:27 in 2023, in 10 s buckets
+    assert pace["edges"] == [280.0, 290.0, 300.0, 310.0, 320.0, 330.0, 340.0]
+    assert pace["groups"] == {"2023": [0, 0, 0, 0, 1, 0], "2024": [1, 0, 0, 1, 0, 1]}
+    assert client.post("/api/upload", params={"hist_width": "pace"}, files=files).status_code == 400
+    assert client.post("/api/upload", params={"hist_width": "Distance:1e-7"}, files=files).status_code == 400
+
+
+def test_upload_histogram_on_given_edges():
+    client = TestClient(app)
+    params = {"sections": "histogram_data", "hist_edges": "Avg_pace_secs:270:10:8"}
+    old, new = (client.post("/api/upload", params=params, files={"file": ("a.csv", io.BytesIO(csv), "text/csv")})
+                .json()["histogram_data"]["Avg_pace_secs"] for csv in (make_csv(ROWS[2:]), make_csv(ROWS[:2])))
+
+    assert old["edges"] == new["edges"] == [270.0 + 10 * i for i in range(9)]
+    assert merge_histograms(old, new)["counts"] == [0, 1, 0, 0, 1, 1, 1, 0]
+    for edges in ("Avg_pace_secs:270:0:8", "Avg_pace_secs:270:10:5000", "Calories:0:100:5", "pace"):
+        assert client.post("/api/upload", params={"hist_edges": edges},
+                           files={"file": ("a.csv", io.BytesIO(make_csv()), "text/csv")}).status_code == 400
+
+
+def test_upload_moving_average_windows():
+    client = TestClient(app)
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    params = {"sections": "time_series_data", "ma_windows": "7,365", "ewm_spans": "14"}
+    hr = client.post("/api/upload", params=params, files=files).json()["time_series_data"]["Avg HR"]
+
+    # Rows newest first; the 7-day windows of March 10 and 7 hold the runs of March 5 to 10
+    assert hr["moving_averages"]["7D"] == pytest.approx([152 + 1 / 3, 153.0, 160.0, 149.0])
+    assert hr["moving_averages"]["30D"] == hr["moving_average"]
+    assert list(hr["moving_averages"]) == ["7D", "30D", "365D", "EWMA 14D"]
+    assert client.post("/api/upload", params={"ma_windows": "0"}, files=files).status_code == 400
+
+
+def test_upload_date_range():
+    client = TestClient(app)
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+
+    body = client.post("/api/upload", params={"sections": "totals", "year": 2023}, files=files).json()
+    assert body == {"totals": {"total_calories": 1905, "total_distance": 21.1}}
+    body = client.post("/api/upload", params={"sections": "totals", "start": "2024-03-06", "end": "2024-03-10"},
+                       files=files).json()
+    assert body == {"totals": {"total_calories": 1414, "total_distance": 15.0}}
+    assert client.post("/api/upload", params={"year": 2023, "start": "2023-01-01"}, files=files).status_code == 400
+    assert client.post("/api/upload", params={"year": 2019}, files=files).status_code == 400
+
+
+def test_kept_upload_answers_follow_ups_from_the_resident_frame(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from api import routes
+    from utils.registry import DatasetRegistry
+    monkeypatch.setattr(routes.dataset_store, "directory", str(tmp_path))
+    monkeypatch.setattr(routes, "dataset_registry", DatasetRegistry(max_bytes=1 << 30, ttl=60))
+    client = TestClient(app)
+
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    uploaded = client.post("/api/upload", params={"keep": True, "sections": "totals"}, files=files)
+    dataset_id = uploaded.headers["X-Dataset-Id"]
+    assert uploaded.json() == {"totals": {"total_calories": 4007, "total_distance": 44.2}}
+
+    for params in ({"sections": "totals", "year": 2024}, {"sections": "histogram_data", "hist_bins": 4}):
+        follow_up = client.get(f"/api/datasets/{dataset_id}/analysis", params=params).json()
+        assert follow_up == client.post("/api/upload", params=params, files=files).json()
+
+    # Uploading it again with keep=true reuses the stored dataset
+    params = {"keep": True, "sections": "totals", "start": "2023-11-01", "end": "2023-11-30"}
+    again = client.post("/api/upload", params=params, files=files)
+    assert again.headers["X-Dataset-Id"] == dataset_id
+    assert again.json() == {"totals": {"total_calories": 1905, "total_distance": 21.1}}
+
+    stats = client.get("/api/registry/stats").json()
+    assert stats["datasets"] == 1 and stats["misses"] == 1 and stats["hits"] == 2
+    assert client.post("/api/upload", params={"keep": True, "stream": True}, files=files).status_code == 400
+
+
+def test_large_or_unsorted_stored_datasets(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from api import routes
+    from utils.data_prep import load_data
+    from utils.datasets import DatasetStore
+    from utils.registry import DatasetRegistry
+    monkeypatch.setattr(routes, "dataset_store", DatasetStore(str(tmp_path)))
+    client = TestClient(app)
+
+    # Stored oldest first, without the order metadata (as before date ranges were binary-searched)
+    unsorted = load_data(make_csv()).iloc[::-1].reset_index(drop=True)
+    routes.dataset_store.save("unsorted", unsorted)
+    assert not unsorted["Date"].is_monotonic_decreasing
+    params = {"sections": "totals", "start": "2024-01-01", "end": "2024-03-07"}
+    expected = {"totals": {"total_calories": 1090, "total_distance": 13.0}}
+
+    for budget in (1 << 30, 1):  # Resident, then too large for the registry: read from the file
+        monkeypatch.setattr(routes, "dataset_registry", DatasetRegistry(max_bytes=budget, ttl=60))
+        routes.analysis_cache.clear()
+        assert client.get("/api/datasets/unsorted/analysis", params=params).json() == expected
+        assert routes.dataset_registry.stats()["datasets"] == (budget > 1)
+
+
+def test_uploads_are_hashed_off_the_event_loop(monkeypatch):
+    import asyncio
+    from api import routes
+    from utils.cache import make_cache_key
+    on_loop = []
+
+    def hashing(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return make_cache_key(*args)
+
+    monkeypatch.setattr(routes, "make_cache_key", hashing)
+    client = TestClient(app)
+    files = {"file": ("activities.csv", io.BytesIO(make_csv()), "text/csv")}
+    assert client.post("/api/upload", params={"sections": "totals"}, files=files).status_code == 200
+    assert on_loop == [False]
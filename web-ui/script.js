@@ -16,14 +16,15 @@ document.getElementById("upload-form").addEventListener("submit", async function
         const response = await fetch("", { //provide api endpoint address here
             method: "POST",
             body: formData,
+            headers: { Accept: acceptedMediaTypes() },
         });
 
         if (!response.ok) {
             throw new Error("Failed to upload file");
         }
 
-        // Get the data from the response
-        const data = await response.json();
+        // Get the data from the response (JSON, or the columnar MessagePack encoding)
+        const data = await decodeResponse(response);
 
         // Render Tables and Charts
         clearContainers();
@@ -39,6 +40,49 @@ document.getElementById("upload-form").addEventListener("submit", async function
     }
 });
 
+// Response Decoding
+// MessagePack extension type of a little-endian float64 array (FLOAT64_ARRAY_EXT in utils/encoding.py)
+const FLOAT64_ARRAY_EXT = 1;
+const COLUMNAR_MEDIA_TYPE = "application/x-msgpack";
+
+function acceptedMediaTypes() {
+    // Ask for the columnar encoding only when the MessagePack decoder is loaded
+    return typeof MessagePack !== "undefined"
+        ? `${COLUMNAR_MEDIA_TYPE}, application/json;q=0.9`
+        : "application/json";
+}
+
+function decodeFloat64Array(data) {
+    // Copy into an aligned buffer: the extension payload may start at any offset
+    return Array.from(new Float64Array(data.slice().buffer));
+}
+
+function naiveMillisToDate(millis) {
+    // The API sends naive timestamps; read them as local time, as the JSON strings are
+    const date = new Date(millis);
+    return new Date(millis + date.getTimezoneOffset() * 60000);
+}
+
+async function decodeResponse(response) {
+    const contentType = response.headers.get("Content-Type") || "";
+    if (!contentType.startsWith(COLUMNAR_MEDIA_TYPE)) {
+        return response.json();
+    }
+
+    const extensionCodec = new MessagePack.ExtensionCodec();
+    extensionCodec.register({
+        type: FLOAT64_ARRAY_EXT,
+        encode: () => null,
+        decode: decodeFloat64Array,
+    });
+    const data = MessagePack.decode(new Uint8Array(await response.arrayBuffer()), { extensionCodec });
+
+    if (data.time_series_data && data.time_series_data.dates) {
+        data.time_series_data.dates = data.time_series_data.dates.map(naiveMillisToDate);
+    }
+    return data;
+}
+
 function clearContainers() {
     document.getElementById("matrix-container").innerHTML = "";
     document.getElementById("charts-container").innerHTML = "";
@@ -267,16 +311,18 @@ function renderBestPerformancesTable(bestPerfData) {
 
 function renderTimeSeriesCharts(timeSeriesData) {
     const container = document.getElementById("charts-container");
+    const { dates, ...series } = timeSeriesData;
 
-    Object.entries(timeSeriesData).forEach(([metric, data]) => {
+    // All series share one date axis
+    const formattedDates = dates.map(date =>
+        new Date(date).toLocaleDateString()
+    );
+
+    Object.entries(series).forEach(([metric, data]) => {
         const canvas = document.createElement("canvas");
         canvas.classList.add("line-chart"); // Assign line-chart class
         container.appendChild(canvas);
 
-        const formattedDates = data.dates.map(date =>
-            new Date(date).toLocaleDateString()
-        );
-
         new Chart(canvas, {
             type: "line",
             data: {